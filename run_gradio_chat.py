@@ -9,6 +9,7 @@ import os
 current_dir = os.path.dirname(os.path.abspath(__file__))
 src_dir = os.path.join(current_dir, 'src')
 sys.path.insert(0, src_dir)
+sys.path.insert(0, os.path.join(src_dir, 'sql_agent_gradio_chat'))
 
 try:
     from sql_agent_gradio_chat import main
@@ -0,0 +1,176 @@
+"""
+SQL Agent용 도구 모음
+sql_db_query를 구조화 결과를 남기는 도구로 교체해, 차트 생성 시 Agent가 이미
+실행한 결과(컬럼명 + 행)를 다시 조회하지 않고 재사용
+sql_db_query_checker는 LLM 호출 대신 EXPLAIN 기반 로컬 검사(query_checker)로 교체
+실행 전 비용 검사(cost_guard)도 거치며, 거부되면 Agent가 쿼리를 고치도록 사유를 반환
+스키마를 미리 넣은 Agent(create_seeded_sql_agent)는 sql_db_list_tables 없이 질문 관련
+테이블의 스키마를 프롬프트로 받아 바로 sql_db_query를 호출
+"""
+import os
+from typing import Optional
+
+from langchain_community.agent_toolkits import SQLDatabaseToolkit
+from langchain_community.tools.sql_database.tool import (
+    BaseSQLDatabaseTool, ListSQLDatabaseTool, QuerySQLCheckerTool, QuerySQLDatabaseTool)
+from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, Field
+
+from sql_agent_common.cost_guard import QueryRejected, rejection_feedback
+from sql_agent_common.query_checker import check_query
+from sql_agent_common.query_result import cached_fetch_structured
+from sql_agent_common.schema_cache import schema_cache
+from sql_agent_common.schema_pruning import build_pruned_schema
+from sql_agent_common.sql_capture import stash_query_result
+from sql_agent_common.sql_tokens import parse_sql
+
+# Agent가 한 번에 읽을 최대 행 수 (LLM 관찰 결과 크기 제한 겸 차트 재사용 범위)
+AGENT_QUERY_MAX_ROWS = int(os.getenv('AGENT_QUERY_MAX_ROWS', '200'))
+
+# db.run과 같은 기준으로 관찰 결과의 긴 문자열 값을 자름
+_MAX_STRING_LENGTH = 100
+
+
+def _truncate(value):
+    if isinstance(value, str) and len(value) > _MAX_STRING_LENGTH:
+        return value[:_MAX_STRING_LENGTH - 3] + '...'
+    return value
+
+
+def format_observation(query_result):
+    """LLM에 전달할 관찰 결과 (db.run과 같은 튜플 리스트 문자열)"""
+    if query_result.empty:
+        return ""
+    observation = str([tuple(_truncate(value) for value in row)
+                       for row in query_result.rows])
+    if query_result.truncated:
+        observation += (f"\n(Result truncated to the first {len(query_result)} rows. "
+                        f"Use aggregation or LIMIT for a smaller result.)")
+    return observation
+
+
+class CapturingQuerySQLDatabaseTool(QuerySQLDatabaseTool):
+    """실행 결과를 QueryResult로도 남기는 sql_db_query 도구"""
+
+    max_rows: int = AGENT_QUERY_MAX_ROWS
+
+    def _run(self, query: str,
+             run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        try:
+            query_result = cached_fetch_structured(self.db, query, max_rows=self.max_rows,
+                                                   guard=True)
+        except QueryRejected as e:
+            if run_manager is not None:
+                stash_query_result(run_manager.run_id, e)
+            return f"Error: {rejection_feedback(e)}"
+        except Exception as e:
+            # 기본 도구(run_no_throw)와 같이 오류를 문자열로 돌려줘 Agent가 수정하도록 함
+            return f"Error: {e}"
+
+        if run_manager is not None:
+            stash_query_result(run_manager.run_id, query_result)
+        return format_observation(query_result)
+
+
+class _QueryCheckerInput(BaseModel):
+    query: str = Field(..., description="A detailed and SQL query to be checked.")
+
+
+class LocalQueryCheckerTool(BaseSQLDatabaseTool, BaseTool):
+    """
+    EXPLAIN으로 쿼리를 검사하는 sql_db_query_checker (LLM 호출 없음)
+    문제가 없으면 쿼리를 그대로, 있으면 구체적인 오류 메시지를 반환
+    """
+
+    name: str = "sql_db_query_checker"
+    description: str = (
+        "Use this tool to double check if your query is correct before executing it. "
+        "Returns the query if it is valid, otherwise a precise error "
+        "(unknown column, ambiguous column, missing GROUP BY, unknown table, syntax error).")
+    args_schema: type[BaseModel] = _QueryCheckerInput
+
+    def _run(self, query: str,
+             run_manager: Optional[CallbackManagerForToolRun] = None) -> str:
+        try:
+            error = check_query(self.db, query)
+        except Exception as e:
+            return f"Error: {e}"
+        return error or parse_sql(query).sql
+
+
+class CapturingSQLDatabaseToolkit(SQLDatabaseToolkit):
+    """sql_db_query는 CapturingQuerySQLDatabaseTool, sql_db_query_checker는 로컬 검사로 바꾼 툴킷"""
+
+    def get_tools(self):
+        tools = super().get_tools()
+        for index, tool in enumerate(tools):
+            if isinstance(tool, QuerySQLDatabaseTool):
+                tools[index] = CapturingQuerySQLDatabaseTool(
+                    db=self.db, description=tool.description)
+            elif isinstance(tool, QuerySQLCheckerTool):
+                tools[index] = LocalQueryCheckerTool(db=self.db)
+        return tools
+
+
+class SeededSQLDatabaseToolkit(CapturingSQLDatabaseToolkit):
+    """sql_db_list_tables를 뺀 툴킷 (관련 테이블 스키마는 프롬프트에 미리 넣음)"""
+
+    def get_tools(self):
+        return [tool for tool in super().get_tools()
+                if not isinstance(tool, ListSQLDatabaseTool)]
+
+
+# 미리 조회한 스키마 안내 ({schema}는 질문마다 invoke 입력으로 전달)
+SEEDED_SCHEMA_PROMPT = """
+The schema of the tables relevant to the question has already been retrieved for you:
+
+{schema}
+
+Do not call sql_db_list_tables. Only call sql_db_schema if a table you need is missing above.
+"""
+
+SEEDED_REACT_SUFFIX = """Begin!
+
+Question: {input}
+Thought: I already have the schema of the relevant tables, so I should write the query and run it with sql_db_query.
+{agent_scratchpad}"""
+
+
+def create_seeded_sql_agent(llm, db, agent_type, **kwargs):
+    """
+    프롬프트에 스키마를 미리 넣는 SQL Agent
+    invoke 입력: {"input": 질문, "schema": seeded_schema(db, 질문)}
+    """
+    from langchain.agents.mrkl import prompt as react_prompt
+    from langchain_community.agent_toolkits import create_sql_agent
+    from langchain_community.agent_toolkits.sql.prompt import SQL_PREFIX
+    from langchain_core.prompts import (
+        ChatPromptTemplate, MessagesPlaceholder, PromptTemplate)
+
+    if agent_type == 'zero-shot-react-description':
+        prompt = PromptTemplate.from_template("\n\n".join([
+            SQL_PREFIX + SEEDED_SCHEMA_PROMPT, "{tools}",
+            react_prompt.FORMAT_INSTRUCTIONS, SEEDED_REACT_SUFFIX]))
+    else:
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", SQL_PREFIX + SEEDED_SCHEMA_PROMPT),
+            ("human", "{input}"),
+            MessagesPlaceholder(variable_name="agent_scratchpad"),
+        ])
+
+    return create_sql_agent(
+        llm=llm,
+        toolkit=SeededSQLDatabaseToolkit(db=db, llm=llm),
+        agent_type=agent_type,
+        prompt=prompt,
+        **kwargs
+    )
+
+
+def seeded_schema(db, question):
+    """질문 관련 테이블만 포함한 스키마 (스키마 캐시 사용)"""
+    snapshot = schema_cache.get_snapshot(db)
+    schema_info, tables = build_pruned_schema(snapshot, question)
+    print(f"🗂️ Agent 프롬프트 스키마: {len(tables)}/{len(snapshot.table_names)}개 테이블 {tables}")
+    return schema_info
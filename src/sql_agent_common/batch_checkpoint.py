@@ -0,0 +1,139 @@
+"""
+다중 질문 배치 체크포인트
+질문별 처리 결과를 완료되는 즉시 SQLite에 저장해, 처리 도중 오류나 프로세스 종료로 중단돼도
+같은 배치 ID로 다시 실행하면 완료된 질문은 건너뛰고 나머지만 처리
+- 배치 처리가 끝나면 성공/실패와 관계없이 삭제 (다시 실행하면 최신 데이터로 처음부터 처리,
+  체크포인트는 중단된 배치를 재개할 때만 사용)
+- 배치 ID 기본값은 질문 목록의 해시 (같은 질문 목록이면 같은 배치)
+- SQL이 실행된 결과만 저장 (오류/SQL 없음은 다시 시도)
+- 유지 시간(BATCH_CHECKPOINT_TTL_SEC)이 지난 결과는 사용하지 않음 (데이터 변경 반영)
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+
+def make_batch_id(questions):
+    """질문 목록 해시 (앞뒤 공백만 무시, 순서가 다르면 다른 배치)"""
+    digest = hashlib.sha256(
+        '\n'.join(question.strip() for question in questions).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+class BatchCheckpoint:
+    """배치 ID + 질문 위치별 처리 결과 저장소 (SQLite)"""
+
+    def __init__(self, path, ttl=86400.0):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_disabled = False
+
+    @property
+    def enabled(self):
+        return self.ttl > 0 and not self._disk_disabled
+
+    def _connection(self):
+        """SQLite 연결 (첫 사용 시 생성, 실패하면 체크포인트 없이 동작)"""
+        if self._conn is not None or self._disk_disabled:
+            return self._conn
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS batch_results (
+                    batch_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    record BLOB NOT NULL,
+                    completed_at REAL NOT NULL,
+                    PRIMARY KEY (batch_id, position)
+                )""")
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"⚠️ 배치 체크포인트 파일을 열 수 없어 체크포인트 없이 실행합니다: {e}")
+            self._disk_disabled = True
+        return self._conn
+
+    def load(self, batch_id, questions):
+        """
+        완료된 결과 {위치: 결과 dict} (질문이 바뀐 위치와 만료된 결과는 제외)
+        파일이 잠겨 있거나 손상되어 읽을 수 없으면 체크포인트가 없는 것으로 처리
+        """
+        if not self.enabled:
+            return {}
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return {}
+            try:
+                # 만료된 결과는 읽을 때 정리
+                conn.execute("DELETE FROM batch_results WHERE completed_at < ?",
+                             (time.time() - self.ttl,))
+                conn.commit()
+                rows = conn.execute(
+                    "SELECT position, question, record FROM batch_results WHERE batch_id = ?",
+                    (batch_id,)).fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️ 체크포인트를 읽을 수 없어 처음부터 처리합니다: {e}")
+                return {}
+
+        completed = {}
+        for position, question, record in rows:
+            if position < len(questions) and questions[position] == question:
+                try:
+                    # 로컬 파일이므로 pickle 사용 (쿼리 결과의 날짜/숫자 타입 유지)
+                    completed[position] = {**pickle.loads(record), 'sql_events': []}
+                except Exception as e:
+                    # 손상된 결과는 건너뛰고 다시 처리
+                    print(f"⚠️ 체크포인트 결과를 읽을 수 없어 다시 처리합니다 "
+                          f"(질문 {position + 1}): {e}")
+        return completed
+
+    def save(self, batch_id, position, question, record):
+        """질문 하나의 처리 결과 저장 (SQL이 실행된 결과만)"""
+        if not self.enabled or not record.get('sql_query'):
+            return
+        # 실행 기록(sql_events)은 쿼리 결과와 중복되므로 저장하지 않음
+        stored = {key: value for key, value in record.items() if key != 'sql_events'}
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO batch_results VALUES (?, ?, ?, ?, ?)",
+                    (batch_id, position, question, pickle.dumps(stored), time.time()))
+                conn.commit()
+            except sqlite3.Error as e:
+                # 저장 실패가 배치 처리를 중단시키지 않도록 함
+                print(f"⚠️ 체크포인트 저장 실패 (질문 {position + 1}): {e}")
+
+    def clear(self, batch_id):
+        """배치 처리가 끝나면 삭제 (체크포인트는 중단된 배치 재개에만 사용)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute("DELETE FROM batch_results WHERE batch_id = ?", (batch_id,))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ 체크포인트 삭제 실패 (배치 {batch_id}): {e}")
+
+
+# 프로세스 전역 인스턴스
+batch_checkpoint = BatchCheckpoint(
+    path=os.getenv('BATCH_CHECKPOINT_PATH',
+                   os.path.join('.cache', 'batch_checkpoints.sqlite3')),
+    ttl=float(os.getenv('BATCH_CHECKPOINT_TTL_SEC', '86400'))
+)
@@ -0,0 +1,232 @@
+"""
+실행 전 SELECT 비용 검사
+EXPLAIN FORMAT=JSON으로 예상 검사 행 수를 계산해 예산(COST_GUARD_MAX_ROWS)을 넘으면
+거부하거나 LIMIT을 붙이고, 실행 SQL에는 MAX_EXECUTION_TIME 옵티마이저 힌트를 추가
+- 중첩 루프 조인은 앞 테이블까지의 출력 행 수 x 테이블별 스캔 행 수로 누적
+- 정렬(filesort)/임시 테이블/그룹/중복 제거/UNION/집계가 있으면 LIMIT을 붙여도
+  검사 행 수가 줄지 않으므로 예산 초과 시 거부
+- 같은 쿼리(정규화 SQL 기준, 리터럴 포함)는 EXPLAIN 결과를 재사용 (스키마가 바뀌면 초기화)
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import text
+
+from sql_agent_common.schema_cache import schema_cache
+from sql_agent_common.sql_tokens import add_limit, add_optimizer_hint, parse_sql
+
+# 예상 검사 행 수 예산 (0이면 EXPLAIN 검사 안 함)
+COST_GUARD_MAX_ROWS = int(os.getenv('COST_GUARD_MAX_ROWS', '1000000'))
+# 예산 초과 시 동작: limit(가능하면 LIMIT 추가, 아니면 거부) / reject(항상 거부)
+COST_GUARD_MODE = os.getenv('COST_GUARD_MODE', 'limit').strip().lower()
+COST_GUARD_AUTO_LIMIT = int(os.getenv('COST_GUARD_AUTO_LIMIT', '1000'))
+# 쿼리별 MAX_EXECUTION_TIME 힌트(ms), 0이면 힌트 없음
+COST_GUARD_MAX_EXECUTION_MS = int(os.getenv('COST_GUARD_MAX_EXECUTION_MS', '10000'))
+
+# 전체 입력을 읽어야 결과를 낼 수 있는 실행 계획 요소
+_BLOCKING_KEYS = ('grouping_operation', 'duplicates_removal', 'union_result',
+                  'windowing')
+
+
+class QueryRejected(Exception):
+    """예상 비용이 예산을 넘어 실행하지 않은 쿼리"""
+
+    def __init__(self, reason, estimated_rows=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.estimated_rows = estimated_rows
+
+
+def rejection_feedback(error):
+    """거부된 쿼리를 LLM이 고칠 수 있도록 알려주는 영어 메시지"""
+    return (f"Query rejected before execution because it is too expensive "
+            f"(about {error.estimated_rows:,.0f} rows would be examined). "
+            f"Add selective WHERE conditions, join on indexed keys, "
+            f"or aggregate over fewer rows.")
+
+
+@dataclass
+class GuardDecision:
+    """검사 결과 - sql: 실제로 실행할 SQL (힌트/LIMIT 반영)"""
+    sql: str
+    estimated_rows: float = None  # 검사를 생략했거나 추정할 수 없으면 None
+    limited: bool = False
+    limited_reason: str = None  # LIMIT을 추가한 경우 사유 (결과가 전체가 아닐 수 있음)
+
+
+def _estimate_table(table, loops):
+    """테이블 스캔 행 수 x 반복 횟수 + 파생 테이블/서브쿼리"""
+    rows = loops * float(table.get('rows_examined_per_scan') or 0)
+    nested = {key: value for key, value in table.items()
+              if isinstance(value, (dict, list))}
+    return rows + _estimate(nested, 1.0)
+
+
+def _estimate(node, loops=1.0):
+    if isinstance(node, list):
+        return sum(_estimate(item, loops) for item in node)
+    if not isinstance(node, dict):
+        return 0.0
+
+    total = 0.0
+    for key, value in node.items():
+        if key == 'nested_loop':
+            prefix = loops
+            for item in value:
+                table = item.get('table', {})
+                total += _estimate_table(table, prefix)
+                # rows_produced_per_join은 이 테이블까지 조인한 누적 출력 행 수
+                produced = table.get('rows_produced_per_join')
+                prefix = (loops * float(produced) if produced is not None
+                          else prefix * float(table.get('rows_examined_per_scan') or 0))
+        elif key == 'table':
+            total += _estimate_table(value, loops)
+        elif isinstance(value, (dict, list)):
+            total += _estimate(value, loops)
+    return total
+
+
+def estimate_rows_examined(plan):
+    """EXPLAIN FORMAT=JSON 결과(dict)의 예상 검사 행 수"""
+    return _estimate(plan)
+
+
+def is_streaming_plan(plan):
+    """LIMIT에 도달하면 실행을 멈출 수 있는 계획인지 (정렬/그룹/임시 테이블 없음)"""
+    if isinstance(plan, list):
+        return all(is_streaming_plan(item) for item in plan)
+    if not isinstance(plan, dict):
+        return True
+    if plan.get('using_filesort') or plan.get('using_temporary_table'):
+        return False
+    if any(key in plan for key in _BLOCKING_KEYS):
+        return False
+    return all(is_streaming_plan(value) for value in plan.values()
+               if isinstance(value, (dict, list)))
+
+
+def add_execution_hint(sql_query, max_execution_ms=COST_GUARD_MAX_EXECUTION_MS):
+    """최상위 SELECT 바로 뒤에 /*+ MAX_EXECUTION_TIME(ms) */ 힌트 추가"""
+    if max_execution_ms <= 0:
+        return sql_query
+    return add_optimizer_hint(sql_query, f"MAX_EXECUTION_TIME({max_execution_ms})")
+
+
+class CostGuard:
+    """EXPLAIN 기반 실행 전 비용 검사"""
+
+    def __init__(self, max_rows=COST_GUARD_MAX_ROWS, mode=COST_GUARD_MODE,
+                 auto_limit=COST_GUARD_AUTO_LIMIT,
+                 max_execution_ms=COST_GUARD_MAX_EXECUTION_MS, max_plans=512):
+        self.max_rows = max_rows
+        self.mode = mode
+        self.auto_limit = auto_limit
+        self.max_execution_ms = max_execution_ms
+        self.max_plans = max_plans
+        self._plans = OrderedDict()  # (DB URL, 정규화 SQL) -> (예상 검사 행 수, 스트리밍 여부)
+        self._lock = threading.Lock()
+        self.stats = {'checked': 0, 'plan_reused': 0, 'rejected': 0,
+                      'limited': 0, 'unknown': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def explain(self, db, sql_query):
+        """EXPLAIN FORMAT=JSON 실행 계획 (dict)"""
+        with db._engine.connect() as conn:
+            row = conn.execute(text(f"EXPLAIN FORMAT=JSON {sql_query}")).fetchone()
+        return json.loads(row[0])
+
+    def plan_summary(self, db, parsed):
+        """
+        (예상 검사 행 수, 스트리밍 가능 여부) - 같은 쿼리면 이전 EXPLAIN 결과 재사용
+        리터럴에 따라 예상 행 수가 달라지므로 지문이 아닌 정규화 SQL(리터럴 포함)을 키로 사용
+        """
+        key = (str(db._engine.url), parsed.normalized)
+        with self._lock:
+            summary = self._plans.get(key)
+            if summary is not None:
+                self._plans.move_to_end(key)
+                self.stats['plan_reused'] += 1
+                return summary
+
+        plan = self.explain(db, parsed.sql)
+        summary = (estimate_rows_examined(plan), is_streaming_plan(plan))
+        with self._lock:
+            self._plans[key] = summary
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return summary
+
+    def _over_budget(self, parsed, estimated, streaming):
+        """예산 초과 쿼리 처리 - 반환: (실행할 SQL, LIMIT 추가 여부)"""
+        reason = (f"예상 검사 행 수 {estimated:,.0f}행이 "
+                  f"예산 {self.max_rows:,}행을 초과합니다")
+        if self.mode != 'limit':
+            raise QueryRejected(reason, estimated)
+
+        # 집계/정렬/그룹이 있으면 LIMIT을 붙여도 모든 행을 읽어야 함
+        if parsed.has_aggregate or not streaming:
+            raise QueryRejected(
+                f"{reason} (정렬/집계/그룹이 있어 LIMIT으로 줄일 수 없음)", estimated)
+
+        if parsed.has_limit:
+            # 이미 LIMIT이 있고 스트리밍 계획이면 LIMIT에 도달하는 즉시 멈춤
+            return parsed.sql, False
+        return add_limit(parsed.sql, self.auto_limit), True
+
+    def check(self, db, sql_query):
+        """
+        실행 전 검사 - 반환: GuardDecision
+        예산을 넘고 LIMIT으로 줄일 수 없으면 QueryRejected 발생
+        SELECT가 아닌 쿼리는 그대로 통과
+        """
+        parsed = parse_sql(sql_query)
+        if not parsed.is_read_only:
+            return GuardDecision(sql=sql_query)
+
+        sql_query = parsed.sql
+        estimated = None
+        limited = False
+        limited_reason = None
+        if self.max_rows > 0:
+            self._count('checked')
+            try:
+                estimated, streaming = self.plan_summary(db, parsed)
+            except (ValueError, TypeError) as e:
+                # 실행 계획을 해석할 수 없으면 실행 시간 제한에만 의존
+                print(f"⚠️ 실행 계획 해석 실패, 비용 검사 생략: {e}")
+                self._count('unknown')
+
+            if estimated is not None and estimated > self.max_rows:
+                try:
+                    sql_query, limited = self._over_budget(parsed, estimated, streaming)
+                except QueryRejected as e:
+                    self._count('rejected')
+                    print(f"🛑 쿼리 거부: {e.reason}")
+                    raise
+                if limited:
+                    self._count('limited')
+                    limited_reason = (f"예상 검사 행 수 {estimated:,.0f}행이 예산 "
+                                      f"{self.max_rows:,}행을 초과해 상위 {self.auto_limit}행만 "
+                                      f"조회했습니다")
+                    print(f"✂️ {limited_reason}")
+
+        return GuardDecision(sql=add_execution_hint(sql_query, self.max_execution_ms),
+                             estimated_rows=estimated, limited=limited,
+                             limited_reason=limited_reason)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+
+# 프로세스 전역 인스턴스
+cost_guard = CostGuard()
+
+# 인덱스/컬럼이 바뀌면 실행 계획도 달라지므로 재사용하던 EXPLAIN 결과 삭제
+schema_cache.add_listener(lambda old, new: cost_guard.clear())
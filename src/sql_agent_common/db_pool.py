@@ -0,0 +1,217 @@
+"""
+프로세스 전역 DB 엔진 / SQLDatabase
+모든 에이전트 모듈이 같은 커넥션 풀을 공유
+- 풀 크기/오버플로/대기 시간/재활용 주기/pre-ping을 환경 변수로 조정
+- 연결 시 세션 MAX_EXECUTION_TIME으로 SELECT 실행 시간 제한
+- 커넥션 대기 시간과 풀 포화도 지표 제공
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT_SEC = float(os.getenv('DB_POOL_TIMEOUT_SEC', '30'))
+# MySQL wait_timeout(기본 8시간)이나 프록시 idle timeout보다 짧게
+DB_POOL_RECYCLE_SEC = int(os.getenv('DB_POOL_RECYCLE_SEC', '1800'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no')
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '30000'))
+# 비동기 파이프라인용 드라이버 (예: aiomysql) - 비어 있으면 사용 안 함
+ASYNC_DB_DRIVER = os.getenv('ASYNC_DB_DRIVER', '').strip()
+
+# 이 시간보다 오래 기다린 체크아웃은 대기 발생으로 집계
+SLOW_CHECKOUT_SEC = 0.01
+
+
+def build_db_url(driver='pymysql'):
+    """.env의 DB_* 값으로 접속 URL 생성 (문자셋 utf8mb4 고정)"""
+    port = os.getenv('DB_PORT')
+    return URL.create(
+        f"mysql+{driver}",
+        username=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        host=os.getenv('DB_HOST'),
+        port=int(port) if port else None,
+        database=os.getenv('DB_NAME'),
+        query={'charset': 'utf8mb4'},
+    )
+
+
+class PoolMetrics:
+    """커넥션 체크아웃 지표 (풀이 재생성돼도 누적)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.slow_checkouts = 0
+            self.timeouts = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.peak_checked_out = 0
+
+    def record(self, wait_time, checked_out, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait += wait_time
+            self.max_wait = max(self.max_wait, wait_time)
+            if wait_time >= SLOW_CHECKOUT_SEC:
+                self.slow_checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'slow_checkouts': self.slow_checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': (self.total_wait / self.checkouts * 1000
+                                if self.checkouts else 0.0),
+                'max_wait_ms': self.max_wait * 1000,
+                'peak_checked_out': self.peak_checked_out,
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """체크아웃 대기 시간을 기록하는 QueuePool"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record(time.perf_counter() - started,
+                                self.checkedout(), timed_out=True)
+            raise
+        pool_metrics.record(time.perf_counter() - started, self.checkedout())
+        return connection
+
+
+def _set_statement_timeout(dbapi_connection, connection_record):
+    """세션 단위 SELECT 실행 시간 제한 (MySQL 5.7.8+)"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"SET SESSION MAX_EXECUTION_TIME = {DB_STATEMENT_TIMEOUT_MS}")
+    except Exception as e:
+        print(f"⚠️ MAX_EXECUTION_TIME 설정 실패 (실행 시간 제한 없음): {e}")
+    finally:
+        cursor.close()
+
+
+def _pool_options():
+    return {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT_SEC,
+        'pool_recycle': DB_POOL_RECYCLE_SEC,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+
+
+_lock = threading.Lock()
+_engine = None
+_database = None
+_async_engine = None
+
+
+def get_engine():
+    """프로세스 전역 동기 엔진"""
+    global _engine
+    with _lock:
+        if _engine is None:
+            engine = create_engine(build_db_url(), poolclass=InstrumentedQueuePool,
+                                   **_pool_options())
+            if DB_STATEMENT_TIMEOUT_MS > 0:
+                event.listen(engine, 'connect', _set_statement_timeout)
+            _engine = engine
+        return _engine
+
+
+def get_database():
+    """프로세스 전역 SQLDatabase (모든 모듈이 같은 커넥션 풀 사용)"""
+    global _database
+    engine = get_engine()
+    with _lock:
+        if _database is None:
+            from langchain_community.utilities import SQLDatabase
+
+            _database = SQLDatabase(engine)
+        return _database
+
+
+def get_async_engine():
+    """비동기 엔진 (ASYNC_DB_DRIVER 미설정 시 None)"""
+    global _async_engine
+    if not ASYNC_DB_DRIVER:
+        return None
+    with _lock:
+        if _async_engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            engine = create_async_engine(build_db_url(ASYNC_DB_DRIVER),
+                                         **_pool_options())
+            if DB_STATEMENT_TIMEOUT_MS > 0:
+                event.listen(engine.sync_engine, 'connect', _set_statement_timeout)
+            _async_engine = engine
+            print(f"⚡ 비동기 DB 드라이버 사용: {ASYNC_DB_DRIVER}")
+        return _async_engine
+
+
+def get_pool_metrics():
+    """커넥션 풀 상태 + 체크아웃 지표 (체크아웃 대기 지표는 동기 엔진만 집계)"""
+    metrics = pool_metrics.snapshot()
+    if _async_engine is not None:
+        # 비동기 엔진은 InstrumentedQueuePool을 쓸 수 없어 현재 사용량만 보고
+        async_pool = _async_engine.pool
+        metrics.update({
+            'async_pool_size': async_pool.size(),
+            'async_checked_out': async_pool.checkedout(),
+            'async_overflow': async_pool.overflow(),
+        })
+    if _engine is not None:
+        pool = _engine.pool
+        capacity = pool.size() + max(DB_MAX_OVERFLOW, 0)
+        checked_out = pool.checkedout()
+        metrics.update({
+            'pool_size': pool.size(),
+            'max_overflow': DB_MAX_OVERFLOW,
+            'checked_out': checked_out,
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'saturation': checked_out / capacity if capacity else 0.0,
+            'peak_saturation': (metrics['peak_checked_out'] / capacity
+                                if capacity else 0.0),
+        })
+    return metrics
+
+
+def format_pool_metrics():
+    """사람이 읽기 쉬운 풀 지표 요약"""
+    m = get_pool_metrics()
+    parts = []
+    if 'pool_size' in m:
+        parts.append(
+            f"커넥션 {m['checked_out']}/{m['pool_size'] + m['max_overflow']} 사용 중 "
+            f"(포화도 {m['saturation']:.0%}, 최고 {m['peak_saturation']:.0%}), "
+            f"체크아웃 {m['checkouts']}회 평균 대기 {m['avg_wait_ms']:.1f}ms / "
+            f"최대 {m['max_wait_ms']:.1f}ms, 대기 발생 {m['slow_checkouts']}회, "
+            f"타임아웃 {m['timeouts']}회")
+    if 'async_pool_size' in m:
+        parts.append(
+            f"비동기 커넥션 {m['async_checked_out']}/{m['async_pool_size'] + DB_MAX_OVERFLOW} "
+            f"사용 중 (대기 시간 미집계)")
+    return " | ".join(parts) if parts else "커넥션 풀 미사용"
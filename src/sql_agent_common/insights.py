@@ -0,0 +1,244 @@
+"""
+차트 데이터 인사이트 (LLM 호출 없이 pandas/NumPy로 계산)
+- 상위/하위 항목과 상위 k개 집중도
+- z-score / IQR 기준 이상치
+- 날짜(또는 year/month) 컬럼이 있으면 기간별 증감
+결과는 대시보드의 분석 영역에 그대로 넣을 수 있는 한국어 목록(- ...) 문자열
+같은 데이터면 항상 같은 문장이 나오므로 차트마다 LLM을 부를 필요가 없음
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+TOP_K = 3
+Z_SCORE_THRESHOLD = 3.0
+IQR_FACTOR = 1.5
+# 이상치 판단에 필요한 최소 행 수
+MIN_ROWS_FOR_OUTLIERS = 5
+
+# 값이 아니라 기간을 나타내는 숫자 컬럼
+_PERIOD_COLUMNS = ('year', 'quarter', 'month', 'week', 'day')
+
+
+def _format_value(value):
+    value = float(value)
+    if np.isnan(value):
+        return "-"
+    return f"{value:,.0f}" if value.is_integer() else f"{value:,.2f}"
+
+
+def _format_pct(ratio):
+    return f"{ratio * 100:.1f}%"
+
+
+def _format_change(ratio):
+    return f"{ratio * 100:+.1f}%"
+
+
+def _is_id_column(name):
+    name = str(name).lower()
+    return name == 'id' or name.endswith('_id')
+
+
+def _as_datetime(series):
+    """날짜/시간 컬럼이면 datetime64 Series (MySQL DATE는 date 객체를 담은 object 컬럼)"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    if pd.api.types.is_object_dtype(series):
+        sample = series.dropna()
+        if not sample.empty and isinstance(sample.iloc[0], (datetime.date, datetime.datetime)):
+            return pd.to_datetime(series, errors='coerce')
+    return None
+
+
+class ChartColumns:
+    """인사이트 계산에 쓸 컬럼 선택 결과"""
+
+    def __init__(self, df):
+        self.labels = []  # 항목 이름 컬럼
+        self.measures = []  # 값 컬럼 (id/기간 컬럼 제외)
+        self.periods = []  # year/month 같은 기간 숫자 컬럼
+        self.date_column = None
+        self.dates = None
+
+        ids = []
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_bool_dtype(series):
+                self.labels.append(column)
+            elif pd.api.types.is_numeric_dtype(series):
+                if str(column).lower() in _PERIOD_COLUMNS:
+                    self.periods.append(column)
+                elif _is_id_column(column):
+                    ids.append(column)
+                else:
+                    self.measures.append(column)
+            else:
+                dates = _as_datetime(series)
+                if dates is not None:
+                    if self.date_column is None:
+                        self.date_column, self.dates = column, dates
+                else:
+                    self.labels.append(column)
+
+        # 차트와 같이 첫 번째 숫자 컬럼을 값으로 사용 (id만 있으면 id를 값으로)
+        if not self.measures:
+            self.measures = ids
+        self.value = self.measures[0] if self.measures else None
+
+    def item_names(self, df):
+        """항목 이름 (이름 컬럼이 2개면 '이름 성'처럼 합침)"""
+        if not self.labels:
+            return None
+        names = df[self.labels[0]].astype(str)
+        if len(self.labels) == 2:
+            names = names + ' ' + df[self.labels[1]].astype(str)
+        return names
+
+
+def _overview(values, value_name, row_count):
+    return (f"{row_count:,}행, '{value_name}' 합계 {_format_value(values.sum())} / "
+            f"평균 {_format_value(values.mean())} / 중앙값 {_format_value(values.median())} "
+            f"(범위 {_format_value(values.min())} ~ {_format_value(values.max())})")
+
+
+def _listed(names, values, index):
+    return ", ".join(f"{names[i]}({_format_value(values[i])})" for i in index)
+
+
+def _contributors(names, values, value_name):
+    """상위/하위 항목과 상위 k개 집중도"""
+    lines = []
+    k = min(TOP_K, len(values))
+    top = values.nlargest(k).index
+    lines.append(f"'{value_name}' 상위 항목: {_listed(names, values, top)}")
+    if len(values) > 2 * TOP_K:
+        bottom = values.nsmallest(TOP_K).index
+        lines.append(f"'{value_name}' 하위 항목: {_listed(names, values, bottom)}")
+
+    total = values.sum()
+    if len(values) > TOP_K and total > 0 and (values >= 0).all():
+        share = values[top].sum() / total
+        even_share = TOP_K / len(values)
+        verdict = ("소수 항목에 집중되어 있습니다" if share >= 2 * even_share
+                   else "비교적 고르게 분포되어 있습니다")
+        lines.append(f"상위 {TOP_K}개 항목이 전체 합계의 {_format_pct(share)}를 차지해 "
+                     f"(균등 분포라면 {_format_pct(even_share)}) {verdict}")
+    return lines
+
+
+def _outliers(names, values, value_name):
+    """z-score 또는 IQR 기준을 벗어나는 값"""
+    if len(values) < MIN_ROWS_FOR_OUTLIERS:
+        return []
+    array = values.to_numpy(dtype=float)
+    mean = np.nanmean(array)
+    std = np.nanstd(array)
+    q1, q3 = np.nanpercentile(array, [25, 75])
+    iqr = q3 - q1
+
+    z_scores = (array - mean) / std if std > 0 else np.zeros_like(array)
+    mask = ((np.abs(z_scores) > Z_SCORE_THRESHOLD)
+            | (array < q1 - IQR_FACTOR * iqr) | (array > q3 + IQR_FACTOR * iqr))
+    if not mask.any():
+        return [f"'{value_name}'에 z-score/IQR 기준 이상치는 없습니다"]
+
+    positions = np.flatnonzero(mask)
+    # 평균에서 먼 순서로 최대 TOP_K개만 표시
+    positions = positions[np.argsort(-np.abs(z_scores[positions]))][:TOP_K]
+    labels = names.to_numpy() if names is not None else [f"{p + 1}번째 행" for p in range(len(array))]
+    described = ", ".join(
+        f"{labels[p]}({_format_value(array[p])}, 평균 대비 {z_scores[p]:+.1f}σ)"
+        for p in positions)
+    return [f"'{value_name}' 이상치 {int(mask.sum())}개: {described}"]
+
+
+def _period_series(df, columns, values):
+    """기간별 합계 Series (기간 순 정렬), 기간 정보가 없으면 None"""
+    if columns.dates is not None:
+        dates = columns.dates
+        valid = dates.notna()
+        if valid.sum() < 2:
+            return None
+        span_days = (dates[valid].max() - dates[valid].min()).days
+        freq = 'M' if span_days >= 60 else 'D'
+        periods = dates[valid].dt.to_period(freq).astype(str)
+        return values[valid].groupby(periods).sum().sort_index()
+
+    if columns.periods:
+        # WITH ROLLUP/LEFT JOIN으로 생긴 기간 NULL 행(소계 등)은 제외
+        valid = df[columns.periods].notna().all(axis=1)
+        if valid.sum() < 2:
+            return None
+        keys = df.loc[valid, columns.periods].astype(int).astype(str)
+        # 2005, 7 -> '2005-07' (월/일은 두 자리로 맞춰 문자열 정렬이 기간 순서가 되도록)
+        labels = keys[columns.periods[0]]
+        for column in columns.periods[1:]:
+            labels = labels + '-' + keys[column].str.zfill(2)
+        return values[valid].groupby(labels).sum().sort_index()
+    return None
+
+
+def _period_changes(series, value_name):
+    """직전 기간 대비 증감, 가장 큰 증가/감소, 전체 기간 변화"""
+    if series is None or len(series) < 2:
+        return []
+    changes = series.pct_change().replace([np.inf, -np.inf], np.nan)
+
+    lines = []
+    last, previous = series.index[-1], series.index[-2]
+    line = f"최근 기간({last}) '{value_name}' {_format_value(series.iloc[-1])}"
+    if not np.isnan(changes.iloc[-1]):
+        line += f", 직전 기간({previous}) 대비 {_format_change(changes.iloc[-1])}"
+    lines.append(line)
+
+    valid = changes.dropna()
+    if len(valid) >= 2:
+        lines.append(f"가장 큰 증가: {valid.idxmax()} ({_format_change(valid.max())}), "
+                     f"가장 큰 감소: {valid.idxmin()} ({_format_change(valid.min())})")
+    if len(series) >= 3 and series.iloc[0] != 0:
+        overall = series.iloc[-1] / series.iloc[0] - 1
+        lines.append(f"전체 기간({series.index[0]} ~ {last}) 변화: {_format_change(overall)}")
+    return lines
+
+
+def _category_shares(df, column):
+    """숫자 값이 없을 때 항목별 빈도 비중"""
+    counts = df[column].astype(str).value_counts()
+    shares = counts / counts.sum()
+    top = ", ".join(f"{name}({_format_pct(share)})"
+                    for name, share in shares.head(TOP_K).items())
+    return [f"'{column}' {len(counts):,}종류 중 비중 상위: {top}"]
+
+
+def generate_insights(df):
+    """DataFrame에서 한국어 인사이트 목록 문자열 생성"""
+    if df is None or df.empty:
+        return "- 결과 데이터가 없습니다."
+
+    columns = ChartColumns(df)
+    lines = []
+
+    if columns.value is None:
+        lines.append(f"{len(df):,}행, 숫자 값 컬럼 없음")
+        if columns.labels:
+            lines += _category_shares(df, columns.labels[0])
+        if columns.dates is not None:
+            counts = pd.Series(1, index=df.index)
+            lines += _period_changes(_period_series(df, columns, counts), '행 수')
+        return "\n".join(f"- {line}" for line in lines)
+
+    value_name = columns.value
+    values = pd.to_numeric(df[value_name], errors='coerce')
+    names = columns.item_names(df)
+    lines.append(_overview(values, value_name, len(df)))
+
+    periods = _period_series(df, columns, values)
+    if periods is not None:
+        lines += _period_changes(periods, value_name)
+    elif names is not None and len(df) > 1:
+        lines += _contributors(names, values.dropna(), value_name)
+
+    lines += _outliers(names, values, value_name)
+    return "\n".join(f"- {line}" for line in lines)
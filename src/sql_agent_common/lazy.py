@@ -0,0 +1,34 @@
+"""
+지연 초기화 헬퍼
+LLM 클라이언트/DB 연결/Agent처럼 생성 비용이 큰 객체를 처음 사용할 때 만들기 위한 래퍼
+"""
+import threading
+
+
+class LazyResource:
+    """
+    factory()를 첫 get() 호출 시 한 번만 실행
+    생성에 실패하면 저장하지 않으므로 다음 호출에서 다시 시도
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        value = self._value
+        if value is None:
+            with self._lock:
+                value = self._value
+                if value is None:
+                    value = self._factory()
+                    self._value = value
+        return value
+
+    def is_ready(self):
+        return self._value is not None
+
+    def reset(self):
+        with self._lock:
+            self._value = None
@@ -0,0 +1,228 @@
+"""
+유사 질문 캐시 (MinHash + LSH)
+번역된 영어 질문의 토큰 shingle로 MinHash 서명을 만들고 LSH 밴드 버킷으로
+후보를 찾은 뒤, 유사도 임계값과 리터럴(숫자/고유명사/방향어/비교 표현) 및
+불용어를 뺀 질문 토큰 집합 일치를 확인해 이전에 생성한 SQL을 재사용
+(MinHash는 후보 검색용 - 컬럼명/값 하나만 바뀐 질문은 유사도가 높아도 재사용하지 않음)
+"""
+import hashlib
+import itertools
+import os
+import re
+import struct
+import threading
+from collections import Counter, OrderedDict
+
+from sql_agent_common.schema_cache import schema_cache
+
+_WORD_PATTERN = re.compile(r"[a-z0-9']+")
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)?')
+_QUOTED_PATTERN = re.compile(r"""["']([^"']+)["']""")
+_PROPER_NOUN_PATTERN = re.compile(r"(?<!^)(?<![.?!]\s)\b[A-Z][A-Za-z]+")
+
+# 같은 의미의 표현을 하나로 모음
+PHRASE_REWRITES = [
+    (re.compile(r'\b(?:how many|number of|total number of|count of)\b'), 'count'),
+    (re.compile(r'\bmovies?\b'), 'film'),
+    (re.compile(r'\bgenres?\b'), 'category'),
+]
+
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'be', 'there', 'of', 'in',
+    'on', 'for', 'to', 'me', 'us', 'please', 'show', 'list', 'give', 'tell',
+    'display', 'find', 'get', 'what', 'which', 'do', 'does', 'we', 'have',
+    'has', 'all', 'that', 'this', 'it', 'and', 'with', 'by', 'can', 'you',
+}
+
+
+def _stem(word):
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def question_terms(question):
+    """불용어를 제거하고 정규화한 질문 토큰 목록"""
+    text = question.lower()
+    for pattern, replacement in PHRASE_REWRITES:
+        text = pattern.sub(replacement, text)
+    return [_stem(word) for word in _WORD_PATTERN.findall(text)
+            if word not in STOPWORDS]
+
+
+def shingles(terms):
+    """단어 1-gram + 2-gram shingle 집합"""
+    result = set(terms)
+    result.update(f"{a} {b}" for a, b in zip(terms, terms[1:]))
+    return result
+
+
+def literal_signature(question, terms):
+    """
+    SQL 결과를 바꾸는 값들의 집합
+    숫자, 따옴표 문자열, 문장 중간의 대문자 단어(고유명사), 방향/집계/비교 표현과
+    불용어를 뺀 모든 질문 토큰 (테이블/컬럼명, 소문자 값 등 - 하나라도 다르면 다른 SQL)
+    """
+    literals = set(_NUMBER_PATTERN.findall(question))
+    literals.update(value.lower() for value in _QUOTED_PATTERN.findall(question))
+    literals.update(word.lower() for word in _PROPER_NOUN_PATTERN.findall(question))
+    literals.update(terms)
+    return frozenset(literals)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH 기반 유사 질문 -> SQL 인덱스"""
+
+    # 조회 시간 상한: 버킷당 스캔 수, 서명을 비교할 후보 수
+    MAX_BUCKET_SCAN = 128
+    MAX_CANDIDATES = 32
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=16,
+                 max_entries=20000):
+        if num_perm % bands:
+            raise ValueError("num_perm은 bands의 배수여야 합니다")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_entries = max_entries
+
+        self._unpack = struct.Struct(f'<{num_perm}I').unpack
+
+        self._entries = OrderedDict()  # entry_id -> entry dict
+        self._buckets = [dict() for _ in range(bands)]
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'rejected_literals': 0,
+                      'evictions': 0, 'invalidated': 0}
+
+    def signature(self, shingle_set):
+        """
+        MinHash 서명
+        shingle마다 SHAKE-128 출력을 num_perm개의 32비트 해시로 나눠 쓰고
+        위치별 최솟값을 취함
+        """
+        if not shingle_set:
+            return None
+        size = self.num_perm * 4
+        hashes = [self._unpack(hashlib.shake_128(s.encode('utf-8')).digest(size))
+                  for s in shingle_set]
+        return tuple(map(min, zip(*hashes)))
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [hash(signature[i * rows:(i + 1) * rows])
+                for i in range(self.bands)]
+
+    def _prepare(self, question):
+        terms = question_terms(question)
+        signature = self.signature(shingles(terms))
+        return signature, literal_signature(question, terms)
+
+    def lookup(self, question, query_type, fingerprint, model_id):
+        """
+        유사 질문의 SQL 검색
+        반환: (sql, 유사도, 원래 질문) 또는 None
+        """
+        if self.threshold <= 0:
+            return None
+        signature, literals = self._prepare(question)
+        if signature is None:
+            return None
+
+        context = (query_type, fingerprint, model_id)
+        with self._lock:
+            band_hits = Counter()
+            for band, key in enumerate(self._band_keys(signature)):
+                bucket = self._buckets[band].get(key, ())
+                band_hits.update(itertools.islice(bucket, self.MAX_BUCKET_SCAN))
+
+            best = None
+            literal_mismatch = False
+            for entry_id, _ in band_hits.most_common(self.MAX_CANDIDATES):
+                entry = self._entries[entry_id]
+                if entry['context'] != context:
+                    continue
+                similarity = sum(
+                    x == y for x, y in zip(signature, entry['signature'])
+                ) / self.num_perm
+                if similarity < self.threshold:
+                    continue
+                if entry['literals'] != literals:
+                    literal_mismatch = True
+                    continue
+                if best is None or similarity > best[0]:
+                    best = (similarity, entry_id)
+
+            if best is None:
+                self.stats['misses'] += 1
+                if literal_mismatch:
+                    self.stats['rejected_literals'] += 1
+                return None
+
+            similarity, entry_id = best
+            self._entries.move_to_end(entry_id)
+            entry = self._entries[entry_id]
+            self.stats['hits'] += 1
+            return entry['sql'], similarity, entry['question']
+
+    def add(self, question, query_type, fingerprint, model_id, sql_query):
+        """질문과 생성된 SQL 등록"""
+        if self.threshold <= 0:
+            return
+        signature, literals = self._prepare(question)
+        if signature is None:
+            return
+
+        band_keys = self._band_keys(signature)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                'question': question,
+                'context': (query_type, fingerprint, model_id),
+                'signature': signature,
+                'literals': literals,
+                'band_keys': band_keys,
+                'sql': sql_query,
+            }
+            for band, key in enumerate(band_keys):
+                self._buckets[band].setdefault(key, set()).add(entry_id)
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.stats['evictions'] += 1
+
+    def _remove(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        for band, key in enumerate(entry['band_keys']):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def invalidate_fingerprint(self, fingerprint):
+        """특정 스키마 지문으로 만든 항목 전체 삭제"""
+        with self._lock:
+            stale = [entry_id for entry_id, entry in self._entries.items()
+                     if entry['context'][1] == fingerprint]
+            for entry_id in stale:
+                self._remove(entry_id)
+            self.stats['invalidated'] += len(stale)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# 프로세스 전역 인스턴스
+near_duplicate_index = NearDuplicateIndex(
+    threshold=float(os.getenv('NEAR_DUP_THRESHOLD', '0.8')),
+    max_entries=int(os.getenv('NEAR_DUP_MAX_ENTRIES', '20000'))
+)
+
+schema_cache.add_listener(
+    lambda old, new: near_duplicate_index.invalidate_fingerprint(old.fingerprint))
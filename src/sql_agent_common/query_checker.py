@@ -0,0 +1,144 @@
+"""
+로컬 SQL 검사
+LLM으로 쿼리를 "다시 확인"하는 대신 MySQL EXPLAIN으로 문법/의미 오류를 찾고,
+MySQL 오류 코드를 스키마 캐시 정보가 포함된 구체적인 메시지로 변환
+- 1054 없는 컬럼 / 1052 모호한 컬럼 / 1055 GROUP BY 누락 / 1146 없는 테이블 / 1064 문법 오류
+- EXPLAIN 결과는 비용 검사(cost_guard)와 공유하므로 실행 시 다시 EXPLAIN하지 않음
+반환 메시지는 LLM이 쿼리를 고치는 데 쓰이므로 영어
+"""
+import difflib
+import re
+
+from sqlalchemy.exc import DBAPIError
+
+from sql_agent_common.cost_guard import cost_guard
+from sql_agent_common.schema_cache import schema_cache
+from sql_agent_common.sql_tokens import parse_sql, referenced_tables
+
+_UNKNOWN_COLUMN = re.compile(r"Unknown column '([^']+)' in '([^']+)'")
+_AMBIGUOUS_COLUMN = re.compile(r"Column '([^']+)' in (.+?) is ambiguous")
+_NONAGGREGATED_COLUMN = re.compile(r"nonaggregated column '([^']+)'")
+_MISSING_TABLE = re.compile(r"Table '([^']+)' doesn't exist")
+_SYNTAX_NEAR = re.compile(r"near '(.*)' at line (\d+)", re.DOTALL)
+
+
+def _error_code_and_message(error):
+    """pymysql 오류의 (코드, 메시지) - 코드를 알 수 없으면 None"""
+    args = getattr(error.orig, 'args', ())
+    if len(args) >= 2 and isinstance(args[0], int):
+        return args[0], str(args[1])
+    return None, str(error.orig)
+
+
+def _schema(db):
+    """스키마 스냅샷 (가져올 수 없으면 None - 힌트 없이 메시지만 반환)"""
+    try:
+        return schema_cache.get_snapshot(db)
+    except Exception:
+        return None
+
+
+def _query_columns(snapshot, parsed):
+    """쿼리가 참조하는 테이블 -> 컬럼 목록"""
+    tables = referenced_tables(parsed.sql, snapshot.table_names)
+    return {table: snapshot.columns.get(table, []) for table in snapshot.table_names
+            if table in tables}
+
+
+def _unknown_column(match, snapshot, parsed):
+    column, clause = match.group(1), match.group(2)
+    message = f"Unknown column `{column}` in the {clause}."
+    if snapshot is None:
+        return message
+    columns = _query_columns(snapshot, parsed)
+    name = column.split('.')[-1]
+    candidates = [f"{table}.{c}" for table, names in columns.items() for c in names]
+    close = difflib.get_close_matches(name, [c.split('.')[-1] for c in candidates], n=3)
+    if close:
+        matches = [c for c in candidates if c.split('.')[-1] in close]
+        message += f" Did you mean: {', '.join(matches)}?"
+    listed = "; ".join(f"{table}({', '.join(names)})" for table, names in columns.items())
+    if listed:
+        message += f" Columns of the referenced tables: {listed}"
+    return message
+
+
+def _ambiguous_column(match, snapshot, parsed):
+    column = match.group(1)
+    message = (f"Column `{column}` in the {match.group(2)} is ambiguous. "
+               f"Qualify it with a table alias, e.g. alias.{column}.")
+    if snapshot is not None:
+        owners = [table for table, names in _query_columns(snapshot, parsed).items()
+                  if column in names]
+        if owners:
+            message += f" It exists in: {', '.join(owners)}."
+    return message
+
+
+def _missing_group_by(match, snapshot, parsed):
+    column = match.group(1).split('.', 1)[-1]
+    return (f"Missing GROUP BY: `{column}` is selected without an aggregate function "
+            f"but is not in the GROUP BY clause. Add it to GROUP BY or wrap it in an "
+            f"aggregate such as MAX() or COUNT().")
+
+
+def _missing_table(match, snapshot, parsed):
+    table = match.group(1).split('.')[-1]
+    message = f"Table `{table}` does not exist."
+    if snapshot is not None:
+        close = difflib.get_close_matches(table, snapshot.table_names, n=3)
+        if close:
+            message += f" Did you mean: {', '.join(close)}?"
+        message += f" Available tables: {', '.join(snapshot.table_names)}"
+    return message
+
+
+def _syntax_error(match, snapshot, parsed):
+    near = match.group(1).strip()
+    if len(near) > 60:
+        near = near[:60] + '...'
+    return f"SQL syntax error near `{near}` (line {match.group(2)})."
+
+
+# MySQL 오류 코드 -> (메시지 패턴, 설명 함수)
+_ERROR_DESCRIPTIONS = {
+    1054: (_UNKNOWN_COLUMN, _unknown_column),
+    1052: (_AMBIGUOUS_COLUMN, _ambiguous_column),
+    1055: (_NONAGGREGATED_COLUMN, _missing_group_by),
+    1146: (_MISSING_TABLE, _missing_table),
+    1064: (_SYNTAX_NEAR, _syntax_error),
+}
+
+
+def describe_error(db, error, parsed):
+    """EXPLAIN 오류를 구체적인 메시지로 변환"""
+    code, message = _error_code_and_message(error)
+    pattern, describe = _ERROR_DESCRIPTIONS.get(code, (None, None))
+    match = pattern.search(message) if pattern else None
+    if match is None:
+        return f"Error: {message}"
+    return f"Error: {describe(match, _schema(db), parsed)}"
+
+
+def check_query(db, sql_query):
+    """
+    실행 전 검사 - 문제없으면 None, 문제가 있으면 "Error: ..." 메시지
+    SELECT 한 문장만 허용하며 EXPLAIN으로 테이블/컬럼/GROUP BY/문법 오류를 확인
+    """
+    parsed = parse_sql(sql_query)
+    if not parsed.sql:
+        return "Error: No SQL query was found."
+    if not parsed.is_read_only:
+        return f"Error: Only a single SELECT query is allowed, got {parsed.statement_type}."
+    if parsed.statement_count > 1:
+        return "Error: Only a single SELECT query is allowed, got multiple statements."
+
+    try:
+        # 성공한 EXPLAIN 결과는 비용 검사가 재사용 (같은 쿼리)
+        cost_guard.plan_summary(db, parsed)
+    except DBAPIError as e:
+        return describe_error(db, e, parsed)
+    except (ValueError, TypeError):
+        # 실행 계획 해석 실패는 쿼리 오류가 아님
+        pass
+    return None
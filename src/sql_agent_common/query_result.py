@@ -0,0 +1,230 @@
+"""
+구조화된 쿼리 결과
+db.run의 문자열 결과를 다시 파싱하지 않고, 커서에서 컬럼명과 값을 그대로 받아
+DataFrame/컬럼 배열로 변환
+max_rows를 지정하면 최상위 LIMIT이 없는 SELECT에 LIMIT max_rows+1을 붙여 서버도
+예산만큼만 보내고, 서버 사이드 커서(pymysql SSCursor)로 나눠 읽다가 행 예산을
+채우면 중단하므로, 쿼리가 매칭하는 행 수와 관계없이 메모리 사용량이 일정
+"""
+import asyncio
+import os
+from dataclasses import dataclass, field, replace
+from decimal import Decimal
+from typing import Optional
+
+from sqlalchemy import text
+
+from sql_agent_common.cost_guard import cost_guard
+from sql_agent_common.result_cache import result_cache
+from sql_agent_common.sql_tokens import add_limit, parse_sql
+
+# 서버 사이드 커서에서 한 번에 가져올 행 수
+FETCH_CHUNK_SIZE = 256
+# 차트용으로 읽을 최대 행 수 (서버 사이드 커서로 이만큼만 읽고 중단)
+CHART_MAX_ROWS = int(os.getenv('CHART_MAX_ROWS', '500'))
+
+
+def _unique_columns(names):
+    """JOIN 등으로 중복된 컬럼명에 번호를 붙여 구분 (name, name_2, ...)"""
+    seen = {}
+    columns = []
+    for name in names:
+        name = str(name)
+        count = seen.get(name, 0) + 1
+        seen[name] = count
+        columns.append(name if count == 1 else f"{name}_{count}")
+    return columns
+
+
+def _decimal_columns(rows, width):
+    """Decimal 값을 담은 컬럼 위치 (컬럼별 첫 non-NULL 값으로 판단)"""
+    decided = {}
+    for row in rows:
+        for index, value in enumerate(row):
+            if index not in decided and value is not None:
+                decided[index] = isinstance(value, Decimal)
+        if len(decided) == width:
+            break
+    return [index for index, is_decimal in decided.items() if is_decimal]
+
+
+def _convert_rows(rows, width):
+    """행을 튜플로 만들고 DECIMAL 값을 float로 변환"""
+    decimal_columns = _decimal_columns(rows, width)
+    if not decimal_columns:
+        return [tuple(row) for row in rows]
+
+    converted = []
+    for row in rows:
+        row = list(row)
+        for index in decimal_columns:
+            if row[index] is not None:
+                row[index] = float(row[index])
+        converted.append(tuple(row))
+    return converted
+
+
+@dataclass
+class QueryResult:
+    """
+    컬럼명 + 행 목록 (DECIMAL은 float로 변환됨, 캐시에서 공유되므로 수정 금지)
+    truncated: 행 예산(max_rows)을 넘는 행이 더 있어 잘렸는지 여부
+    limited_reason: 비용 검사가 LIMIT을 추가한 경우 사유 (결과가 전체가 아닐 수 있음)
+    """
+    columns: list
+    rows: list = field(default_factory=list)
+    truncated: bool = False
+    limited_reason: Optional[str] = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def empty(self):
+        return not self.rows
+
+    def column_arrays(self):
+        """컬럼명 -> 값 리스트"""
+        if not self.rows:
+            return {name: [] for name in self.columns}
+        return dict(zip(self.columns, map(list, zip(*self.rows))))
+
+    def to_dataframe(self):
+        import pandas as pd
+
+        return pd.DataFrame.from_records(self.rows, columns=self.columns)
+
+
+def _fetch_limited(fetchmany, max_rows):
+    """max_rows + 1행까지만 청크 단위로 읽고 (행, 잘림 여부) 반환"""
+    rows = []
+    while len(rows) <= max_rows:
+        chunk = fetchmany(min(FETCH_CHUNK_SIZE, max_rows + 1 - len(rows)))
+        if not chunk:
+            break
+        rows.extend(chunk)
+    truncated = len(rows) > max_rows
+    del rows[max_rows:]
+    return rows, truncated
+
+
+def _limit_rows(sql_query, max_rows):
+    """
+    최상위 LIMIT이 없는 SELECT에 LIMIT max_rows+1 추가 (잘림 여부 판단용 1행 포함)
+    SSCursor는 닫을 때 남은 행을 모두 읽어 버리므로, LIMIT이 없으면 MySQL이 전체 결과를 보냄
+    """
+    parsed = parse_sql(sql_query)
+    if not parsed.is_read_only or parsed.has_limit:
+        return sql_query
+    return add_limit(parsed.sql, max_rows + 1)
+
+
+def fetch_structured(db, sql_query, max_rows=None):
+    """
+    SQL을 실행해 QueryResult 반환
+    max_rows가 주어지면 서버 사이드 커서로 해당 행 수까지만 읽음
+    """
+    if max_rows is not None:
+        sql_query = _limit_rows(sql_query, max_rows)
+    with db._engine.connect() as conn:
+        if max_rows is not None:
+            conn = conn.execution_options(stream_results=True)
+        result = conn.execute(text(sql_query))
+        if not result.returns_rows:
+            return QueryResult(columns=[])
+        columns = _unique_columns(result.keys())
+
+        if max_rows is None:
+            rows, truncated = result.fetchall(), False
+        else:
+            rows, truncated = _fetch_limited(result.fetchmany, max_rows)
+            # 남은 행(LIMIT 추가 시 최대 1행)은 메모리에 쌓지 않고 버림
+            result.close()
+
+    return QueryResult(columns=columns, rows=_convert_rows(rows, len(columns)),
+                       truncated=truncated)
+
+
+async def afetch_structured(async_engine, sql_query, max_rows=None):
+    """비동기 엔진용 fetch_structured (max_rows가 있으면 스트리밍)"""
+    async with async_engine.connect() as conn:
+        if max_rows is None:
+            result = await conn.execute(text(sql_query))
+            if not result.returns_rows:
+                return QueryResult(columns=[])
+            columns = _unique_columns(result.keys())
+            rows, truncated = result.fetchall(), False
+        else:
+            result = await conn.stream(text(_limit_rows(sql_query, max_rows)))
+            columns = _unique_columns(result.keys())
+            rows = []
+            while len(rows) <= max_rows:
+                chunk = await result.fetchmany(
+                    min(FETCH_CHUNK_SIZE, max_rows + 1 - len(rows)))
+                if not chunk:
+                    break
+                rows.extend(chunk)
+            truncated = len(rows) > max_rows
+            del rows[max_rows:]
+            await result.close()
+
+    return QueryResult(columns=columns, rows=_convert_rows(rows, len(columns)),
+                       truncated=truncated)
+
+
+def _with_guard_decision(query_result, decision):
+    """비용 검사가 LIMIT을 추가했으면 결과에 사유를 남기고, LIMIT만큼 읽었으면 잘림으로 표시"""
+    if not decision.limited:
+        return query_result
+    return replace(query_result,
+                   truncated=query_result.truncated or len(query_result) >= cost_guard.auto_limit,
+                   limited_reason=decision.limited_reason)
+
+
+def cached_fetch_structured(db, sql_query, max_rows=None, guard=False):
+    """
+    결과 캐시를 거치는 fetch_structured
+    guard=True면 캐시에 없을 때 실행 전 비용 검사(cost_guard)를 거침
+    (예산 초과 시 QueryRejected 발생)
+    """
+    def execute(q):
+        if not guard:
+            return fetch_structured(db, q, max_rows)
+        decision = cost_guard.check(db, q)
+        return _with_guard_decision(fetch_structured(db, decision.sql, max_rows), decision)
+
+    return result_cache.call(db, sql_query, execute,
+                             variant=('structured', max_rows))
+
+
+def load_chart_data(db, sql_query, query_result=None, max_rows=CHART_MAX_ROWS):
+    """
+    차트용 데이터
+    Agent가 이미 실행한 결과가 잘리지 않았으면 그대로 쓰고, 없거나 잘렸으면 다시 조회
+    """
+    if query_result is not None and not query_result.truncated:
+        print(f"♻️ Agent 실행 결과 재사용 ({len(query_result)}행, 재조회 없음)")
+        return query_result
+
+    if query_result is not None:
+        print("🔄 Agent 결과가 잘려 있어 차트용으로 다시 조회합니다")
+    # SQL 쿼리 실행 (실행 전 비용 검사, 커서의 컬럼명/타입 그대로, 결과 캐시 사용)
+    query_result = cached_fetch_structured(db, sql_query, max_rows=max_rows, guard=True)
+    if query_result.truncated:
+        print(f"✂️ 결과가 많아 상위 {max_rows}행만 사용합니다")
+    return query_result
+
+
+async def acached_fetch_structured(db, async_engine, sql_query, max_rows=None,
+                                   guard=False):
+    """결과 캐시를 거치는 afetch_structured (캐시 항목은 동기 경로와 공유)"""
+    async def execute(q):
+        if not guard:
+            return await afetch_structured(async_engine, q, max_rows)
+        # EXPLAIN은 동기 엔진으로 실행
+        decision = await asyncio.to_thread(cost_guard.check, db, q)
+        return _with_guard_decision(
+            await afetch_structured(async_engine, decision.sql, max_rows), decision)
+
+    return await result_cache.arun(db, sql_query, execute,
+                                   variant=('structured', max_rows))
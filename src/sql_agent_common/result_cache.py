@@ -0,0 +1,245 @@
+"""
+쿼리 결과 캐시
+정규화된 SQL(sql_tokens.normalize_sql) -> db.run 결과를 저장하고, 쿼리가 읽는
+테이블별 변경 감지로 무효화
+- 변경 감지: information_schema.TABLES의 UPDATE_TIME + AUTO_INCREMENT 폴링
+  (테이블 스캔 없음, MySQL 8은 세션의 information_schema_stats_expiry를 0으로 설정해
+  통계 캐시 대신 최신 값을 읽음)
+- 캐시 조회/저장에 쓰이는 테이블만, 폴링 주기가 지난 경우에만 조회 (요청이 없으면 조회 없음)
+- 폴링 주기 사이의 변경은 최대 한 주기 동안 이전 결과가 반환될 수 있음
+- 메모리 사용량(추정 바이트) 기준 LRU 삭제
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import DBAPIError
+
+from sql_agent_common.schema_cache import schema_cache
+from sql_agent_common.sql_tokens import parse_sql, referenced_tables
+
+TABLE_VERSION_SQL = text("""
+SELECT TABLE_NAME, UPDATE_TIME, AUTO_INCREMENT, NOW()
+  FROM information_schema.TABLES
+ WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE())
+   AND TABLE_NAME IN :tables
+""").bindparams(bindparam('tables', expanding=True))
+
+STATS_EXPIRY_SQL = text("SET SESSION information_schema_stats_expiry = 0")
+
+# UPDATE_TIME은 초 단위이므로, 이 시간(초) 안에 바뀐 테이블은 같은 초의 추가 변경을
+# 놓칠 수 있어 다음 폴링에서 한 번 더 무효화
+RECENT_UPDATE_SEC = 1.0
+
+
+def _estimate_size(value):
+    """결과 객체의 대략적인 메모리 크기"""
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            _estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    if hasattr(value, '__dict__'):
+        return sys.getsizeof(value) + _estimate_size(vars(value))
+    return sys.getsizeof(value)
+
+
+class TableVersionTracker:
+    """테이블별 변경 토큰을 주기적으로 조회 (요청된 테이블만)"""
+
+    def __init__(self, poll_interval=5.0):
+        self.poll_interval = poll_interval
+        self._versions = {}  # 테이블명 -> (변경 토큰, 조회 시각)
+        self._polls = 0
+        self._stats_expiry = True  # information_schema_stats_expiry 지원 여부 (MySQL 8)
+        self._lock = threading.Lock()
+
+    def _poll(self, db, tables):
+        self._polls += 1
+        versions = {}
+        with db._engine.connect() as conn:
+            if self._stats_expiry:
+                try:
+                    conn.execute(STATS_EXPIRY_SQL)
+                except DBAPIError:
+                    # MySQL 5.7/MariaDB는 UPDATE_TIME을 캐시하지 않음
+                    conn.rollback()
+                    self._stats_expiry = False
+
+            for table, update_time, auto_increment, now in conn.execute(
+                    TABLE_VERSION_SQL, {'schema': db._schema, 'tables': tables}):
+                recent = (update_time is not None and now is not None
+                          and (now - update_time).total_seconds() < RECENT_UPDATE_SEC)
+                versions[table] = (update_time, auto_increment,
+                                   self._polls if recent else None)
+        return versions
+
+    def current_versions(self, db, tables):
+        """테이블별 변경 토큰 (폴링 주기 내에는 마지막 값 사용)"""
+        with self._lock:
+            now = time.monotonic()
+            stale = sorted(table for table in tables
+                           if table not in self._versions
+                           or now - self._versions[table][1] >= self.poll_interval)
+            if stale:
+                polled = self._poll(db, stale)
+                polled_at = time.monotonic()
+                for table in stale:
+                    self._versions[table] = (polled.get(table), polled_at)
+            return {table: self._versions[table][0] for table in tables}
+
+
+class ResultCache:
+    """SELECT 결과 캐시 (메모리 상한 LRU + 테이블 변경 무효화)"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, poll_interval=5.0):
+        self.max_bytes = max_bytes
+        self.poll_interval = poll_interval
+        self._trackers = {}  # DB URL -> TableVersionTracker
+        self._entries = OrderedDict()  # key -> (결과, 테이블, 버전, 크기)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidated': 0,
+                      'evictions': 0, 'uncacheable': 0}
+
+    def tracker(self, db):
+        with self._lock:
+            key = str(db._engine.url)
+            if key not in self._trackers:
+                self._trackers[key] = TableVersionTracker(self.poll_interval)
+            return self._trackers[key]
+
+    def _pop(self, key):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry[3]
+        return entry
+
+    def get(self, db, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+        result, tables, versions, _ = entry
+        current = self.tracker(db).current_versions(db, tables)
+        with self._lock:
+            if any(current.get(table) != versions.get(table) for table in tables):
+                if self._entries.get(key) is entry:
+                    self._pop(key)
+                self.stats['invalidated'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return result
+
+    def put(self, db, key, tables, result, versions):
+        size = _estimate_size(result)
+        with self._lock:
+            if size > self.max_bytes // 4:
+                self.stats['uncacheable'] += 1
+                return
+
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (result, tables, versions, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and self._entries:
+                self._pop(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    def _plan(self, db, sql_query, variant):
+        """캐시 가능한 쿼리면 (키, 의존 테이블), 아니면 None"""
+        parsed = parse_sql(sql_query)
+        if not parsed.is_read_only:
+            return None
+
+        tables = referenced_tables(
+            sql_query, schema_cache.get_snapshot(db).table_names)
+        if not tables:
+            # 의존 테이블을 알 수 없으면 무효화할 수 없으므로 캐시하지 않음
+            return None
+
+        key = (str(db._engine.url), parsed.normalized, variant)
+        return key, tables
+
+    def _versions_before_run(self, db, tables):
+        # 실행 전 토큰을 저장: 실행 중 변경이 있었다면 다음 폴링에서 무효화됨
+        return self.tracker(db).current_versions(db, tables)
+
+    def call(self, db, sql_query, execute, variant=()):
+        """
+        execute(sql_query) 결과를 캐시를 거쳐 반환
+        variant: 같은 SQL이라도 결과 형태가 다른 실행 방식을 구분하는 키
+        """
+        plan = self._plan(db, sql_query, variant)
+        if plan is None:
+            return execute(sql_query)
+
+        key, tables = plan
+        cached = self.get(db, key)
+        if cached is not None:
+            print("♻️ 쿼리 결과 캐시 사용")
+            return cached
+
+        versions = self._versions_before_run(db, tables)
+        result = execute(sql_query)
+        self.put(db, key, tables, result, versions)
+        return result
+
+    def run(self, db, sql_query, **kwargs):
+        """db.run과 같은 인터페이스로 캐시를 거쳐 실행"""
+        return self.call(db, sql_query, lambda q: db.run(q, **kwargs),
+                         variant=tuple(sorted(kwargs.items())))
+
+    async def arun(self, db, sql_query, execute, variant=('async',)):
+        """
+        비동기 실행 함수(execute(sql_query) 코루틴)를 캐시를 거쳐 호출
+        스키마/변경 토큰 조회는 동기 엔진을 쓰므로 스레드에서 실행
+        """
+        plan = await asyncio.to_thread(self._plan, db, sql_query, variant)
+        if plan is None:
+            return await execute(sql_query)
+
+        key, tables = plan
+        cached = await asyncio.to_thread(self.get, db, key)
+        if cached is not None:
+            print("♻️ 쿼리 결과 캐시 사용")
+            return cached
+
+        versions = await asyncio.to_thread(self._versions_before_run, db, tables)
+        result = await execute(sql_query)
+        self.put(db, key, tables, result, versions)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+# 프로세스 전역 인스턴스
+result_cache = ResultCache(
+    max_bytes=int(os.getenv('RESULT_CACHE_MAX_MB', '64')) * 1024 * 1024,
+    poll_interval=float(os.getenv('RESULT_CACHE_POLL_SEC', '5'))
+)
+
+# DDL이 바뀌면 결과 형태도 달라질 수 있으므로 전체 삭제
+schema_cache.add_listener(lambda old, new: result_cache.clear())
+
+
+def cached_run(db, sql_query, **kwargs):
+    """결과 캐시를 거치는 db.run"""
+    return result_cache.run(db, sql_query, **kwargs)
+
+
+async def acached_run(db, sql_query, execute):
+    """결과 캐시를 거치는 비동기 실행"""
+    return await result_cache.arun(db, sql_query, execute)
@@ -0,0 +1,181 @@
+"""
+프로세스 전역 스키마 캐시
+information_schema 체크섬(스키마 지문)으로 DDL 변경을 감지하고,
+변경이 있을 때만 get_table_info()를 다시 실행
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy import text
+
+# information_schema 기반 스키마 지문 - 컬럼/외래키 정의의 체크섬
+SCHEMA_FINGERPRINT_SQL = text("""
+SELECT
+    (SELECT CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS('|',
+            TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, COLUMN_TYPE,
+            IS_NULLABLE, COLUMN_KEY))), 0))
+       FROM information_schema.COLUMNS
+      WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE())) AS columns_checksum,
+    (SELECT CONCAT(COUNT(*), ':', COALESCE(SUM(CRC32(CONCAT_WS('|',
+            TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME,
+            REFERENCED_COLUMN_NAME))), 0))
+       FROM information_schema.KEY_COLUMN_USAGE
+      WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE())
+        AND REFERENCED_TABLE_NAME IS NOT NULL) AS foreign_keys_checksum
+""")
+
+SCHEMA_COLUMNS_SQL = text("""
+SELECT TABLE_NAME, COLUMN_NAME
+  FROM information_schema.COLUMNS
+ WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE())
+ ORDER BY TABLE_NAME, ORDINAL_POSITION
+""")
+
+SCHEMA_FOREIGN_KEYS_SQL = text("""
+SELECT TABLE_NAME, COLUMN_NAME, REFERENCED_TABLE_NAME, REFERENCED_COLUMN_NAME
+  FROM information_schema.KEY_COLUMN_USAGE
+ WHERE TABLE_SCHEMA = COALESCE(:schema, DATABASE())
+   AND REFERENCED_TABLE_NAME IS NOT NULL
+""")
+
+
+@dataclass
+class SchemaSnapshot:
+    """특정 스키마 지문 시점의 스키마 정보"""
+    fingerprint: str
+    version: int
+    table_names: list
+    table_info: dict  # 테이블명 -> get_table_info() 블록
+    columns: dict  # 테이블명 -> 컬럼명 리스트
+    foreign_keys: list  # (테이블, 컬럼, 참조 테이블, 참조 컬럼)
+    validated_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def full_info(self):
+        """전체 스키마 문자열 (get_table_info() 출력과 동일한 형식)"""
+        return self.info_for(self.table_names)
+
+    def info_for(self, table_names):
+        """지정한 테이블만 포함한 스키마 문자열"""
+        return "\n\n".join(self.table_info[name] for name in table_names)
+
+
+class SchemaCache:
+    """데이터베이스 URL별 스키마 스냅샷 캐시"""
+
+    def __init__(self, revalidate_interval=30.0):
+        self.revalidate_interval = revalidate_interval
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.stats = {'hits': 0, 'revalidations': 0, 'rebuilds': 0}
+
+    def add_listener(self, callback):
+        """DDL 변경 시 callback(old_snapshot, new_snapshot) 호출"""
+        self._listeners.append(callback)
+
+    @staticmethod
+    def _cache_key(db):
+        return str(db._engine.url)
+
+    @staticmethod
+    def compute_fingerprint(db):
+        """information_schema에서 스키마 지문 조회 (쿼리 1회)"""
+        with db._engine.connect() as conn:
+            row = conn.execute(SCHEMA_FINGERPRINT_SQL,
+                               {'schema': db._schema}).fetchone()
+        return f"{row[0]}/{row[1]}"
+
+    def _build_snapshot(self, db, fingerprint, previous):
+        """스키마 스냅샷 생성 - DDL 변경 시 메타데이터를 새로 반영"""
+        from langchain_community.utilities import SQLDatabase
+
+        source_db = db
+        if previous is not None:
+            # 기존 SQLDatabase는 생성 시점의 메타데이터를 들고 있으므로 새로 반영
+            source_db = SQLDatabase(
+                db._engine,
+                schema=db._schema,
+                sample_rows_in_table_info=db._sample_rows_in_table_info
+            )
+
+        table_names = list(source_db.get_usable_table_names())
+        table_info = {
+            name: source_db.get_table_info(table_names=[name]).strip()
+            for name in table_names
+        }
+        usable = set(table_names)
+        params = {'schema': db._schema}
+        with db._engine.connect() as conn:
+            columns = {name: [] for name in table_names}
+            for table, column in conn.execute(SCHEMA_COLUMNS_SQL, params):
+                if table in usable:
+                    columns[table].append(column)
+            foreign_keys = [
+                tuple(row) for row in conn.execute(SCHEMA_FOREIGN_KEYS_SQL, params)
+                if row[0] in usable and row[2] in usable
+            ]
+
+        version = previous.version + 1 if previous else 1
+        self.stats['rebuilds'] += 1
+        print(f"🗂️ 스키마 캐시 갱신 (v{version}, 테이블 {len(table_names)}개)")
+        return SchemaSnapshot(fingerprint, version, table_names, table_info,
+                              columns, foreign_keys)
+
+    def get_snapshot(self, db):
+        """
+        스키마 스냅샷 반환
+        재검증 주기 내에는 DB 조회 없이 캐시를 사용하고,
+        주기가 지나면 지문만 확인해 DDL이 바뀐 경우에만 재구성
+        """
+        key = self._cache_key(db)
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            now = time.monotonic()
+
+            if snapshot and now - snapshot.validated_at < self.revalidate_interval:
+                self.stats['hits'] += 1
+                return snapshot
+
+            fingerprint = self.compute_fingerprint(db)
+            self.stats['revalidations'] += 1
+
+            if snapshot and snapshot.fingerprint == fingerprint:
+                snapshot.validated_at = now
+                return snapshot
+
+            previous = snapshot
+            snapshot = self._build_snapshot(db, fingerprint, previous)
+            self._snapshots[key] = snapshot
+
+            if previous is not None:
+                for callback in self._listeners:
+                    try:
+                        callback(previous, snapshot)
+                    except Exception as e:
+                        print(f"⚠️ 스키마 변경 알림 처리 실패: {e}")
+            return snapshot
+
+    def get_table_info(self, db):
+        """캐시된 전체 스키마 문자열"""
+        return self.get_snapshot(db).full_info
+
+    def fingerprint(self, db):
+        """현재 스키마 지문"""
+        return self.get_snapshot(db).fingerprint
+
+    def invalidate(self, db=None):
+        """캐시 무효화 (db를 생략하면 전체)"""
+        with self._lock:
+            if db is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(self._cache_key(db), None)
+
+
+# 프로세스 전역 인스턴스
+schema_cache = SchemaCache(
+    revalidate_interval=float(os.getenv('SCHEMA_CACHE_REVALIDATE_SEC', '30'))
+)
@@ -0,0 +1,163 @@
+"""
+질문 기반 스키마 축소
+테이블명/컬럼명/외래키 관계로 만든 관련도 인덱스에서 질문과 관련된
+상위 k개 테이블만 골라 SQL 프롬프트용 스키마 블록을 생성
+"""
+import math
+import os
+import re
+import threading
+from collections import defaultdict
+
+# 질문 표현 -> 스키마 용어 (필요시 확장)
+TERM_SYNONYMS = {
+    'movie': 'film',
+    'movies': 'film',
+    'genre': 'category',
+    'revenue': 'payment',
+    'sale': 'payment',
+    'income': 'payment',
+    'paid': 'payment',
+    'pay': 'payment',
+    'rent': 'rental',
+    'rented': 'rental',
+    'borrow': 'rental',
+    'employee': 'staff',
+    'shop': 'store',
+    'branch': 'store',
+    'client': 'customer',
+    'stock': 'inventory',
+}
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+# 테이블명 일치가 컬럼명 일치보다 강한 신호
+TABLE_NAME_WEIGHT = 3.0
+COLUMN_NAME_WEIGHT = 1.0
+
+
+def _stem(word):
+    """간단한 복수형 정규화"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+        return word[:-1]
+    return word
+
+
+def tokenize(text):
+    """질문/식별자를 정규화된 용어 집합으로 변환"""
+    terms = set()
+    for word in _WORD_PATTERN.findall(text.lower().replace('_', ' ')):
+        if word not in TERM_SYNONYMS:
+            word = _stem(word)
+        terms.add(TERM_SYNONYMS.get(word, word))
+    return terms
+
+
+class SchemaIndex:
+    """스키마 스냅샷 하나에 대한 테이블 관련도 인덱스"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.table_terms = {}
+        self.column_terms = {}
+        document_frequency = defaultdict(int)
+
+        for table in snapshot.table_names:
+            self.table_terms[table] = tokenize(table)
+            column_terms = set()
+            for column in snapshot.columns.get(table, []):
+                column_terms |= tokenize(column)
+            self.column_terms[table] = column_terms
+            for term in self.table_terms[table] | column_terms:
+                document_frequency[term] += 1
+
+        total = max(len(snapshot.table_names), 1)
+        self.idf = {term: math.log(1 + total / df)
+                    for term, df in document_frequency.items()}
+
+        # 외래키 인접 정보 (양방향)
+        self.neighbors = defaultdict(set)
+        for table, _, ref_table, _ in snapshot.foreign_keys:
+            if table != ref_table:
+                self.neighbors[table].add(ref_table)
+                self.neighbors[ref_table].add(table)
+
+    def score(self, question):
+        """테이블별 관련도 점수"""
+        terms = tokenize(question)
+        scores = {}
+        for table in self.snapshot.table_names:
+            score = 0.0
+            for term in terms:
+                idf = self.idf.get(term)
+                if idf is None:
+                    continue
+                if term in self.table_terms[table]:
+                    score += TABLE_NAME_WEIGHT * idf
+                elif term in self.column_terms[table]:
+                    score += COLUMN_NAME_WEIGHT * idf
+            if score > 0:
+                scores[table] = score
+        return scores
+
+    def select_tables(self, question, top_k):
+        """
+        관련 테이블 선택
+        상위 k개 테이블에 더해, 선택된 두 테이블을 잇는 연결 테이블
+        (예: film - film_actor - actor)을 외래키 관계로 보충
+        """
+        scores = self.score(question)
+        if not scores:
+            return []
+
+        ranked = sorted(scores, key=lambda t: (-scores[t], t))
+        selected = ranked[:top_k]
+
+        bridges = set()
+        for i, left in enumerate(selected):
+            for right in selected[i + 1:]:
+                if right in self.neighbors[left]:
+                    continue
+                for candidate in self.neighbors[left] & self.neighbors[right]:
+                    if candidate not in selected:
+                        bridges.add(candidate)
+
+        chosen = set(selected) | bridges
+        # 원래 스키마 순서 유지
+        return [name for name in self.snapshot.table_names if name in chosen]
+
+
+_index_lock = threading.Lock()
+_indexes = {}
+
+
+def get_schema_index(snapshot):
+    """스냅샷 지문별 인덱스 (스키마가 바뀌면 새로 생성)"""
+    with _index_lock:
+        index = _indexes.get(snapshot.fingerprint)
+        if index is None or index.snapshot is not snapshot:
+            index = SchemaIndex(snapshot)
+            if len(_indexes) >= 8:
+                _indexes.clear()
+            _indexes[snapshot.fingerprint] = index
+        return index
+
+
+def build_pruned_schema(snapshot, question, top_k=None):
+    """
+    질문과 관련된 테이블만 포함한 스키마 문자열 반환
+    관련 테이블을 찾지 못하면 전체 스키마를 반환
+    """
+    if top_k is None:
+        top_k = int(os.getenv('SCHEMA_PRUNING_TOP_K', '5'))
+
+    if top_k <= 0 or len(snapshot.table_names) <= top_k:
+        return snapshot.full_info, list(snapshot.table_names)
+
+    tables = get_schema_index(snapshot).select_tables(question, top_k)
+    if not tables:
+        return snapshot.full_info, list(snapshot.table_names)
+
+    return snapshot.info_for(tables), tables
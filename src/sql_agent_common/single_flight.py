@@ -0,0 +1,94 @@
+"""
+동일 요청 병합 (single-flight)
+같은 키의 요청이 처리 중이면 새로 실행하지 않고 진행 중인 결과를 함께 받음
+concurrent.futures.Future를 공유하므로 스레드(동기)와 asyncio 호출자가 섞여도 동작
+"""
+import asyncio
+import re
+import threading
+import unicodedata
+from concurrent.futures import Future
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def question_key(namespace, question):
+    """
+    공백과 대소문자 차이만 무시한 질문 키
+    진행 중인 요청을 합치는 키이므로 조사/문장 부호는 그대로 비교 (다른 질문이 합쳐지지 않도록)
+    """
+    text = unicodedata.normalize('NFC', question).strip()
+    return (namespace, _WHITESPACE_PATTERN.sub(' ', text).casefold())
+
+
+class SingleFlight:
+    """키별로 하나의 실행만 진행하고 나머지 호출자는 그 결과를 공유"""
+
+    def __init__(self):
+        self._calls = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.stats = {'leaders': 0, 'followers': 0}
+
+    def begin(self, key):
+        """
+        반환: (future, leader 여부)
+        leader는 직접 실행한 뒤 반드시 finish를 호출해야 함
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats['followers'] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.stats['leaders'] += 1
+            return future, True
+
+    def finish(self, key, future, result=None, error=None):
+        """leader의 실행 결과(또는 예외)를 대기 중인 호출자에게 전달"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, **kwargs):
+        """동기 실행 - 같은 키가 처리 중이면 그 결과를 기다림"""
+        future, leader = self.begin(key)
+        if not leader:
+            print("🔗 같은 질문이 처리 중이어서 결과를 공유합니다")
+            return future.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    async def ado(self, key, coro_fn, *args, **kwargs):
+        """비동기 실행 - 같은 키가 처리 중이면 그 결과를 기다림"""
+        future, leader = self.begin(key)
+        if not leader:
+            print("🔗 같은 질문이 처리 중이어서 결과를 공유합니다")
+            return await self.await_future(future)
+
+        try:
+            result = await coro_fn(*args, **kwargs)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    @staticmethod
+    async def await_future(future):
+        """공유 Future 대기 (대기자가 취소돼도 공유 실행은 취소하지 않음)"""
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,92 @@
+"""
+자연어 -> SQL 결과 캐시
+(정규화된 영어 질문, 쿼리 타입, 스키마 지문, 모델 ID) -> 정리된 SQL
+TTL + LRU로 관리하며 스키마가 바뀌면 해당 지문의 항목을 자동 삭제
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from sql_agent_common.schema_cache import schema_cache
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_TRAILING_PUNCTUATION_PATTERN = re.compile(r'[\s?!.。]+$')
+
+
+def normalize_question(question):
+    """대소문자/공백/끝 문장부호 차이를 무시하도록 질문 정규화"""
+    question = _WHITESPACE_PATTERN.sub(' ', question.strip().lower())
+    return _TRAILING_PUNCTUATION_PATTERN.sub('', question)
+
+
+class SQLCache:
+    """생성된 SQL 캐시 (TTL + LRU)"""
+
+    def __init__(self, max_entries=2048, ttl=3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (sql, 저장 시각)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0,
+                      'evictions': 0, 'invalidated': 0}
+
+    @staticmethod
+    def make_key(question, query_type, fingerprint, model_id):
+        return (normalize_question(question), query_type, fingerprint, model_id)
+
+    def get(self, question, query_type, fingerprint, model_id):
+        """캐시된 SQL 반환 (없거나 만료되면 None)"""
+        key = self.make_key(question, query_type, fingerprint, model_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+
+            sql_query, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return sql_query
+
+    def put(self, question, query_type, fingerprint, model_id, sql_query):
+        """SQL 저장 (용량 초과 시 가장 오래 사용되지 않은 항목 삭제)"""
+        key = self.make_key(question, query_type, fingerprint, model_id)
+        with self._lock:
+            self._entries[key] = (sql_query, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def invalidate_fingerprint(self, fingerprint):
+        """특정 스키마 지문으로 만든 항목 전체 삭제"""
+        with self._lock:
+            stale = [key for key in self._entries if key[2] == fingerprint]
+            for key in stale:
+                del self._entries[key]
+            self.stats['invalidated'] += len(stale)
+        if stale:
+            print(f"🧹 스키마 변경으로 SQL 캐시 {len(stale)}개 삭제")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# 프로세스 전역 인스턴스
+sql_cache = SQLCache(
+    max_entries=int(os.getenv('SQL_CACHE_SIZE', '2048')),
+    ttl=float(os.getenv('SQL_CACHE_TTL_SEC', '3600'))
+)
+
+# DDL이 바뀌면 이전 스키마 기준으로 생성한 SQL 폐기
+schema_cache.add_listener(
+    lambda old, new: sql_cache.invalidate_fingerprint(old.fingerprint))
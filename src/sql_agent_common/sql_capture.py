@@ -0,0 +1,152 @@
+"""
+SQL Agent 실행 중 sql_db_query 도구 호출 기록
+stdout 캡처 + 정규식 대신 LangChain 콜백으로 요청별 도구 입력/출력을 구조화해서 저장
+핸들러는 invoke 호출마다 새로 만들어 config의 callbacks로 전달하므로 동시 실행에도 안전
+"""
+import ast
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from sql_agent_common.cost_guard import QueryRejected
+
+SQL_QUERY_TOOL = 'sql_db_query'
+
+# 도구 run_id -> 구조화된 결과 또는 QueryRejected (agent_tools의 쿼리 도구가 저장,
+# 핸들러가 꺼내감)
+# 핸들러 없이 실행된 경우를 대비해 개수 제한
+_MAX_PENDING_RESULTS = 256
+_pending_results = OrderedDict()
+_pending_lock = threading.Lock()
+
+
+def stash_query_result(run_id, query_result):
+    """도구 실행 결과(QueryResult 또는 QueryRejected)를 run_id로 보관"""
+    with _pending_lock:
+        _pending_results[run_id] = query_result
+        while len(_pending_results) > _MAX_PENDING_RESULTS:
+            _pending_results.popitem(last=False)
+
+
+def pop_query_result(run_id):
+    with _pending_lock:
+        return _pending_results.pop(run_id, None)
+
+
+@dataclass
+class SQLToolEvent:
+    """sql_db_query 도구 호출 1회"""
+    run_id: object
+    query: str
+    output: object = None
+    error: str = None
+    query_result: object = None  # QueryResult (캡처 도구를 쓴 경우)
+    rejected_reason: str = None  # 비용 검사에서 거부된 경우 사유
+    started_at: float = field(default_factory=time.monotonic)
+    ended_at: float = None
+
+    @property
+    def succeeded(self):
+        return self.ended_at is not None and self.error is None
+
+    @property
+    def duration(self):
+        return None if self.ended_at is None else self.ended_at - self.started_at
+
+
+def _tool_query(input_str, inputs):
+    """도구 입력에서 SQL 추출 (tool-calling: {'query': ...}, ReAct: 문자열 그대로)"""
+    if isinstance(inputs, dict) and 'query' in inputs:
+        return str(inputs['query']).strip()
+    text = (input_str or '').strip()
+    if text.startswith('{'):
+        try:
+            parsed = ast.literal_eval(text)
+            if isinstance(parsed, dict) and 'query' in parsed:
+                return str(parsed['query']).strip()
+        except (ValueError, SyntaxError):
+            pass
+    return text
+
+
+class SQLCaptureHandler(BaseCallbackHandler):
+    """sql_db_query 도구의 입력(SQL)/출력/오류를 순서대로 기록"""
+
+    def __init__(self, tool_name=SQL_QUERY_TOOL):
+        self.tool_name = tool_name
+        self.events = []
+        self.tool_counts = Counter()  # 도구 이름 -> 호출 수 (모든 도구)
+        self._running = {}  # run_id -> SQLToolEvent
+
+    def on_tool_start(self, serialized, input_str, *, run_id, inputs=None, **kwargs):
+        name = (serialized or {}).get('name') or kwargs.get('name')
+        self.tool_counts[name] += 1
+        if name != self.tool_name:
+            return
+        event = SQLToolEvent(run_id=run_id, query=_tool_query(input_str, inputs))
+        self._running[run_id] = event
+        self.events.append(event)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        event = self._running.pop(run_id, None)
+        if event is not None:
+            # 도구 버전에 따라 ToolMessage로 감싸져 올 수 있음
+            output = getattr(output, 'content', output)
+            event.output = output
+            # sql_db_query는 DB 오류를 예외 대신 "Error: ..." 문자열로 반환
+            if isinstance(output, str) and output.startswith('Error:'):
+                event.error = output
+            stashed = pop_query_result(run_id)
+            if isinstance(stashed, QueryRejected):
+                event.rejected_reason = stashed.reason
+            else:
+                event.query_result = stashed
+            event.ended_at = time.monotonic()
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        event = self._running.pop(run_id, None)
+        pop_query_result(run_id)
+        if event is not None:
+            event.error = str(error)
+            event.ended_at = time.monotonic()
+
+    @property
+    def iterations(self):
+        """Agent 반복 수 (도구 호출마다 한 번 + 최종 답변 한 번)"""
+        return sum(self.tool_counts.values()) + 1
+
+    @property
+    def successful_queries(self):
+        return [event.query for event in self.events if event.succeeded]
+
+    @property
+    def last_event(self):
+        """마지막으로 성공한 호출 (Agent 최종 답변의 근거가 된 쿼리), 없으면 None"""
+        for event in reversed(self.events):
+            if event.succeeded:
+                return event
+        return None
+
+    @property
+    def last_query(self):
+        event = self.last_event
+        return event.query if event else None
+
+    @property
+    def last_result(self):
+        """마지막 성공 쿼리의 QueryResult (없으면 None)"""
+        event = self.last_event
+        return event.query_result if event else None
+
+    @property
+    def rejected_reason(self):
+        """성공한 쿼리 없이 비용 검사에서 거부됐다면 마지막 거부 사유"""
+        if self.last_event is not None:
+            return None
+        for event in reversed(self.events):
+            if event.rejected_reason:
+                return event.rejected_reason
+        return None
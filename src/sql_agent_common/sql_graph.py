@@ -0,0 +1,352 @@
+"""
+LangGraph 기반 SQL 파이프라인
+ReAct Agent(create_sql_agent)가 테이블 목록/스키마/쿼리 검사 도구를 LLM 판단으로 여러 번
+호출하던 과정을 정해진 순서의 StateGraph로 대체
+
+    translate -> schema -> generate -> validate -> execute -> END
+                              ^            |           |
+                              +--- 재시도 ---+-----------+
+
+- schema: 스키마 캐시 + 질문 기반 축소 스키마 (LLM 호출 없음)
+- generate: SQL 캐시에 없을 때만 LLM 1회 호출 (재시도 시 이전 SQL과 오류를 프롬프트에 포함)
+- validate: 실제 테이블을 참조하는 SELECT 한 문장인지 + EXPLAIN으로 컬럼/GROUP BY/문법 검사
+  (EXPLAIN 결과는 execute의 비용 검사가 재사용)
+- execute: 비용 검사 + 결과 캐시를 거쳐 실행 (거부/오류는 generate로 재시도)
+- 단계별 소요 시간과 SQL 생성 LLM 호출 수를 상태에 누적
+차트는 그래프 밖에서 결과(query_result)로 만듦 (단일 질문은 답변 확인 후 생성 여부를 묻고,
+다중 질문은 모든 결과를 모아 하나의 대시보드로 만들기 때문)
+"""
+import operator
+import os
+import time
+from typing import Annotated, Optional, TypedDict
+
+from sql_agent_common.agent_tools import AGENT_QUERY_MAX_ROWS
+from sql_agent_common.cost_guard import QueryRejected, rejection_feedback
+from sql_agent_common.query_checker import check_query
+from sql_agent_common.query_result import QueryResult, cached_fetch_structured
+from sql_agent_common.schema_cache import schema_cache
+from sql_agent_common.schema_pruning import build_pruned_schema
+from sql_agent_common.sql_cache import sql_cache
+from sql_agent_common.sql_capture import SQLToolEvent
+from sql_agent_common.sql_tokens import parse_sql, referenced_tables
+from sql_agent_common.translation_memory import has_korean
+
+# 질문 처리 방식: graph(기본) / agent(기존 create_sql_agent)
+# / agent_seeded(스키마를 프롬프트에 미리 넣은 Agent)
+SQL_AGENT_MODE = os.getenv('SQL_AGENT_MODE', 'graph').strip().lower()
+# SQL 생성 최대 시도 횟수 (검증/실행 실패 시 오류를 알려주고 다시 생성)
+SQL_GRAPH_MAX_ATTEMPTS = int(os.getenv('SQL_GRAPH_MAX_ATTEMPTS', '3'))
+
+# 다중 질문을 동시에 처리할 최대 개수 (질문별 그래프 분기)
+QUESTION_MAX_CONCURRENCY = int(os.getenv('QUESTION_MAX_CONCURRENCY', '4'))
+
+# 답변에 표시할 최대 행 수
+ANSWER_PREVIEW_ROWS = 5
+
+
+def _merge_timings(left, right):
+    """단계별 소요 시간 누적 (재시도로 같은 단계를 다시 지나면 합산)"""
+    merged = dict(left or {})
+    for stage, seconds in (right or {}).items():
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    return merged
+
+
+class SQLGraphState(TypedDict, total=False):
+    """그래프 상태 (노드는 바뀐 키만 반환)"""
+    question: str  # 원본 질문
+    english_question: str  # 번역된 질문 (입력으로 주면 번역 생략)
+    schema_info: str
+    tables: list  # 프롬프트에 넣은 테이블
+    table_names: list  # 전체 테이블
+    cache_context: Optional[tuple]  # (스키마 지문, 모델 ID) - 조회 실패 시 None
+    sql_query: Optional[str]
+    sql_source: str  # cache / llm
+    error: Optional[str]  # 마지막 검증/실행 오류 (재시도 프롬프트에 사용)
+    attempts: int
+    query_result: Optional[QueryResult]
+    rejected_reason: Optional[str]
+    answer: str
+    sql_events: Annotated[list, operator.add]
+    llm_calls: Annotated[int, operator.add]  # SQL 생성 LLM 호출 수
+    timings: Annotated[dict, _merge_timings]
+
+
+def build_generation_prompt(english_question, schema_info, previous_sql=None, error=None):
+    """SELECT 생성 프롬프트 (재시도면 이전 SQL과 오류 포함)"""
+    retry = ""
+    if previous_sql and error:
+        retry = f"""
+The previous attempt failed. Fix the problem and write a corrected query.
+Previous query:
+{previous_sql}
+Error:
+{error}
+"""
+    return f"""### Instructions:
+Your task is to convert a question into a single MySQL SELECT query, given a MySQL database schema.
+Adhere to these rules:
+- **Deliberately go through the question and database schema word by word** to appropriately answer the question
+- **Use Table Aliases** to prevent ambiguity. For example, `SELECT f.title, a.first_name FROM film f JOIN film_actor fa ON f.film_id = fa.film_id JOIN actor a ON fa.actor_id = a.actor_id`.
+- Use only tables and columns that appear in the schema
+- Return at most {AGENT_QUERY_MAX_ROWS} rows unless the question asks for a single aggregate
+- When creating a ratio, always cast the numerator as float
+{retry}
+### Input:
+Generate a SQL SELECT query that answers the question `{english_question}`.
+This query will run on a database whose schema is represented in this string:
+
+{schema_info}
+
+### Response:
+Based on your instructions, here is the SQL SELECT query I have generated to answer the question `{english_question}`:
+```sql"""
+
+
+def format_answer(query_result):
+    """실행 결과 요약 답변 (LLM 없이 생성)"""
+    if query_result is None or query_result.empty:
+        return "조회 결과가 없습니다."
+    if len(query_result) == 1 and len(query_result.columns) == 1:
+        lines = [f"{query_result.columns[0]}: {query_result.rows[0][0]}"]
+    else:
+        lines = [f"{len(query_result)}행 조회 (컬럼: {', '.join(query_result.columns)})"]
+        for row in query_result.rows[:ANSWER_PREVIEW_ROWS]:
+            lines.append("- " + ", ".join(str(value) for value in row))
+        if len(query_result) > ANSWER_PREVIEW_ROWS or query_result.truncated:
+            lines.append("...")
+    if query_result.limited_reason:
+        lines.append(f"✂️ {query_result.limited_reason}")
+    return "\n".join(lines)
+
+
+def _timed(stage, node):
+    """노드 실행 시간을 timings에 기록하는 래퍼"""
+    def run(state):
+        started = time.perf_counter()
+        update = node(state) or {}
+        update['timings'] = {stage: time.perf_counter() - started}
+        return update
+    return run
+
+
+def build_sql_graph(get_db, get_llm, translate=None,
+                    max_attempts=SQL_GRAPH_MAX_ATTEMPTS, max_rows=AGENT_QUERY_MAX_ROWS):
+    """
+    SQL 파이프라인 그래프 생성 (컴파일된 그래프 반환)
+    get_db / get_llm: DB / SQL 생성 LLM을 돌려주는 함수 (지연 초기화)
+    translate: 한국어 질문 -> 영어 질문 함수 (None이면 질문 그대로 사용)
+    """
+    from langgraph.graph import END, START, StateGraph
+
+    def translate_node(state):
+        if state.get('english_question'):
+            return {}
+        question = state['question']
+        if translate is None or not has_korean(question):
+            return {'english_question': question}
+        return {'english_question': translate(question)}
+
+    def schema_node(state):
+        db = get_db()
+        try:
+            snapshot = schema_cache.get_snapshot(db)
+        except Exception as e:
+            # 스키마 캐시를 쓸 수 없으면 테이블 목록만으로 진행 (SQL 캐시 미사용)
+            print(f"⚠️ 스키마 정보 가져오기 실패: {e}")
+            table_names = list(db.get_usable_table_names())
+            return {'schema_info': f"Available tables: {', '.join(table_names)}",
+                    'tables': table_names, 'table_names': table_names,
+                    'cache_context': None}
+
+        schema_info, tables = build_pruned_schema(snapshot, state['english_question'])
+        print(f"🗂️ 프롬프트 스키마: {len(tables)}/{len(snapshot.table_names)}개 테이블 {tables}")
+
+        llm = get_llm()
+        model_id = getattr(llm, 'model', None) or type(llm).__name__
+        return {'schema_info': schema_info, 'tables': tables,
+                'table_names': list(snapshot.table_names),
+                'cache_context': (snapshot.fingerprint, model_id)}
+
+    def generate_node(state):
+        attempts = state.get('attempts', 0) + 1
+        cache_context = state.get('cache_context')
+        # 첫 시도에서만 캐시 사용 (재시도는 캐시된 SQL이 실패한 경우)
+        if attempts == 1 and cache_context:
+            cached = sql_cache.get(state['english_question'], 'SELECT', *cache_context)
+            if cached:
+                print(f"♻️ SQL 캐시 사용: {cached[:50]}...")
+                return {'sql_query': cached, 'sql_source': 'cache', 'attempts': attempts,
+                        'error': None, 'rejected_reason': None}
+
+        if attempts > 1:
+            print(f"🔁 SQL 다시 생성 ({attempts}/{max_attempts}): {state.get('error')}")
+        prompt = build_generation_prompt(
+            state['english_question'], state['schema_info'],
+            previous_sql=state.get('sql_query'), error=state.get('error'))
+        output = get_llm().invoke(prompt)
+        sql_query = parse_sql(getattr(output, 'content', output)).sql
+        print(f"✅ SQL 생성 완료: {sql_query[:50]}...")
+        return {'sql_query': sql_query, 'sql_source': 'llm', 'attempts': attempts,
+                'error': None, 'rejected_reason': None, 'llm_calls': 1}
+
+    def validate_node(state):
+        parsed = parse_sql(state.get('sql_query'))
+        table_names = state.get('table_names') or []
+        if parsed.sql and table_names and not referenced_tables(parsed.sql, table_names):
+            return {'error': f"The query does not reference any existing table. "
+                             f"Available tables: {', '.join(table_names)}"}
+        # SELECT 한 문장인지 + EXPLAIN으로 컬럼/GROUP BY/문법 오류 확인 (LLM 호출 없음)
+        error = check_query(get_db(), parsed.sql)
+        if error:
+            print(f"⚠️ SQL 검사 실패: {error}")
+            return {'error': error}
+        return {'sql_query': parsed.sql}
+
+    def execute_node(state):
+        sql_query = state['sql_query']
+        event = SQLToolEvent(run_id=state['attempts'], query=sql_query)
+        try:
+            query_result = cached_fetch_structured(get_db(), sql_query, max_rows=max_rows,
+                                                   guard=True)
+        except QueryRejected as e:
+            event.rejected_reason = e.reason
+            event.error = rejection_feedback(e)
+        except Exception as e:
+            print(f"❌ SQL 실행 실패: {e}")
+            event.error = str(e)
+        event.ended_at = time.monotonic()
+        if event.error:
+            return {'error': event.error, 'rejected_reason': event.rejected_reason,
+                    'query_result': None, 'sql_events': [event]}
+
+        event.query_result = query_result
+        event.output = format_answer(query_result)
+        if state.get('sql_source') == 'llm' and state.get('cache_context'):
+            sql_cache.put(state['english_question'], 'SELECT', *state['cache_context'],
+                          sql_query)
+        return {'query_result': query_result, 'rejected_reason': None, 'error': None,
+                'answer': event.output, 'sql_events': [event]}
+
+    def retry(state):
+        return 'generate' if state.get('attempts', 0) < max_attempts else 'failed'
+
+    def after_validate(state):
+        return retry(state) if state.get('error') else 'execute'
+
+    def after_execute(state):
+        return retry(state) if state.get('error') else END
+
+    def failed_node(state):
+        print(f"⚠️ SQL 생성 {state.get('attempts', 0)}회 실패: {state.get('error')}")
+        if state.get('rejected_reason'):
+            answer = f"🛑 실행 비용이 커서 쿼리를 실행하지 않았습니다: {state['rejected_reason']}"
+        else:
+            answer = f"SQL 생성 실패: {state.get('error')}"
+        return {'answer': answer, 'query_result': None}
+
+    graph = StateGraph(SQLGraphState)
+    graph.add_node('translate', _timed('translate', translate_node))
+    graph.add_node('schema', _timed('schema', schema_node))
+    graph.add_node('generate', _timed('generate', generate_node))
+    graph.add_node('validate', _timed('validate', validate_node))
+    graph.add_node('execute', _timed('execute', execute_node))
+    graph.add_node('failed', failed_node)
+
+    graph.add_edge(START, 'translate')
+    graph.add_edge('translate', 'schema')
+    graph.add_edge('schema', 'generate')
+    graph.add_edge('generate', 'validate')
+    graph.add_conditional_edges('validate', after_validate,
+                                ['execute', 'generate', 'failed'])
+    graph.add_conditional_edges('execute', after_execute,
+                                ['generate', 'failed', END])
+    graph.add_edge('failed', END)
+    return graph.compile()
+
+
+def run_sql_graph(graph, question, english_question=None):
+    """그래프로 질문 하나 처리 - 반환: 최종 상태 dict (단계별 소요 시간 출력)"""
+    inputs = {'question': question}
+    if english_question:
+        inputs['english_question'] = english_question
+    state = graph.invoke(inputs)
+
+    timings = state.get('timings', {})
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+    print(f"⏱️ 단계별 소요 시간: {stages} "
+          f"(LLM 호출 {state.get('llm_calls', 0)}회, SQL 시도 {state.get('attempts', 0)}회)")
+    return state
+
+
+class FanOutState(TypedDict):
+    """다중 질문 분기 상태 - results: (입력 순서, 결과) 목록 (분기 완료 순서로 쌓임)"""
+    items: list
+    results: Annotated[list, operator.add]
+
+
+def build_fanout_graph(process):
+    """items를 Send로 항목별 분기해 process(item)를 동시에 실행하는 그래프"""
+    from langgraph.graph import END, START, StateGraph
+    from langgraph.types import Send
+
+    def fan_out(state):
+        return [Send('process', {'index': index, 'item': item})
+                for index, item in enumerate(state['items'])]
+
+    def process_node(branch):
+        return {'results': [(branch['index'], process(branch['item']))]}
+
+    graph = StateGraph(FanOutState)
+    graph.add_node('process', process_node)
+    graph.add_conditional_edges(START, fan_out, ['process'])
+    graph.add_edge('process', END)
+    return graph.compile()
+
+
+def run_fanout(process, items, max_concurrency=QUESTION_MAX_CONCURRENCY):
+    """
+    items를 최대 max_concurrency개씩 동시에 처리하고 결과를 입력 순서로 반환
+    전체 소요 시간은 항목별 시간의 합이 아니라 가장 느린 항목 수준
+    process는 예외를 직접 처리해야 함 (예외가 나면 전체 실행이 중단됨)
+    """
+    items = list(items)
+    if not items:
+        return []
+    state = build_fanout_graph(process).invoke(
+        {'items': items}, config={'max_concurrency': max(max_concurrency, 1)})
+    return [result for _, result in sorted(state['results'], key=lambda pair: pair[0])]
+
+
+def answer_from_state(state):
+    """그래프 최종 상태 -> 질문 처리 결과 (Agent 결과와 같은 키)"""
+    query_result = state.get('query_result')
+    succeeded = query_result is not None
+    return {
+        'english_question': state.get('english_question'),
+        'answer': state.get('answer', ''),
+        'sql_query': state.get('sql_query') if succeeded else None,
+        'query_result': query_result,
+        'rejected_reason': None if succeeded else state.get('rejected_reason'),
+        'limited_reason': query_result.limited_reason if succeeded else None,
+        'sql_events': state.get('sql_events', []),
+        'timings': state.get('timings', {}),
+        'llm_calls': state.get('llm_calls', 0),
+    }
+
+
+def answer_from_agent(result, capture, english_question=None, elapsed=None):
+    """create_sql_agent 결과 + SQLCaptureHandler -> 질문 처리 결과 (elapsed: 실행 시간(초))"""
+    return {
+        'english_question': english_question,
+        'answer': result['output'],
+        'sql_query': capture.last_query,
+        'query_result': capture.last_result,
+        'rejected_reason': capture.rejected_reason,
+        'limited_reason': getattr(capture.last_result, 'limited_reason', None),
+        'sql_events': capture.events,
+        'timings': {} if elapsed is None else {'agent': elapsed},
+        # Agent는 반복마다 LLM을 한 번 호출
+        'llm_calls': capture.iterations,
+    }
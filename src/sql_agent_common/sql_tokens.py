@@ -0,0 +1,437 @@
+"""
+SQL 토크나이저
+LLM이 만든 SQL을 한 번만 스캔해 토큰으로 나누고, 같은 토큰 목록으로
+- 코드 블록(```)/주석/앞뒤 설명 문장 제거 (clean_sql)
+- 생성된 SQL 자체로 문장 종류 판별 (classify_statement)
+- 공백/키워드 대소문자를 정규화한 SQL (normalize_sql, 결과 캐시 키)
+- 리터럴을 ?로 바꾼 지문 (fingerprint, 같은 형태의 쿼리 식별/중복 제거)
+- 참조 테이블 추출 (referenced_tables, 문자열 리터럴 안의 단어는 제외)
+을 처리 (분석 결과는 SQL 문자열별로 캐시)
+"""
+from collections import namedtuple
+from dataclasses import dataclass
+from functools import lru_cache
+
+# kind: word / quoted(백틱 식별자) / string / number / variable / hint / op / fence
+# gap: 앞 토큰과의 공백 ('', ' ', '\n')
+Token = namedtuple('Token', 'kind text gap')
+
+KEYWORDS = frozenset("""
+ADD ALL ALTER AND ANY AS ASC BETWEEN BY CASE CAST CREATE CROSS CURRENT_DATE
+CURRENT_TIMESTAMP DATABASE DELETE DESC DESCRIBE DISTINCT DIV DROP DUPLICATE ELSE
+END ESCAPE EXCEPT EXISTS EXPLAIN FALSE FOR FORCE FROM FULL GROUP HAVING IF IGNORE
+IN INDEX INNER INSERT INTERSECT INTERVAL INTO IS JOIN KEY LEFT LIKE LIMIT LOCK
+MOD NATURAL NOT NULL OFFSET ON OR ORDER OUTER OUTFILE OVER PARTITION RECURSIVE
+REGEXP RENAME REPLACE RIGHT ROLLUP ROW ROWS SELECT SET SHOW STRAIGHT_JOIN TABLE
+THEN TRUE TRUNCATE UNION UNIQUE UPDATE USE USING VALUES WHEN WHERE WINDOW WITH XOR
+""".split())
+
+AGGREGATES = frozenset("""
+AVG BIT_AND BIT_OR BIT_XOR COUNT GROUP_CONCAT JSON_ARRAYAGG JSON_OBJECTAGG MAX MIN
+STD STDDEV STDDEV_POP STDDEV_SAMP SUM VARIANCE VAR_POP VAR_SAMP
+""".split())
+
+# 문장 첫 키워드 -> 문장 종류
+_STATEMENT_TYPES = {
+    'SELECT': 'SELECT', 'INSERT': 'INSERT', 'REPLACE': 'INSERT',
+    'UPDATE': 'UPDATE', 'DELETE': 'DELETE',
+    'CREATE': 'DDL', 'ALTER': 'DDL', 'DROP': 'DDL', 'TRUNCATE': 'DDL',
+    'RENAME': 'DDL',
+}
+_STATEMENT_STARTERS = frozenset(_STATEMENT_TYPES) | {'WITH'}
+
+# 줄 맨 앞에 오면 SQL이 끝나고 설명이 시작된 것으로 보는 단어
+_PROSE_STARTERS = frozenset(['based', 'here', 'this', 'the', 'note', 'explanation'])
+
+_OPERATORS = ('<=>', '->>', '<=', '>=', '<>', '!=', ':=', '||', '&&', '->', '<<', '>>')
+
+
+def _is_word_char(char):
+    return char.isalnum() or char in '_$'
+
+
+def _is_number(text):
+    if text[:2].lower() in ('0x', '0b'):
+        return True
+    if '_' in text:
+        return False
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def _scan_quoted(sql, start, quote):
+    """따옴표 끝 위치 (백슬래시 이스케이프와 따옴표 두 번 쓰기 처리)"""
+    i = start + 1
+    n = len(sql)
+    while i < n:
+        char = sql[i]
+        if char == '\\' and quote != '`':
+            i += 2
+            continue
+        if char == quote:
+            if i + 1 < n and sql[i + 1] == quote:
+                i += 2
+                continue
+            return i + 1
+        i += 1
+    return n
+
+
+def tokenize(sql):
+    """SQL 문자열을 토큰 목록으로 (공백과 주석은 다음 토큰의 gap으로만 남김)"""
+    tokens = []
+    gap = ''
+    i = 0
+    n = len(sql)
+    while i < n:
+        char = sql[i]
+
+        if char.isspace():
+            if char == '\n':
+                gap = '\n'
+            elif not gap:
+                gap = ' '
+            i += 1
+            continue
+
+        if sql.startswith('```', i):
+            # 코드 블록 표시와 뒤따르는 언어 이름(sql 등)
+            i += 3
+            while i < n and _is_word_char(sql[i]):
+                i += 1
+            tokens.append(Token('fence', '```', gap))
+            gap = '\n'
+            continue
+
+        # MySQL은 '--' 뒤에 공백(또는 끝)이 있을 때만 주석 (5--3은 5 - (-3))
+        if char == '#' or (sql.startswith('--', i)
+                           and (i + 2 >= n or sql[i + 2].isspace())):
+            end = sql.find('\n', i)
+            i = n if end < 0 else end
+            gap = gap or ' '
+            continue
+
+        if sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = n if end < 0 else end + 2
+            if sql.startswith('/*+', i):
+                # 옵티마이저 힌트는 실행에 영향이 있으므로 유지
+                tokens.append(Token('hint', sql[i:end], gap))
+                gap = ''
+            else:
+                gap = gap or ' '
+            i = end
+            continue
+
+        if char in ("'", '"', '`'):
+            end = _scan_quoted(sql, i, char)
+            kind = 'quoted' if char == '`' else 'string'
+            tokens.append(Token(kind, sql[i:end], gap))
+        elif char.isdigit() or (char == '.' and sql[i + 1:i + 2].isdigit()
+                                and (gap or not tokens or tokens[-1].kind == 'op')):
+            end = i + 1
+            while end < n and (_is_word_char(sql[end]) or sql[end] == '.'):
+                end += 1
+            if sql[end - 1] in 'eE' and sql[end:end + 1] in ('+', '-') \
+                    and sql[end + 1:end + 2].isdigit():
+                end += 1
+                while end < n and sql[end].isdigit():
+                    end += 1
+            text = sql[i:end]
+            # 숫자로 시작하는 식별자 (예: 2nd_col)는 word
+            tokens.append(Token('number' if _is_number(text) else 'word', text, gap))
+        elif _is_word_char(char):
+            end = i + 1
+            while end < n and _is_word_char(sql[end]):
+                end += 1
+            tokens.append(Token('word', sql[i:end], gap))
+        elif char == '@':
+            end = i + 1
+            while end < n and (_is_word_char(sql[end]) or sql[end] in '@.'):
+                end += 1
+            tokens.append(Token('variable', sql[i:end], gap))
+        else:
+            end = i + 1
+            for operator in _OPERATORS:
+                if sql.startswith(operator, i):
+                    end = i + len(operator)
+                    break
+            tokens.append(Token('op', sql[i:end], gap))
+
+        i = end
+        gap = ''
+    return tokens
+
+
+def _upper_word(token):
+    return token.text.upper() if token.kind == 'word' else None
+
+
+def _select_region(tokens):
+    """코드 블록이 있으면 첫 번째 블록 안의 토큰만 사용"""
+    fences = [index for index, token in enumerate(tokens) if token.kind == 'fence']
+    if not fences:
+        return tokens
+    start = fences[0] + 1
+    end = fences[1] if len(fences) > 1 else len(tokens)
+    region = tokens[start:end]
+    # 빈 블록이면 (예: 설명 뒤에 블록 없이 SQL만 있는 경우) 펜스만 제외하고 전체 사용
+    return region or [token for token in tokens if token.kind != 'fence']
+
+
+def _statement_start(tokens):
+    """첫 문장 키워드 위치 - 줄 맨 앞의 키워드를 우선 (설명 문장 속 'select' 무시)"""
+    first_anywhere = None
+    for index, token in enumerate(tokens):
+        if token.kind == 'op' and token.text == '(':
+            # (SELECT ...) UNION ... 형태
+            following = tokens[index + 1] if index + 1 < len(tokens) else None
+            if following is None or _upper_word(following) not in ('SELECT', 'WITH'):
+                continue
+        elif _upper_word(token) not in _STATEMENT_STARTERS:
+            continue
+        if index == 0 or token.gap == '\n':
+            return index
+        if first_anywhere is None:
+            first_anywhere = index
+    return first_anywhere
+
+
+def _statement_end(tokens, start):
+    """세미콜론, 닫는 코드 블록, 또는 줄 맨 앞의 설명 문장 직전까지"""
+    depth = 0
+    for index in range(start, len(tokens)):
+        token = tokens[index]
+        if token.kind == 'op':
+            if token.text == '(':
+                depth += 1
+            elif token.text == ')':
+                depth = max(depth - 1, 0)
+            elif token.text == ';':
+                return index
+        elif token.kind == 'fence':
+            return index
+        elif (index > start and depth == 0 and token.gap == '\n'
+              and token.kind == 'word' and token.text.lower() in _PROSE_STARTERS):
+            return index
+    return len(tokens)
+
+
+def _count_statements(tokens, start):
+    """세미콜론으로 구분된 문장 수 (설명 문장은 제외)"""
+    count = 0
+    while start is not None and start < len(tokens):
+        count += 1
+        end = _statement_end(tokens, start)
+        if end >= len(tokens) or tokens[end].text != ';':
+            break
+        rest = tokens[end + 1:]
+        next_start = _statement_start(rest)
+        start = None if next_start is None else end + 1 + next_start
+    return count
+
+
+def _main_keyword(tokens):
+    """최상위(괄호 밖) 문장 키워드 위치 (WITH 뒤의 본문), 없으면 첫 문장 키워드"""
+    depth = 0
+    first = None
+    for index, token in enumerate(tokens):
+        if token.kind == 'op' and token.text == '(':
+            depth += 1
+        elif token.kind == 'op' and token.text == ')':
+            depth = max(depth - 1, 0)
+        elif _upper_word(token) in _STATEMENT_TYPES:
+            if depth == 0:
+                return index
+            if first is None:
+                # (SELECT ...) UNION (SELECT ...)처럼 괄호 안에만 있는 경우
+                first = index
+    return first
+
+
+def _classify(tokens, main_index):
+    if main_index is None:
+        return 'OTHER' if tokens else None
+    statement_type = _STATEMENT_TYPES[_upper_word(tokens[main_index])]
+    if statement_type == 'SELECT':
+        # SELECT ... INTO OUTFILE / FOR UPDATE 처럼 부수 효과가 있는 SELECT 구분
+        depth = 0
+        for token in tokens[main_index:]:
+            if token.kind == 'op' and token.text == '(':
+                depth += 1
+            elif token.kind == 'op' and token.text == ')':
+                depth -= 1
+            elif depth == 0 and _upper_word(token) == 'INTO':
+                return 'OTHER'
+        words = [_upper_word(token) for token in tokens[-2:]]
+        if words == ['FOR', 'UPDATE'] or words == ['SHARE', 'MODE']:
+            return 'OTHER'
+    return statement_type
+
+
+def _normalized_text(token):
+    if token.kind == 'word':
+        upper = token.text.upper()
+        return upper if upper in KEYWORDS or upper in AGGREGATES else token.text
+    if token.kind == 'quoted':
+        inner = token.text[1:-1]
+        # 키워드가 아닌 단순 식별자는 백틱 유무를 구분하지 않음
+        if inner and all(_is_word_char(c) for c in inner) and inner.upper() not in KEYWORDS:
+            return inner
+    return token.text
+
+
+def _render(tokens, keep_newlines=True):
+    parts = []
+    for index, token in enumerate(tokens):
+        if index and token.gap:
+            parts.append('\n' if keep_newlines and token.gap == '\n' else ' ')
+        parts.append(token.text)
+    return ''.join(parts)
+
+
+def _fingerprint_parts(parts):
+    """IN ( ?, ?, ? ) 같은 값 목록은 개수와 관계없이 ( ?+ )로"""
+    result = []
+    for part in parts:
+        if (part == '?' and len(result) >= 3 and result[-1] == ','
+                and (result[-2] == '?+' or (result[-2] == '?' and result[-3] == '('))):
+            result[-2:] = ['?+']
+        else:
+            result.append(part)
+    return result
+
+
+@dataclass(frozen=True)
+class ParsedSQL:
+    """
+    SQL 분석 결과 (여러 스레드에서 공유되므로 변경 불가)
+    sql: 정리된 첫 문장 (줄바꿈 유지, 끝 세미콜론 없음)
+    statement_type: SELECT / INSERT / UPDATE / DELETE / DDL / OTHER, SQL이 없으면 None
+    """
+    sql: str
+    statement_type: str
+    normalized: str
+    fingerprint: str
+    identifiers: frozenset  # 식별자 (소문자, 백틱 제거)
+    has_limit: bool  # 최상위 LIMIT 존재 여부
+    has_aggregate: bool
+    statement_count: int
+    hint_offset: int  # 최상위 SELECT 키워드 바로 뒤 위치 (sql 기준, 없으면 None)
+
+    @property
+    def is_read_only(self):
+        return self.statement_type == 'SELECT'
+
+
+_EMPTY = ParsedSQL(sql='', statement_type=None, normalized='', fingerprint='',
+                   identifiers=frozenset(), has_limit=False, has_aggregate=False,
+                   statement_count=0, hint_offset=None)
+
+
+@lru_cache(maxsize=2048)
+def parse_sql(raw):
+    """LLM 출력 또는 SQL 문자열 분석 (한 번의 토큰화로 모든 정보를 계산)"""
+    if not raw:
+        return _EMPTY
+    region = _select_region(tokenize(raw))
+    start = _statement_start(region)
+    if start is None:
+        return _EMPTY
+    end = _statement_end(region, start)
+    tokens = region[start:end]
+    if not tokens:
+        return _EMPTY
+
+    main_index = _main_keyword(tokens)
+    statement_type = _classify(tokens, main_index)
+
+    depth = 0
+    has_limit = False
+    has_aggregate = False
+    identifiers = set()
+    for index, token in enumerate(tokens):
+        if token.kind == 'op':
+            if token.text == '(':
+                depth += 1
+            elif token.text == ')':
+                depth = max(depth - 1, 0)
+        elif token.kind == 'word':
+            upper = token.text.upper()
+            if upper == 'LIMIT' and depth == 0:
+                has_limit = True
+            elif (upper in AGGREGATES and index + 1 < len(tokens)
+                  and tokens[index + 1].text == '('):
+                has_aggregate = True
+            if upper not in KEYWORDS:
+                identifiers.add(token.text.lower())
+        elif token.kind == 'quoted':
+            identifiers.add(token.text[1:-1].replace('``', '`').lower())
+
+    normalized_parts = [_normalized_text(token) for token in tokens]
+    fingerprint_parts = _fingerprint_parts([
+        '?' if token.kind in ('string', 'number') else part
+        for token, part in zip(tokens, normalized_parts)])
+
+    sql = _render(tokens)
+    hint_offset = None
+    if statement_type == 'SELECT' and main_index is not None:
+        hint_offset = len(_render(tokens[:main_index + 1]))
+
+    return ParsedSQL(
+        sql=sql,
+        statement_type=statement_type,
+        normalized=' '.join(normalized_parts),
+        fingerprint=' '.join(fingerprint_parts),
+        identifiers=frozenset(identifiers),
+        has_limit=has_limit,
+        has_aggregate=has_aggregate,
+        statement_count=_count_statements(region, start),
+        hint_offset=hint_offset,
+    )
+
+
+def clean_sql(raw):
+    """코드 블록/주석/설명을 제거한 첫 SQL 문장 (줄바꿈 유지, 끝 세미콜론 없음)"""
+    return parse_sql(raw).sql
+
+
+def classify_statement(sql_query):
+    """SELECT / INSERT / UPDATE / DELETE / DDL / OTHER (SQL이 없으면 None)"""
+    return parse_sql(sql_query).statement_type
+
+
+def normalize_sql(sql_query):
+    """공백/주석/키워드 대소문자/끝 세미콜론 차이를 무시한 SQL (리터럴은 유지)"""
+    return parse_sql(sql_query).normalized
+
+
+def fingerprint(sql_query):
+    """리터럴을 ?로 바꾼 쿼리 지문 (값만 다른 같은 형태의 쿼리는 같은 지문)"""
+    return parse_sql(sql_query).fingerprint
+
+
+def referenced_tables(sql_query, table_names):
+    """SQL 식별자 중 실제 테이블명 (별칭/컬럼과 겹치면 보수적으로 포함)"""
+    identifiers = parse_sql(sql_query).identifiers
+    return frozenset(name for name in table_names if name.lower() in identifiers)
+
+
+def add_optimizer_hint(sql_query, hint):
+    """최상위 SELECT 바로 뒤에 /*+ hint */ 추가 (이미 힌트가 있거나 SELECT가 아니면 그대로)"""
+    parsed = parse_sql(sql_query)
+    if parsed.hint_offset is None or '/*+' in parsed.sql:
+        return parsed.sql or sql_query
+    offset = parsed.hint_offset
+    return f"{parsed.sql[:offset]} /*+ {hint} */{parsed.sql[offset:]}"
+
+
+def add_limit(sql_query, limit):
+    """최상위 LIMIT이 없는 SELECT면 끝에 추가 (FOR UPDATE/INTO 등 SELECT가 아니면 그대로)"""
+    parsed = parse_sql(sql_query)
+    if parsed.has_limit or not parsed.is_read_only:
+        return parsed.sql
+    return f"{parsed.sql} LIMIT {limit}"
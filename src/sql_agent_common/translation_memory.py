@@ -0,0 +1,170 @@
+"""
+번역 메모리
+한국어 질문을 정규화(공백/문장 부호/한글 어절의 조사)한 키로 번역 결과를 저장
+메모리 LRU + SQLite 디스크 저장소 2단 구성
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# 길이가 긴 조사부터 검사
+# 만/도/이/가/의/과/로처럼 단어의 일부일 수 있는 한 글자 조사는 제외 (평가 -> 평, 10만 -> 10 방지)
+KOREAN_PARTICLES = sorted([
+    '에서는', '으로는', '에서', '으로', '에게', '한테', '까지', '부터', '처럼', '보다',
+    '은', '는', '을', '를', '에', '와',
+], key=len, reverse=True)
+
+# 문장 부호만 제거 (비교 연산자/숫자 기호 > < = + - * / % . 는 의미가 있으므로 유지)
+_PUNCTUATION_PATTERN = re.compile(r'[?!,~…"\'“”‘’()\[\]{}:;]')
+_TRAILING_PERIOD_PATTERN = re.compile(r'\.+$')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+_HANGUL_TOKEN_PATTERN = re.compile(r'^[가-힣]+$')
+
+# 정규화 방식이 바뀌면 올려서 이전 키로 저장된 번역을 사용하지 않음
+KEY_VERSION = 2
+
+
+def has_korean(text):
+    """텍스트에 한글이 포함되어 있는지 확인"""
+    return any('\uac00' <= char <= '\ud7af' for char in text or '')
+
+
+def _strip_particle(token):
+    """한글로만 된 어절 끝의 조사 제거 (예: 영화를 -> 영화, 10명을/rate는 그대로)"""
+    if not _HANGUL_TOKEN_PATTERN.match(token):
+        return token
+    for particle in KOREAN_PARTICLES:
+        if len(token) > len(particle) and token.endswith(particle):
+            return token[:-len(particle)]
+    return token
+
+
+def normalize_korean(text):
+    """번역 메모리 키 생성을 위한 질문 정규화"""
+    text = unicodedata.normalize('NFC', text).lower()
+    text = _PUNCTUATION_PATTERN.sub(' ', text)
+    tokens = [_TRAILING_PERIOD_PATTERN.sub('', token)
+              for token in _WHITESPACE_PATTERN.sub(' ', text).strip().split(' ')]
+    return ' '.join(_strip_particle(token) for token in tokens if token)
+
+
+def _memory_key(namespace, question):
+    return (namespace, f"v{KEY_VERSION}:{normalize_korean(question)}")
+
+
+class TranslationMemory:
+    """메모리 LRU + SQLite 기반 번역 캐시"""
+
+    def __init__(self, path, max_memory_entries=1024, max_disk_entries=50000):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_disabled = False
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                      'memory_evictions': 0, 'disk_evictions': 0}
+
+    def _connection(self):
+        """SQLite 연결 (첫 사용 시 생성, 실패하면 메모리 전용으로 동작)"""
+        if self._conn is not None or self._disk_disabled:
+            return self._conn
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS translations (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    translation TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )""")
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_translations_last_used
+                ON translations (last_used)""")
+            conn.commit()
+            self._conn = conn
+        except sqlite3.Error as e:
+            print(f"⚠️ 번역 메모리 파일을 열 수 없어 메모리 캐시만 사용합니다: {e}")
+            self._disk_disabled = True
+        return self._conn
+
+    def _remember(self, key, translation):
+        self._memory[key] = translation
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats['memory_evictions'] += 1
+
+    def get(self, namespace, question):
+        """저장된 번역 반환 (없으면 None)"""
+        key = _memory_key(namespace, question)
+        with self._lock:
+            translation = self._memory.get(key)
+            if translation is not None:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return translation
+
+            conn = self._connection()
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT translation FROM translations WHERE namespace = ? AND key = ?",
+                    key).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE translations SET last_used = ? WHERE namespace = ? AND key = ?",
+                        (time.time(), *key))
+                    conn.commit()
+                    self._remember(key, row[0])
+                    self.stats['disk_hits'] += 1
+                    return row[0]
+
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, namespace, question, translation):
+        """번역 결과 저장 (디스크 용량 초과 시 오래 사용되지 않은 항목부터 삭제)"""
+        key = _memory_key(namespace, question)
+        now = time.time()
+        with self._lock:
+            self._remember(key, translation)
+
+            conn = self._connection()
+            if conn is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                (*key, translation, now, now))
+            excess = conn.execute(
+                "SELECT COUNT(*) FROM translations").fetchone()[0] - self.max_disk_entries
+            if excess > 0:
+                conn.execute("""
+                    DELETE FROM translations WHERE rowid IN (
+                        SELECT rowid FROM translations ORDER BY last_used LIMIT ?
+                    )""", (excess,))
+                self.stats['disk_evictions'] += excess
+            conn.commit()
+
+    def hit_rate(self):
+        hits = self.stats['memory_hits'] + self.stats['disk_hits']
+        total = hits + self.stats['misses']
+        return hits / total if total else 0.0
+
+
+# 프로세스 전역 인스턴스
+translation_memory = TranslationMemory(
+    path=os.getenv('TRANSLATION_MEMORY_PATH',
+                   os.path.join('.cache', 'translation_memory.sqlite3')),
+    max_memory_entries=int(os.getenv('TRANSLATION_MEMORY_SIZE', '1024')),
+    max_disk_entries=int(os.getenv('TRANSLATION_MEMORY_DISK_SIZE', '50000'))
+)
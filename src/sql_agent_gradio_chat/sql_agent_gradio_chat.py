@@ -2,17 +2,19 @@
 SQL Agent Gradio 챗봇
 Gemini(번역) + CodeLlama(SQL생성) - 웹 인터페이스
 """
-import gradio as gr
 import sys
 import os
+import threading
 from datetime import datetime
 
 # 기존 SQL Agent 모듈 import
 from sql_agent_simple_hybrid import (
-    process_question,
-    db,
-    translator_llm,
-    sql_llm
+    astream_process_question,
+    split_multiple_questions,
+    format_pool_metrics,
+    get_db,
+    get_translator_llm,
+    get_sql_llm
 )
 
 
@@ -24,6 +26,11 @@ def format_sql_result(result):
         for i, sub_result in enumerate(result['results'], 1):
             response += f"### 질문 {i}: {sub_result['question']}\n"
 
+            if not sub_result['success']:
+                response += f"❌ **처리 실패**: {sub_result['result']}\n\n"
+                response += "---\n\n"
+                continue
+
             if sub_result['english_question'] != sub_result['question']:
                 response += f"**번역**: {sub_result['english_question']}\n"
 
@@ -57,31 +64,78 @@ def format_sql_result(result):
     return response
 
 
-def chat_with_sql_agent(message, history):
-    """Gradio 챗봇 메인 함수"""
-    try:
-        if not message.strip():
-            return "❓ 질문을 입력해주세요."
-
-        # SQL Agent로 질문 처리
-        result = process_question(message)
+def format_partial_response(question, english_question=None, sql_text=None,
+                            status=None):
+    """처리 중인 단일 질문의 중간 상태 포맷팅"""
+    response = f"🎯 **질문**: {question}\n\n"
+    if english_question and english_question != question:
+        response += f"🌐 **번역**: {english_question}\n\n"
+    if sql_text:
+        response += f"**SQL**:\n```sql\n{sql_text}\n```\n\n"
+    if status:
+        response += status
+    return response
 
-        if not result['success']:
-            return f"❌ 처리 실패: {result.get('result', '알 수 없는 오류')}"
 
-        # 결과 포맷팅
-        formatted_response = format_sql_result(result)
-        return formatted_response
+async def chat_with_sql_agent(message, history):
+    """
+    Gradio 챗봇 메인 함수
+    번역 -> SQL(토큰 스트리밍) -> 실행 결과 순으로 단계마다 응답을 갱신
+    """
+    try:
+        if not message.strip():
+            yield "❓ 질문을 입력해주세요."
+            return
+
+        english_question = None
+        sql_text = ""
+        async for event in astream_process_question(message):
+            stage = event['stage']
+
+            if stage == 'start':
+                if event['multiple_questions']:
+                    total = len(split_multiple_questions(message))
+                    finished = 0
+                    yield f"🔍 **복수 질문 처리 중** (0/{total})"
+                else:
+                    yield format_partial_response(message, status="🌐 번역 중...")
+
+            elif stage == 'translation':
+                english_question = event['english_question']
+                yield format_partial_response(
+                    message, english_question, status="🔍 SQL 생성 중...")
+
+            elif stage == 'sql_token':
+                sql_text += event['text']
+                yield format_partial_response(message, english_question, sql_text)
+
+            elif stage == 'sql':
+                sql_text = event['sql_query']
+                yield format_partial_response(
+                    message, english_question, sql_text, status="⚙️ 실행 중...")
+
+            elif stage == 'progress':
+                finished += 1
+                yield f"🔍 **복수 질문 처리 중** ({finished}/{total})"
+
+            elif stage == 'done':
+                result = event['result']
+                # 복수 질문은 일부가 실패해도 질문별 결과를 모두 표시
+                if not result['success'] and not result.get('multiple_questions'):
+                    yield f"❌ 처리 실패: {result.get('result', '알 수 없는 오류')}"
+                else:
+                    yield format_sql_result(result)
 
     except Exception as e:
-        return f"❌ 오류가 발생했습니다: {str(e)}"
+        yield f"❌ 오류가 발생했습니다: {str(e)}"
 
 
 def get_database_info():
     """데이터베이스 정보 표시"""
     try:
-        tables = db.get_usable_table_names()
-        return f"📊 **연결된 데이터베이스**\n\n**테이블**: {', '.join(tables)}"
+        tables = get_db().get_usable_table_names()
+        return (f"📊 **연결된 데이터베이스**\n\n**테이블**: {', '.join(tables)}\n\n"
+                f"🔌 **커넥션 풀**: {format_pool_metrics()}")
     except Exception as e:
         return f"❌ 데이터베이스 정보를 가져올 수 없습니다: {e}"
 
@@ -90,6 +144,7 @@ def get_database_info():
 
 def create_gradio_interface():
     """Gradio 인터페이스 생성"""
+    import gradio as gr
 
     # 예시 질문들
     examples = [
@@ -134,20 +189,26 @@ def create_gradio_interface():
     return demo
 
 
+def warm_up():
+    """첫 질문 지연을 줄이기 위해 DB 연결과 LLM 클라이언트를 미리 생성"""
+    try:
+        get_db()
+    except Exception:
+        print("⚠️ 데이터베이스 연결을 확인해주세요. 연결되면 질문 시 자동으로 다시 시도합니다.")
+    try:
+        get_translator_llm()
+        get_sql_llm()
+    except Exception as e:
+        print(f"⚠️ LLM 초기화 실패 (질문 시 다시 시도): {e}")
+
+
 def main():
     """메인 함수"""
     print("🚀 SQL Agent Gradio 챗봇 시작")
     print("="*50)
 
-    # 데이터베이스 연결 확인
-    try:
-        tables = db.get_usable_table_names()
-        print(f"✅ 데이터베이스 연결 성공")
-        print(f"📊 사용 가능한 테이블: {tables}")
-    except Exception as e:
-        print(f"❌ 데이터베이스 연결 실패: {e}")
-        print("⚠️ 데이터베이스 연결을 확인해주세요.")
-        return
+    # DB/LLM 연결은 서버 시작을 막지 않도록 백그라운드에서 미리 준비
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
 
     # Gradio 인터페이스 생성 및 실행
     demo = create_gradio_interface()
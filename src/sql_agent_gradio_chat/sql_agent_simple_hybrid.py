@@ -3,56 +3,111 @@
 Gemini(번역) + CodeLlama(SQL생성) - Agent 없이 직접 호출
 """
 import sys
-import re
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
-from langchain_community.utilities import SQLDatabase
-from langchain_ollama import OllamaLLM
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
-print("🤖 간단한 하이브리드 SQL Agent - 직접 생성 방식")
-
-# 번역용 Gemini
-translator_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0
-)
-print("✅ Gemini 번역 모델 로드 완료")
-
-# SQL 생성용 Gemini
-sql_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0
-)
-# SQL 생성용 CodeLlama (주석 처리)
-# https://ollama.com/library/codeqwen
-# sql_llm = OllamaLLM(
-#     model="codeqwen:latest",
-#     temperature=0
-# )
-print("✅ Gemini SQL 모델 로드 완료")
-
-# MySQL 연결
-db_uri = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
-
-try:
-    db = SQLDatabase.from_uri(db_uri)
+# 공통 모듈(src/sql_agent_common) 경로 추가
+sys.path.insert(0, os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+from sql_agent_common.schema_cache import schema_cache  # noqa: E402
+from sql_agent_common.schema_pruning import build_pruned_schema  # noqa: E402
+from sql_agent_common.translation_memory import has_korean, translation_memory  # noqa: E402
+from sql_agent_common.sql_cache import sql_cache  # noqa: E402
+from sql_agent_common.near_duplicate import near_duplicate_index  # noqa: E402
+from sql_agent_common.query_result import (  # noqa: E402
+    QueryResult, cached_fetch_structured, acached_fetch_structured)
+from sql_agent_common.single_flight import SingleFlight, question_key  # noqa: E402
+from sql_agent_common.cost_guard import QueryRejected  # noqa: E402
+from sql_agent_common.sql_tokens import clean_sql, classify_statement  # noqa: E402
+from sql_agent_common.lazy import LazyResource  # noqa: E402
+from sql_agent_common.db_pool import (  # noqa: E402
+    get_database, get_async_engine, format_pool_metrics)
+
+# ==========================================
+# 지연 초기화
+# LLM 클라이언트와 DB 연결은 처음 사용할 때 생성 (import는 가볍게 유지)
+# ==========================================
+def _create_translator_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    # 번역용 Gemini
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        temperature=0
+    )
+    print("✅ Gemini 번역 모델 로드 완료")
+    return llm
+
+
+def _create_sql_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    # SQL 생성용 Gemini
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-2.5-flash",
+        temperature=0
+    )
+    # SQL 생성용 CodeLlama (주석 처리)
+    # https://ollama.com/library/codeqwen
+    # from langchain_ollama import OllamaLLM
+    # llm = OllamaLLM(
+    #     model="codeqwen:latest",
+    #     temperature=0
+    # )
+    print("✅ Gemini SQL 모델 로드 완료")
+    return llm
+
+
+def _create_db():
+    # MySQL 연결 (프로세스 전역 커넥션 풀 공유)
+    try:
+        db = get_database()
+    except Exception as e:
+        print(f"❌ 데이터베이스 연결 실패: {e}")
+        raise
     print(f"✅ 데이터베이스 연결 성공")
     print(f"📊 테이블: {db.get_usable_table_names()}")
-except Exception as e:
-    print(f"❌ 데이터베이스 연결 실패: {e}")
-    exit(1)
+    return db
 
 
-def translate_to_english(korean_question):
-    """한국어 질문을 영어로 번역"""
-    try:
-        print(f"🌐 번역 중: {korean_question}")
+_translator_llm = LazyResource(_create_translator_llm)
+_sql_llm = LazyResource(_create_sql_llm)
+_db = LazyResource(_create_db)
+
+
+def get_translator_llm():
+    """번역용 LLM (첫 호출 시 생성)"""
+    return _translator_llm.get()
+
+
+def get_sql_llm():
+    """SQL 생성용 LLM (첫 호출 시 생성)"""
+    return _sql_llm.get()
+
+
+def get_db():
+    """SQLDatabase (첫 호출 시 연결, 실패하면 예외 - 다음 호출에서 재시도)"""
+    return _db.get()
+
 
-        translation_prompt = f"""
+def __getattr__(name):
+    """기존 코드 호환: 모듈 속성 db / translator_llm / sql_llm 접근 시 지연 생성"""
+    factories = {'db': get_db, 'translator_llm': get_translator_llm,
+                 'sql_llm': get_sql_llm}
+    if name in factories:
+        return factories[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def build_translation_prompt(korean_question):
+    """번역 프롬프트 생성"""
+    return f"""
 Translate the following Korean question to English. 
 Keep it simple and clear for database queries.
 If there are multiple questions separated by commas, translate each one clearly.
@@ -61,9 +116,43 @@ Only return the English translation, nothing else.
 Korean: {korean_question}
 English:"""
 
-        result = translator_llm.invoke(translation_prompt)
+
+def translate_to_english(korean_question):
+    """한국어 질문을 영어로 번역 (번역 메모리 우선 조회)"""
+    try:
+        cached = translation_memory.get('hybrid', korean_question)
+        if cached:
+            print(f"♻️ 번역 메모리 사용: {cached}")
+            return cached
+
+        print(f"🌐 번역 중: {korean_question}")
+
+        result = get_translator_llm().invoke(build_translation_prompt(korean_question))
         english_question = result.content.strip()
         print(f"✅ 번역 완료: {english_question}")
+        translation_memory.put('hybrid', korean_question, english_question)
+        return english_question
+
+    except Exception as e:
+        print(f"⚠️ 번역 실패, 원문 사용: {e}")
+        return korean_question
+
+
+async def atranslate_to_english(korean_question):
+    """translate_to_english의 비동기 버전 (번역 메모리는 SQLite I/O라 스레드에서 실행)"""
+    try:
+        cached = await asyncio.to_thread(translation_memory.get, 'hybrid', korean_question)
+        if cached:
+            print(f"♻️ 번역 메모리 사용: {cached}")
+            return cached
+
+        print(f"🌐 번역 중: {korean_question}")
+
+        result = await get_translator_llm().ainvoke(build_translation_prompt(korean_question))
+        english_question = result.content.strip()
+        print(f"✅ 번역 완료: {english_question}")
+        await asyncio.to_thread(translation_memory.put, 'hybrid', korean_question,
+                                english_question)
         return english_question
 
     except Exception as e:
@@ -88,29 +177,32 @@ def split_multiple_questions(question):
                 new_questions.append(q)
         questions = new_questions
 
-    # 중복 제거 및 빈 문자열 제거
-    questions = list(set([q for q in questions if q and len(q) > 3]))
+    # 중복 제거 및 빈 문자열 제거 (원래 순서 유지)
+    questions = list(dict.fromkeys(q for q in questions if q and len(q) > 3))
 
     return questions if len(questions) > 1 else [question]
 
 
-def is_korean(text):
-    """텍스트에 한글이 포함되어 있는지 확인"""
-    return any('\uac00' <= char <= '\ud7af' for char in text)
-
-
-def get_database_schema():
-    """데이터베이스에서 실제 스키마 정보 가져오기"""
+def get_database_schema(question=None):
+    """
+    데이터베이스에서 실제 스키마 정보 가져오기 (스키마 캐시 사용)
+    question이 주어지면 관련 테이블만 포함한 축소 스키마 반환
+    """
     try:
-        # 실제 데이터베이스 스키마 정보 가져오기
-        schema_info = db.get_table_info()
+        # DDL이 바뀌지 않았다면 캐시된 스키마 정보 재사용
+        snapshot = schema_cache.get_snapshot(get_db())
+        if question is None:
+            return snapshot.full_info
+
+        schema_info, tables = build_pruned_schema(snapshot, question)
+        print(f"🗂️ 프롬프트 스키마: {len(tables)}/{len(snapshot.table_names)}개 테이블 {tables}")
         return schema_info
     except Exception as e:
         print(f"⚠️ 스키마 정보 가져오기 실패: {e}")
 
         # 최소한의 fallback - 테이블 목록만 활용
         try:
-            table_names = db.get_usable_table_names()
+            table_names = get_db().get_usable_table_names()
             if table_names:
                 fallback_schema = f"""
 Available tables: {', '.join(table_names)}
@@ -133,49 +225,53 @@ Please generate SQL queries based on common database patterns and table/column n
 """
 
 
-def detect_query_type(english_question):
-    """질문에서 SQL 쿼리 타입 감지"""
-    question_lower = english_question.lower()
+# "create a report/chart ..."처럼 조회 결과를 만들어 달라는 요청에 쓰이는 단어
+_REPORT_WORDS = frozenset(['report', 'chart', 'graph', 'summary', 'list', 'table', 'view'])
 
-    # INSERT 키워드 감지
-    insert_keywords = ['add', 'insert', 'create', 'register', '추가', '등록', '생성']
-    if any(keyword in question_lower for keyword in insert_keywords):
-        return 'INSERT'
+# 명령문 앞에 붙는 말 ("please change ...", "can you delete ...")
+_REQUEST_PREFIXES = frozenset(['please', 'can', 'could', 'would', 'will', 'you', 'kindly'])
 
-    # UPDATE 키워드 감지
-    update_keywords = ['update', 'modify',
-                       'change', 'edit', '수정', '변경', '업데이트']
-    if any(keyword in question_lower for keyword in update_keywords):
-        return 'UPDATE'
+# 쿼리 타입별 명령 동사 (영어는 첫 동사, 한국어는 "변경해/삭제하" 같은 요청형만)
+_WRITE_KEYWORDS = [
+    ('INSERT', frozenset(['add', 'insert', 'create', 'register']), ['추가', '등록', '생성']),
+    ('UPDATE', frozenset(['update', 'modify', 'change', 'edit', 'set']),
+     ['수정', '변경', '업데이트']),
+    ('DELETE', frozenset(['delete', 'remove', 'drop']), ['삭제', '제거']),
+]
 
-    # DELETE 키워드 감지
-    delete_keywords = ['delete', 'remove', 'drop', '삭제', '제거']
-    if any(keyword in question_lower for keyword in delete_keywords):
-        return 'DELETE'
+
+def detect_query_type(english_question):
+    """
+    질문에서 SQL 생성 프롬프트 종류 추정
+    변경 요청은 명령문으로 시작하므로 첫 동사만 확인 ("How did rentals change?",
+    "Show the price changes"처럼 동사가 문장 중간에 있는 조회 질문은 SELECT)
+    (실제 실행 여부는 resolve_query_type으로 생성된 SQL을 보고 판단)
+    """
+    question_lower = english_question.lower()
+    # 영어 키워드는 단어 단위로 비교 ('address'의 add, 'last_update'의 update 오탐 방지)
+    words = ''.join(c if c.isalnum() or c == '_' else ' ' for c in question_lower).split()
+    verbs = [word for word in words if word not in _REQUEST_PREFIXES]
+    first = verbs[0] if verbs else ''
+    if first == 'create' and _REPORT_WORDS.intersection(words):
+        first = ''
+
+    for query_type, english, korean in _WRITE_KEYWORDS:
+        if first in english:
+            return query_type
+        # 번역 실패로 한국어가 그대로 온 경우: "변경해줘", "삭제하세요" (변경된/생성한 등은 조회)
+        if any(f"{keyword}해" in question_lower or f"{keyword}하" in question_lower
+               or f"{keyword} 해" in question_lower or f"{keyword} 하" in question_lower
+               for keyword in korean):
+            return query_type
 
     # 기본값은 SELECT
     return 'SELECT'
 
 
-def generate_sql_direct(english_question):
-    """CodeLlama로 직접 SQL 생성"""
-    try:
-        print(f"🔍 SQL 생성 중: {english_question}")
-
-        # 쿼리 타입 감지
-        query_type = detect_query_type(english_question)
-        print(f"🎯 감지된 쿼리 타입: {query_type}")
-
-        # 동적으로 스키마 정보 가져오기
-        schema_info = get_database_schema()
-
-        # 스키마 정보가 너무 부족한 경우 경고
-        if "Schema information is not available" in schema_info:
-            print("⚠️ 스키마 정보 없이 SQL 생성 시도 - 결과가 부정확할 수 있습니다")
-
-        # 쿼리 타입별 프롬프트 생성
-        if query_type == 'SELECT':
-            sql_prompt = f"""### Instructions:
+def build_sql_prompt(english_question, query_type, schema_info):
+    """쿼리 타입별 SQL 생성 프롬프트"""
+    if query_type == 'SELECT':
+        sql_prompt = f"""### Instructions:
 Your task is to convert a question into a SQL SELECT query, given a MySQL database schema.
 Adhere to these rules:
 - **Deliberately go through the question and database schema word by word** to appropriately answer the question
@@ -199,8 +295,8 @@ This query will run on a database whose schema is represented in this string:
 Based on your instructions, here is the SQL SELECT query I have generated to answer the question `{english_question}`:
 ```sql"""
 
-        elif query_type == 'INSERT':
-            sql_prompt = f"""### Instructions:
+    elif query_type == 'INSERT':
+        sql_prompt = f"""### Instructions:
 Your task is to convert a request into a SQL INSERT query, given a MySQL database schema.
 Adhere to these rules:
 - **Deliberately go through the request and database schema word by word** to create appropriate INSERT statement
@@ -218,8 +314,8 @@ This query will be based on a database whose schema is represented in this strin
 Based on your instructions, here is the SQL INSERT query I have generated for the request `{english_question}`:
 ```sql"""
 
-        elif query_type == 'UPDATE':
-            sql_prompt = f"""### Instructions:
+    elif query_type == 'UPDATE':
+        sql_prompt = f"""### Instructions:
 Your task is to convert a request into a SQL UPDATE query, given a MySQL database schema.
 Adhere to these rules:
 - **Deliberately go through the request and database schema word by word** to create appropriate UPDATE statement
@@ -237,8 +333,8 @@ This query will be based on a database whose schema is represented in this strin
 Based on your instructions, here is the SQL UPDATE query I have generated for the request `{english_question}`:
 ```sql"""
 
-        elif query_type == 'DELETE':
-            sql_prompt = f"""### Instructions:
+    elif query_type == 'DELETE':
+        sql_prompt = f"""### Instructions:
 Your task is to convert a request into a SQL DELETE query, given a MySQL database schema.
 Adhere to these rules:
 - **Deliberately go through the request and database schema word by word** to create appropriate DELETE statement
@@ -255,36 +351,46 @@ This query will be based on a database whose schema is represented in this strin
 Based on your instructions, here is the SQL DELETE query I have generated for the request `{english_question}`:
 ```sql"""
 
-        result = sql_llm.invoke(sql_prompt)
-        # sql_query = result.strip() # Ollama 모델
-        sql_query = result.content.strip()  # Gemini 모델
-
-        # SQLCoder 형식 정리 - 더 강력한 정리 로직
-        # 1. 코드 블록 마커 제거
-        sql_query = re.sub(r'^```sql\s*', '', sql_query, flags=re.MULTILINE)
-        sql_query = re.sub(r'^```\s*', '', sql_query, flags=re.MULTILINE)
-        sql_query = re.sub(r'\s*```\s*$', '', sql_query, flags=re.MULTILINE)
-        sql_query = re.sub(r'```', '', sql_query)  # 남은 모든 ``` 제거
-
-        # 2. 불필요한 설명 제거
-        lines = sql_query.split('\n')
-        sql_lines = []
-        for line in lines:
-            line = line.strip()
-            # SQL 쿼리 라인만 유지
-            if (line and
-                not line.startswith('--') and
-                not line.lower().startswith('based on') and
-                not line.lower().startswith('here is') and
-                not line.lower().startswith('the sql') and
-                    not line.lower().startswith('this query')):
-                sql_lines.append(line)
-
-        sql_query = '\n'.join(sql_lines).strip()
-
-        # 3. 세미콜론으로 끝나도록 보장
-        if sql_query and not sql_query.endswith(';'):
-            sql_query += ';'
+    return sql_prompt
+
+
+def clean_generated_sql(raw_output):
+    """LLM 출력에서 SQL만 남기도록 정리 (코드 블록/주석/설명 제거, 첫 문장만)"""
+    sql_query = clean_sql(raw_output)
+
+    # 세미콜론으로 끝나도록 보장
+    return f"{sql_query};" if sql_query else sql_query
+
+
+def resolve_query_type(sql_query, hinted_type):
+    """실행 여부는 질문 키워드가 아니라 생성된 SQL 자체로 판단"""
+    statement_type = classify_statement(sql_query) or 'OTHER'
+    if statement_type != hinted_type:
+        print(f"🎯 생성된 SQL 기준 쿼리 타입: {hinted_type} -> {statement_type}")
+    return statement_type
+
+
+def generate_sql_direct(english_question):
+    """CodeLlama로 직접 SQL 생성"""
+    try:
+        print(f"🔍 SQL 생성 중: {english_question}")
+
+        # 쿼리 타입 감지
+        query_type = detect_query_type(english_question)
+        print(f"🎯 감지된 쿼리 타입: {query_type}")
+
+        # 동적으로 스키마 정보 가져오기 (질문 관련 테이블만)
+        schema_info = get_database_schema(english_question)
+
+        # 스키마 정보가 너무 부족한 경우 경고
+        if "Schema information is not available" in schema_info:
+            print("⚠️ 스키마 정보 없이 SQL 생성 시도 - 결과가 부정확할 수 있습니다")
+
+        sql_prompt = build_sql_prompt(english_question, query_type, schema_info)
+
+        result = get_sql_llm().invoke(sql_prompt)
+        # sql_query = clean_generated_sql(result) # Ollama 모델
+        sql_query = clean_generated_sql(result.content)  # Gemini 모델
 
         print(f"✅ SQL 생성 완료: {sql_query[:50]}...")
         return sql_query
@@ -294,79 +400,289 @@ Based on your instructions, here is the SQL DELETE query I have generated for th
         return None
 
 
+async def agenerate_sql_direct(english_question):
+    """generate_sql_direct의 비동기 버전"""
+    try:
+        print(f"🔍 SQL 생성 중: {english_question}")
+
+        query_type = detect_query_type(english_question)
+        print(f"🎯 감지된 쿼리 타입: {query_type}")
+
+        # 스키마 캐시 재검증은 DB 조회가 필요할 수 있으므로 스레드에서 실행
+        schema_info = await asyncio.to_thread(get_database_schema, english_question)
+
+        if "Schema information is not available" in schema_info:
+            print("⚠️ 스키마 정보 없이 SQL 생성 시도 - 결과가 부정확할 수 있습니다")
+
+        sql_prompt = build_sql_prompt(english_question, query_type, schema_info)
+
+        result = await get_sql_llm().ainvoke(sql_prompt)
+        sql_query = clean_generated_sql(result.content)
+
+        print(f"✅ SQL 생성 완료: {sql_query[:50]}...")
+        return sql_query
+
+    except Exception as e:
+        print(f"❌ SQL 생성 실패: {e}")
+        return None
+
+
+def get_sql_cache_context():
+    """SQL 캐시 키에 필요한 (스키마 지문, 모델 ID) - 지문 조회 실패 시 None"""
+    try:
+        sql_llm = get_sql_llm()
+        model_id = getattr(sql_llm, 'model', None) or type(sql_llm).__name__
+        return schema_cache.fingerprint(get_db()), model_id
+    except Exception as e:
+        print(f"⚠️ 스키마 지문 조회 실패, SQL 캐시 미사용: {e}")
+        return None
+
+
+# 채팅 응답에 표시할 최대 행 수 (서버 사이드 커서로 이만큼만 읽음)
+QUERY_DISPLAY_ROWS = int(os.getenv('QUERY_DISPLAY_ROWS', '10'))
+
+
+def format_query_result(result):
+    """쿼리 결과를 읽기 쉽게 포맷팅"""
+    if isinstance(result, QueryResult):
+        if result.empty:
+            return "(결과 없음)"
+        # 컬럼명 + 행을 테이블 형태로 변환
+        formatted_result = [" | ".join(result.columns)]
+        for row in result.rows:
+            formatted_result.append(" | ".join(str(item) for item in row))
+        if result.truncated:
+            formatted_result.append(f"... (상위 {len(result)}행만 표시)")
+        if result.limited_reason:
+            formatted_result.append(f"✂️ {result.limited_reason}")
+        return "\n".join(formatted_result)
+    elif isinstance(result, str):
+        return result
+    elif isinstance(result, list) and result:
+        if isinstance(result[0], tuple):
+            # 튜플 리스트를 테이블 형태로 변환
+            formatted_result = []
+            for row in result[:QUERY_DISPLAY_ROWS]:
+                formatted_result.append(
+                    " | ".join(str(item) for item in row))
+            return "\n".join(formatted_result)
+
+    return str(result)
+
+
+def skipped_query_message(sql_query, query_type):
+    """INSERT, UPDATE, DELETE는 실행하지 않고 쿼리만 표시"""
+    print(f"⚠️ {query_type} 쿼리는 실행하지 않습니다 (안전을 위해)")
+    return f"✅ {query_type} 쿼리가 생성되었습니다.\n실제 실행을 원하시면 직접 데이터베이스에서 실행해주세요.\n\n생성된 쿼리:\n{sql_query}"
+
+
+def rejected_query_message(error):
+    """비용 검사에서 거부된 쿼리 안내"""
+    return f"🛑 실행 비용이 커서 쿼리를 실행하지 않았습니다: {error.reason}\n조건을 더 구체적으로 질문해주세요."
+
+
 def execute_sql_and_format(sql_query, query_type='SELECT'):
-    """SQL 실행 및 결과 포맷팅 - SELECT만 실행, 나머지는 쿼리만 표시"""
+    """
+    SQL 실행 및 결과 포맷팅 - SELECT만 실행, 나머지는 쿼리만 표시
+    반환: (결과 문자열, 비용 검사 거부 사유 또는 None)
+    """
     try:
         if query_type == 'SELECT':
             print(f"🔍 SQL 실행: {sql_query}")
-            result = db.run(sql_query)
+            # 실행 전 비용 검사 후 표시할 행까지만 스트리밍으로 읽음 (결과 캐시 사용)
+            result = cached_fetch_structured(
+                get_db(), sql_query, max_rows=QUERY_DISPLAY_ROWS, guard=True)
             print(f"✅ 실행 성공")
-
-            # 결과를 읽기 쉽게 포맷팅
-            if isinstance(result, str):
-                return result
-            elif isinstance(result, list) and result:
-                if isinstance(result[0], tuple):
-                    # 튜플 리스트를 테이블 형태로 변환
-                    formatted_result = []
-                    for row in result[:10]:  # 상위 10개만
-                        formatted_result.append(
-                            " | ".join(str(item) for item in row))
-                    return "\n".join(formatted_result)
-
-            return str(result)
+            return format_query_result(result), None
 
         else:
-            # INSERT, UPDATE, DELETE는 실행하지 않고 쿼리만 표시
-            print(f"⚠️ {query_type} 쿼리는 실행하지 않습니다 (안전을 위해)")
-            return f"✅ {query_type} 쿼리가 생성되었습니다.\n실제 실행을 원하시면 직접 데이터베이스에서 실행해주세요.\n\n생성된 쿼리:\n{sql_query}"
+            return skipped_query_message(sql_query, query_type), None
 
+    except QueryRejected as e:
+        return rejected_query_message(e), e.reason
     except Exception as e:
         print(f"❌ SQL 실행 실패: {e}")
-        return f"오류: {e}"
+        return f"오류: {e}", None
 
 
-def process_single_question(question):
-    """단일 질문 처리"""
-    print(f"\n🔍 질문 처리: {question}")
+def lookup_cached_sql(english_question, query_type, cache_context):
+    """캐시된 SQL 조회 (정확히 같은 질문 -> 유사 질문 순) - 반환: (sql, 출처)"""
+    if not cache_context:
+        return None, 'llm'
 
-    # 1. 번역 (필요시)
-    if is_korean(question):
-        english_question = translate_to_english(question)
-    else:
-        english_question = question
-        print(f"🔤 영어 질문 감지: {english_question}")
+    sql_query = sql_cache.get(english_question, query_type, *cache_context)
+    if sql_query:
+        print(f"♻️ SQL 캐시 사용: {sql_query[:50]}...")
+        return sql_query, 'cache'
+
+    match = near_duplicate_index.lookup(
+        english_question, query_type, *cache_context)
+    if match:
+        sql_query, similarity, similar_question = match
+        print(f"♻️ 유사 질문 SQL 재사용 ({similarity:.2f}): {similar_question}")
+        sql_cache.put(english_question, query_type,
+                      *cache_context, sql_query)
+        return sql_query, 'near_duplicate'
+
+    return None, 'llm'
 
-    # 2. 쿼리 타입 감지
-    query_type = detect_query_type(english_question)
 
-    # 3. SQL 생성
-    sql_query = generate_sql_direct(english_question)
+def remember_generated_sql(english_question, query_type, cache_context, sql_query):
+    """새로 생성한 SQL을 캐시에 저장"""
+    if sql_query and cache_context:
+        sql_cache.put(english_question, query_type,
+                      *cache_context, sql_query)
+        near_duplicate_index.add(english_question, query_type,
+                                 *cache_context, sql_query)
+
+
+def build_question_result(question, english_question, query_type,
+                          sql_query, sql_source, result, rejected_reason=None):
+    """질문 처리 결과 dict (rejected_reason: 비용 검사에서 거부된 사유)"""
     if not sql_query:
         return {
             'question': question,
             'english_question': english_question,
             'query_type': query_type,
             'sql_query': None,
+            'sql_source': sql_source,
             'result': "SQL 생성 실패",
+            'rejected_reason': None,
             'success': False
         }
 
-    # 4. SQL 실행 (SELECT만 실행, 나머지는 쿼리만 표시)
-    result = execute_sql_and_format(sql_query, query_type)
-
     return {
         'question': question,
         'english_question': english_question,
         'query_type': query_type,
         'sql_query': sql_query,
+        'sql_source': sql_source,
         'result': result,
+        'rejected_reason': rejected_reason,
         'success': True
     }
 
 
+def process_single_question(question):
+    """단일 질문 처리"""
+    print(f"\n🔍 질문 처리: {question}")
+
+    # 1. 번역 (필요시)
+    if has_korean(question):
+        english_question = translate_to_english(question)
+    else:
+        english_question = question
+        print(f"🔤 영어 질문 감지: {english_question}")
+
+    # 2. 쿼리 타입 감지
+    query_type = detect_query_type(english_question)
+
+    # 3. SQL 생성 (같은/유사한 질문이면 캐시된 SQL 사용)
+    cache_context = get_sql_cache_context()
+    sql_query, sql_source = lookup_cached_sql(
+        english_question, query_type, cache_context)
+
+    if not sql_query:
+        sql_query = generate_sql_direct(english_question)
+        remember_generated_sql(english_question, query_type,
+                               cache_context, sql_query)
+
+    if not sql_query:
+        return build_question_result(question, english_question, query_type,
+                                     None, sql_source, None)
+
+    # 4. SQL 실행 (생성된 SQL이 SELECT일 때만 실행, 나머지는 쿼리만 표시)
+    query_type = resolve_query_type(sql_query, query_type)
+    result, rejected_reason = execute_sql_and_format(sql_query, query_type)
+
+    return build_question_result(question, english_question, query_type,
+                                 sql_query, sql_source, result, rejected_reason)
+
+
+# 복수 질문 동시 처리 설정
+SUBQUESTION_MAX_WORKERS = int(os.getenv('SUBQUESTION_MAX_WORKERS', '4'))
+SUBQUESTION_TIMEOUT_SEC = float(os.getenv('SUBQUESTION_TIMEOUT_SEC', '60'))
+
+# 시간 초과된 작업이 끝날 때까지 기다리지 않도록 프로세스 전역 풀 사용
+_subquestion_executor = ThreadPoolExecutor(
+    max_workers=SUBQUESTION_MAX_WORKERS,
+    thread_name_prefix='subquestion'
+)
+
+
+def failed_question_result(question, message):
+    """개별 질문 실패 결과"""
+    return {
+        'question': question,
+        'english_question': question,
+        'query_type': None,
+        'sql_query': None,
+        'sql_source': None,
+        'result': message,
+        'rejected_reason': None,
+        'success': False
+    }
+
+
+def process_questions_concurrently(questions, timeout=None):
+    """
+    여러 질문을 동시에 처리 (최대 SUBQUESTION_MAX_WORKERS개)
+    결과는 입력 순서를 유지하며, 질문별 시간 초과/오류는 해당 질문만 실패 처리
+    """
+    timeout = SUBQUESTION_TIMEOUT_SEC if timeout is None else timeout
+    started_at = {}
+
+    def run(index, q):
+        started_at[index] = time.monotonic()
+        return process_single_question(q)
+
+    futures = [_subquestion_executor.submit(run, i, q)
+               for i, q in enumerate(questions)]
+    results = [None] * len(questions)
+    pending = set(range(len(questions)))
+
+    while pending:
+        now = time.monotonic()
+        running = [started_at[i] + timeout - now
+                   for i in pending if i in started_at]
+        # 아직 시작하지 않은 질문이 있으면 시작 시각을 놓치지 않도록 짧게 대기
+        wait_time = min(running, default=1.0)
+        if len(running) < len(pending):
+            wait_time = min(wait_time, 1.0)
+        wait([futures[i] for i in pending], timeout=max(wait_time, 0),
+             return_when=FIRST_COMPLETED)
+
+        now = time.monotonic()
+        for i in list(pending):
+            future = futures[i]
+            if future.done():
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    print(f"❌ 질문 {i + 1} 처리 실패: {e}")
+                    results[i] = failed_question_result(
+                        questions[i], f"처리 실패: {e}")
+                pending.discard(i)
+            elif i in started_at and now - started_at[i] > timeout:
+                print(f"⏱️ 질문 {i + 1} 시간 초과 ({timeout:.0f}초)")
+                results[i] = failed_question_result(
+                    questions[i], f"시간 초과: {timeout:.0f}초 안에 처리되지 않았습니다")
+                pending.discard(i)
+
+    return results
+
+
+# 동시에 들어온 같은 질문은 한 번만 처리하고 결과를 공유
+question_flight = SingleFlight()
+
+
 def process_question(question):
-    """질문 처리 - 복수 질문 지원"""
+    """질문 처리 - 복수 질문은 동시에 처리, 처리 중인 같은 질문은 결과 공유"""
+    return question_flight.do(question_key('hybrid', question),
+                              _process_question, question)
+
+
+def _process_question(question):
     # 복수 질문 분리
     questions = split_multiple_questions(question)
 
@@ -374,13 +690,123 @@ def process_question(question):
         return process_single_question(questions[0])
 
     # 복수 질문 처리
-    print(f"\n🔍 복수 질문 감지: {len(questions)}개")
-    results = []
+    print(f"\n🔍 복수 질문 감지: {len(questions)}개 (동시 처리)")
+    results = process_questions_concurrently(questions)
+
+    return {
+        'question': question,
+        'multiple_questions': True,
+        'results': results,
+        'success': all(r['success'] for r in results)
+    }
 
-    for i, q in enumerate(questions, 1):
-        print(f"\n--- 질문 {i}/{len(questions)} ---")
-        result = process_single_question(q)
-        results.append(result)
+
+# ==========================================
+# 비동기 파이프라인
+# LLM 호출은 ainvoke, DB 실행은 ASYNC_DB_DRIVER(예: aiomysql)가 설정되면
+# 비동기 엔진을, 아니면 동기 엔진을 스레드에서 실행
+# ==========================================
+async def aexecute_sql_and_format(sql_query, query_type='SELECT'):
+    """execute_sql_and_format의 비동기 버전"""
+    if get_async_engine() is None:
+        return await asyncio.to_thread(execute_sql_and_format, sql_query, query_type)
+
+    try:
+        if query_type == 'SELECT':
+            print(f"🔍 SQL 실행: {sql_query}")
+            result = await acached_fetch_structured(
+                get_db(), get_async_engine(), sql_query,
+                max_rows=QUERY_DISPLAY_ROWS, guard=True)
+            print(f"✅ 실행 성공")
+            return format_query_result(result), None
+
+        else:
+            return skipped_query_message(sql_query, query_type), None
+
+    except QueryRejected as e:
+        return rejected_query_message(e), e.reason
+    except Exception as e:
+        print(f"❌ SQL 실행 실패: {e}")
+        return f"오류: {e}", None
+
+
+async def aprocess_single_question(question):
+    """process_single_question의 비동기 버전"""
+    print(f"\n🔍 질문 처리: {question}")
+
+    if has_korean(question):
+        english_question = await atranslate_to_english(question)
+    else:
+        english_question = question
+        print(f"🔤 영어 질문 감지: {english_question}")
+
+    query_type = detect_query_type(english_question)
+
+    # 스키마 지문 조회는 DB 접근이 필요할 수 있으므로 스레드에서 실행
+    cache_context = await asyncio.to_thread(get_sql_cache_context)
+    sql_query, sql_source = lookup_cached_sql(
+        english_question, query_type, cache_context)
+
+    if not sql_query:
+        sql_query = await agenerate_sql_direct(english_question)
+        remember_generated_sql(english_question, query_type,
+                               cache_context, sql_query)
+
+    if not sql_query:
+        return build_question_result(question, english_question, query_type,
+                                     None, sql_source, None)
+
+    query_type = resolve_query_type(sql_query, query_type)
+    result, rejected_reason = await aexecute_sql_and_format(sql_query, query_type)
+
+    return build_question_result(question, english_question, query_type,
+                                 sql_query, sql_source, result, rejected_reason)
+
+
+async def aprocess_questions_concurrently(questions, timeout=None, on_done=None):
+    """
+    process_questions_concurrently의 비동기 버전
+    세마포어로 동시 실행 수를 제한하고, 시간 제한은 실행을 시작한 시점부터 적용
+    on_done(index, result)이 주어지면 질문별 완료 시점에 호출
+    """
+    timeout = SUBQUESTION_TIMEOUT_SEC if timeout is None else timeout
+    semaphore = asyncio.Semaphore(SUBQUESTION_MAX_WORKERS)
+
+    async def run_limited(index, q):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(aprocess_single_question(q), timeout)
+            except asyncio.TimeoutError:
+                print(f"⏱️ 질문 {index + 1} 시간 초과 ({timeout:.0f}초)")
+                return failed_question_result(
+                    q, f"시간 초과: {timeout:.0f}초 안에 처리되지 않았습니다")
+            except Exception as e:
+                print(f"❌ 질문 {index + 1} 처리 실패: {e}")
+                return failed_question_result(q, f"처리 실패: {e}")
+
+    async def run(index, q):
+        result = await run_limited(index, q)
+        if on_done:
+            on_done(index, result)
+        return result
+
+    return list(await asyncio.gather(*(run(i, q) for i, q in enumerate(questions))))
+
+
+async def aprocess_question(question):
+    """process_question의 비동기 버전"""
+    return await question_flight.ado(question_key('hybrid', question),
+                                     _aprocess_question, question)
+
+
+async def _aprocess_question(question):
+    questions = split_multiple_questions(question)
+
+    if len(questions) == 1:
+        return await aprocess_single_question(questions[0])
+
+    print(f"\n🔍 복수 질문 감지: {len(questions)}개 (동시 처리)")
+    results = await aprocess_questions_concurrently(questions)
 
     return {
         'question': question,
@@ -390,6 +816,137 @@ def process_question(question):
     }
 
 
+# ==========================================
+# 단계별 스트리밍
+# 번역 -> SQL 토큰 -> 실행 결과 순으로 이벤트 dict를 yield
+#   {'stage': 'start', 'question', 'multiple_questions'}
+#   {'stage': 'translation', 'english_question', 'query_type'}
+#   {'stage': 'sql_token', 'text'}
+#   {'stage': 'sql', 'sql_query', 'sql_source'}
+#   {'stage': 'progress', 'index', 'result'}  (복수 질문의 개별 완료)
+#   {'stage': 'done', 'result'}  (process_question과 같은 결과 dict)
+# ==========================================
+async def astream_sql_tokens(english_question, query_type):
+    """SQL 생성 LLM 출력을 토큰 단위로 yield"""
+    schema_info = await asyncio.to_thread(get_database_schema, english_question)
+    sql_prompt = build_sql_prompt(english_question, query_type, schema_info)
+    async for chunk in get_sql_llm().astream(sql_prompt):
+        if chunk.content:
+            yield chunk.content
+
+
+async def astream_single_question(question):
+    """단일 질문을 처리하면서 단계별 이벤트 yield"""
+    print(f"\n🔍 질문 처리: {question}")
+
+    if has_korean(question):
+        english_question = await atranslate_to_english(question)
+    else:
+        english_question = question
+        print(f"🔤 영어 질문 감지: {english_question}")
+
+    query_type = detect_query_type(english_question)
+    yield {'stage': 'translation', 'english_question': english_question,
+           'query_type': query_type}
+
+    cache_context = await asyncio.to_thread(get_sql_cache_context)
+    sql_query, sql_source = lookup_cached_sql(
+        english_question, query_type, cache_context)
+
+    if not sql_query:
+        print(f"🔍 SQL 생성 중 (스트리밍): {english_question}")
+        chunks = []
+        try:
+            async for token in astream_sql_tokens(english_question, query_type):
+                chunks.append(token)
+                yield {'stage': 'sql_token', 'text': token}
+            sql_query = clean_generated_sql(''.join(chunks))
+            print(f"✅ SQL 생성 완료: {sql_query[:50]}...")
+        except Exception as e:
+            print(f"❌ SQL 생성 실패: {e}")
+            sql_query = None
+        remember_generated_sql(english_question, query_type,
+                               cache_context, sql_query)
+
+    if not sql_query:
+        yield {'stage': 'done', 'result': build_question_result(
+            question, english_question, query_type, None, sql_source, None)}
+        return
+
+    yield {'stage': 'sql', 'sql_query': sql_query, 'sql_source': sql_source}
+
+    query_type = resolve_query_type(sql_query, query_type)
+    result, rejected_reason = await aexecute_sql_and_format(sql_query, query_type)
+    yield {'stage': 'done', 'result': build_question_result(
+        question, english_question, query_type, sql_query, sql_source, result,
+        rejected_reason)}
+
+
+async def astream_process_question(question):
+    """
+    process_question의 스트리밍 버전
+    같은 질문이 처리 중이면 중간 단계 없이 그 결과를 기다려 'done'만 전달
+    """
+    key = question_key('hybrid', question)
+    future, leader = question_flight.begin(key)
+
+    if not leader:
+        print("🔗 같은 질문이 처리 중이어서 결과를 공유합니다")
+        yield {'stage': 'start', 'question': question,
+               'multiple_questions': len(split_multiple_questions(question)) > 1}
+        yield {'stage': 'done', 'result': await question_flight.await_future(future)}
+        return
+
+    final_result = None
+    try:
+        async for event in _astream_process_question(question):
+            if event['stage'] == 'done':
+                final_result = event['result']
+            yield event
+    except BaseException as e:
+        # 스트림이 중간에 닫혀도 기다리는 호출자가 멈추지 않도록 전달
+        if not isinstance(e, Exception):
+            e = RuntimeError("처리가 중단되었습니다")
+        question_flight.finish(key, future, error=e)
+        raise
+    if final_result is None:
+        question_flight.finish(key, future, error=RuntimeError("결과 없이 종료되었습니다"))
+    else:
+        question_flight.finish(key, future, final_result)
+
+
+async def _astream_process_question(question):
+    """복수 질문은 동시에 처리하고 질문별 완료 시점에 'progress' 이벤트를 yield"""
+    questions = split_multiple_questions(question)
+    yield {'stage': 'start', 'question': question,
+           'multiple_questions': len(questions) > 1}
+
+    if len(questions) == 1:
+        async for event in astream_single_question(questions[0]):
+            yield event
+        return
+
+    print(f"\n🔍 복수 질문 감지: {len(questions)}개 (동시 처리)")
+    completed = asyncio.Queue()
+    task = asyncio.ensure_future(aprocess_questions_concurrently(
+        questions, on_done=lambda i, r: completed.put_nowait((i, r))))
+    try:
+        for _ in questions:
+            index, sub_result = await completed.get()
+            yield {'stage': 'progress', 'index': index, 'result': sub_result}
+        results = await task
+    finally:
+        if not task.done():
+            task.cancel()
+
+    yield {'stage': 'done', 'result': {
+        'question': question,
+        'multiple_questions': True,
+        'results': results,
+        'success': all(r['success'] for r in results)
+    }}
+
+
 if __name__ == "__main__":
     print("\n" + "="*50)
     print("🤖 간단한 하이브리드 SQL Agent")
@@ -2,166 +2,182 @@
 SQL Agent with 인포그래픽
 """
 import sys
-from io import StringIO
 import re
+import time
 from datetime import datetime
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
-from langchain_community.agent_toolkits import create_sql_agent
-from langchain_community.utilities import SQLDatabase
 import os
-from langchain_ollama.llms import OllamaLLM
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
+# 공통 모듈(src/sql_agent_common) 경로 추가
+sys.path.insert(0, os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+from sql_agent_common.batch_checkpoint import batch_checkpoint, make_batch_id  # noqa: E402
+from sql_agent_common.insights import generate_insights  # noqa: E402
+from sql_agent_common.translation_memory import has_korean, translation_memory  # noqa: E402
+from sql_agent_common.query_result import load_chart_data  # noqa: E402
+from sql_agent_common.sql_tokens import parse_sql  # noqa: E402
+from sql_agent_common.db_pool import get_database  # noqa: E402
+from sql_agent_common.lazy import LazyResource  # noqa: E402
 
-# LLM 설정 - 하이브리드 접근법
-translator_llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash", temperature=0)  # 한국어 번역
-sql_llm = OllamaLLM(
-    model="codeqwen:latest",
-    base_url="http://localhost:11434"
-)  # SQL 특화
-# 대안 모델들:
-# sql_llm = OllamaLLM(model="deepseek-coder:6.7b", base_url="http://localhost:11434")  # 경량 SQL
-# sql_llm = OllamaLLM(model="starcoder2:7b", base_url="http://localhost:11434")  # 또 다른 선택
 
-# 기본 LLM (SQL Agent용) - 안정성을 위해 Gemini 사용
-# llm = translator_llm  # Gemini로 통일 (번역 + SQL 생성)
+# ==========================================
+# 지연 초기화 - LLM/DB/Agent는 처음 사용할 때 생성
+# ==========================================
+def _create_translator_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
-# MySQL 연결 설정
-db_uri = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}?charset=utf8mb4"
+    # 한국어 번역
+    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
 
-try:
-    db = SQLDatabase.from_uri(db_uri)
+
+def _create_sql_llm():
+    from langchain_ollama.llms import OllamaLLM
+
+    # SQL 특화
+    return OllamaLLM(
+        model="codeqwen:latest",
+        base_url="http://localhost:11434"
+    )
+    # 대안 모델들:
+    # return OllamaLLM(model="deepseek-coder:6.7b", base_url="http://localhost:11434")  # 경량 SQL
+    # return OllamaLLM(model="starcoder2:7b", base_url="http://localhost:11434")  # 또 다른 선택
+
+    # 기본 LLM (SQL Agent용) - 안정성을 위해 Gemini 사용
+    # return get_translator_llm()  # Gemini로 통일 (번역 + SQL 생성)
+
+
+def _create_db():
+    # MySQL 연결 설정 (프로세스 전역 커넥션 풀 공유)
+    try:
+        db = get_database()
+    except Exception as e:
+        print(f"❌ 데이터베이스 연결 실패: {e}")
+        raise
     print(f"✅ 데이터베이스 연결 성공")
     print(f"📊 사용 가능한 테이블: {db.get_usable_table_names()}")
-except Exception as e:
-    print(f"❌ 데이터베이스 연결 실패: {e}")
-    exit(1)
-
-# SQL Agent 생성
-agent_executor = create_sql_agent(
-    # llm=llm,
-    llm=sql_llm,
-    db=db,
-    # agent_type="openai-tools",  # Gemini는 openai-tools 지원
-    agent_type="zero-shot-react-description",
-    verbose=True,
-    handle_parsing_errors=True  # 파싱 오류 처리 활성화
-)
+    return db
+
+
+def _create_agent_executor():
+    from langchain_community.agent_toolkits import create_sql_agent
+    from sql_agent_common.agent_tools import CapturingSQLDatabaseToolkit
+
+    # SQL Agent 생성 (sql_db_query 결과를 차트에서 재사용할 수 있도록 캡처 도구 사용)
+    llm = get_sql_llm()
+    return create_sql_agent(
+        llm=llm,
+        toolkit=CapturingSQLDatabaseToolkit(db=get_db(), llm=llm),
+        # agent_type="openai-tools",  # Gemini는 openai-tools 지원
+        agent_type="zero-shot-react-description",
+        verbose=False,  # SQL은 콜백으로 기록하므로 로그 출력 불필요
+        handle_parsing_errors=True  # 파싱 오류 처리 활성화
+    )
+
+
+def _create_seeded_agent_executor():
+    from sql_agent_common.agent_tools import create_seeded_sql_agent
+
+    # 질문 관련 스키마를 프롬프트에 미리 넣어 테이블 목록/스키마 조회 반복을 건너뜀
+    return create_seeded_sql_agent(
+        get_sql_llm(),
+        get_db(),
+        agent_type="zero-shot-react-description",
+        verbose=False,
+        handle_parsing_errors=True
+    )
+
+
+def _create_sql_graph():
+    from sql_agent_common.sql_graph import build_sql_graph
+
+    # 번역 -> 스키마 -> SQL 생성 -> 검증 -> 실행 (실패 시 오류를 알려주고 다시 생성)
+    return build_sql_graph(get_db, get_sql_llm, translate=translate_korean_to_english)
+
+
+_translator_llm = LazyResource(_create_translator_llm)
+_sql_llm = LazyResource(_create_sql_llm)
+_db = LazyResource(_create_db)
+_agent_executor = LazyResource(_create_agent_executor)
+_seeded_agent_executor = LazyResource(_create_seeded_agent_executor)
+_sql_graph = LazyResource(_create_sql_graph)
+
+
+def get_translator_llm():
+    return _translator_llm.get()
+
+
+def get_sql_llm():
+    return _sql_llm.get()
+
+
+def get_analysis_llm():
+    """종합 의견용 LLM (한국어 문장 생성이므로 번역과 같은 Gemini 사용)"""
+    return get_translator_llm()
+
+
+def get_db():
+    return _db.get()
+
+
+def get_agent_executor():
+    return _agent_executor.get()
+
+
+def get_seeded_agent_executor():
+    return _seeded_agent_executor.get()
+
+
+def get_sql_graph():
+    return _sql_graph.get()
+
 
 # 인포그래픽 디렉토리 생성
 infographic_dir = "infographics"
 if not os.path.exists(infographic_dir):
     os.makedirs(infographic_dir)
 
+# 여러 질문 번역을 한 번에 요청할 때 동시 LLM 호출 수
+LLM_BATCH_CONCURRENCY = int(os.getenv('LLM_BATCH_CONCURRENCY', '4'))
+
 
-def create_infographic_from_sql_query(sql_query, question):
+def batch_invoke(llm, prompts):
     """
-    SQL 쿼리를 직접 실행하고 인포그래픽 생성
+    여러 프롬프트를 llm.batch로 동시에 요청 (최대 LLM_BATCH_CONCURRENCY개)
+    반환: 프롬프트별 응답 문자열 또는 예외 (일부가 실패해도 나머지는 사용)
     """
+    if not prompts:
+        return []
+    outputs = llm.batch(prompts, config={'max_concurrency': LLM_BATCH_CONCURRENCY},
+                        return_exceptions=True)
+    return [output if isinstance(output, Exception)
+            else getattr(output, 'content', output).strip()
+            for output in outputs]
+
+
+def create_infographic_from_sql_query(sql_query, question, query_result=None):
+    """
+    SQL 쿼리 결과로 인포그래픽 생성
+    query_result: Agent가 실행한 결과 (있으면 재조회하지 않음)
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     try:
         print(f"\n🔍 === 인포그래픽 생성 시작 ===")
         print(f"📝 SQL 쿼리: {sql_query}")
 
-        # SQL 쿼리 직접 실행
-        result = db.run(sql_query)
-        print(f"🔍 쿼리 결과 타입: {type(result)}")
-        print(f"🔍 쿼리 결과: {result}")
+        query_result = load_chart_data(get_db(), sql_query, query_result)
+        print(f"🔍 쿼리 결과: {len(query_result)}행, 컬럼 {query_result.columns}")
 
         # DataFrame 변환
-        df = None
-
-        if isinstance(result, list) and result:
-            if isinstance(result[0], tuple):
-                # 컬럼 수에 따라 적절한 컬럼명 생성
-                num_cols = len(result[0])
-                if num_cols == 2:
-                    columns = ['name', 'value']
-                elif num_cols == 3:
-                    columns = ['col1', 'col2', 'col3']
-                else:
-                    columns = [f'col_{i+1}' for i in range(num_cols)]
-
-                df = pd.DataFrame(result, columns=columns)
-                print(f"✅ DataFrame 생성 성공: {df.shape}")
-                print(f"📊 데이터 미리보기:\n{df.head()}")
-
-        elif isinstance(result, str):
-            # 문자열 결과 파싱 (Decimal 객체 처리 포함)
-            print("📝 문자열 결과 파싱 중...")
-            try:
-                # Decimal 객체를 처리하기 위한 안전한 파싱
-                import re
-                from decimal import Decimal
-
-                # Decimal('123.45') 패턴을 숫자로 변환
-                def decimal_replacer(match):
-                    return match.group(1)
-
-                # Decimal 객체를 숫자 문자열로 변환
-                cleaned_result = re.sub(
-                    r"Decimal\('([^']+)'\)", decimal_replacer, result)
-                print(f"🔧 Decimal 처리 후: {cleaned_result[:200]}...")
-
-                import ast
-                parsed_result = ast.literal_eval(cleaned_result)
-
-                if isinstance(parsed_result, list) and parsed_result:
-                    if isinstance(parsed_result[0], tuple):
-                        num_cols = len(parsed_result[0])
-                        if num_cols == 2:
-                            columns = ['name', 'value']
-                        elif num_cols == 3:
-                            columns = ['col1', 'col2', 'col3']
-                        else:
-                            columns = [f'col_{i+1}' for i in range(num_cols)]
-
-                        df = pd.DataFrame(parsed_result, columns=columns)
-                        print(f"✅ 문자열 파싱으로 DataFrame 생성 성공: {df.shape}")
-                        print(f"📊 데이터 미리보기:\n{df.head()}")
-
-            except Exception as e:
-                print(f"⚠️ 문자열 파싱 실패: {e}")
-                # 대안: 정규식으로 직접 파싱 시도
-                print("🔄 대안 파싱 방법 시도 중...")
-                try:
-                    import re
-                    # 튜플 패턴 찾기: ('값1', '값2', 숫자)
-                    pattern = r"\('([^']+)',\s*'([^']+)',\s*(?:Decimal\('([^']+)'\)|(\d+(?:\.\d+)?))\)"
-                    matches = re.findall(pattern, result)
-
-                    if matches:
-                        data = []
-                        for match in matches:
-                            # match는 (name1, name2, decimal_value, regular_number) 형태
-                            name1, name2, decimal_val, regular_val = match
-                            value = float(decimal_val) if decimal_val else float(
-                                regular_val)
-                            data.append((name1, name2, value))
-
-                        if data:
-                            df = pd.DataFrame(
-                                data, columns=['col1', 'col2', 'col3'])
-                            print(f"✅ 정규식 파싱으로 DataFrame 생성 성공: {df.shape}")
-                            print(f"📊 데이터 미리보기:\n{df.head()}")
-
-                except Exception as e2:
-                    print(f"⚠️ 대안 파싱도 실패: {e2}")
-
-        if df is None or df.empty:
+        df = query_result.to_dataframe()
+        if df.empty:
             print("⚠️ DataFrame 생성 실패")
             return None
 
-        # 숫자 컬럼 변환
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except (ValueError, TypeError):
-                pass
+        print(f"✅ DataFrame 생성 성공: {df.shape}")
+        print(f"📊 데이터 미리보기:\n{df.head()}")
 
         # 타임스탬프 생성
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -270,246 +286,169 @@ def create_infographic_from_sql_query(sql_query, question):
         return None
 
 
-def extract_sql_from_agent_output(captured_text):
-    """Agent 출력에서 SQL 쿼리 추출"""
-    # ANSI 색상 코드 제거
-    import re
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    cleaned_text = ansi_escape.sub('', captured_text)
-
-    patterns = [
-        # LangChain SQL Agent 패턴들
-        r"Invoking: `sql_db_query` with `\\{'query': '([^']+)'\\}`",
-        r'Action Input:\s*(SELECT[^}]+?)(?:\n|$)',
-        r'sql_db_query.*?query["\']:\s*["\']([^"\']+)["\']',
-        r'query.*?["\']([^"\']*SELECT[^"\']*)["\']',
-        # 순수 SQL 패턴
-        r'(SELECT\s+[^;]+?)(?:;|\n|$)',
-    ]
-
-    for pattern in patterns:
-        matches = re.findall(pattern, cleaned_text, re.DOTALL | re.IGNORECASE)
-        if matches:
-            for match in matches:
-                # 문자열 정리
-                clean_match = match.strip()
-
-                # ANSI 코드 다시 제거
-                clean_match = ansi_escape.sub('', clean_match)
-
-                # 마크다운 코드 블록 제거
-                clean_match = re.sub(r'```sql.*?```', '',
-                                     clean_match, flags=re.DOTALL)
-                clean_match = re.sub(
-                    r'```.*?```', '', clean_match, flags=re.DOTALL)
-                clean_match = clean_match.replace(
-                    '```sql', '').replace('```', '')
-
-                # Action/Thought 등 Agent 키워드 제거
-                agent_keywords = ['Action:', 'Thought:',
-                                  'Observation:', 'Final Answer:', 'Action Input:']
-                for keyword in agent_keywords:
-                    if keyword in clean_match:
-                        clean_match = clean_match.split(keyword)[0].strip()
-
-                # SELECT로 시작하는지 확인
-                if clean_match.upper().startswith('SELECT'):
-                    # 줄바꿈을 공백으로 변경하고 여러 공백을 하나로
-                    clean_match = re.sub(r'\s+', ' ', clean_match)
-
-                    # 마지막으로 한 번 더 마크다운 제거
-                    clean_match = clean_match.replace(
-                        '```sql', '').replace('```', '').strip()
-
-                    return clean_match
-
-    return None
-
-
-def extract_sql_from_agent_output_improved(captured_text):
-    import re
-    # 1. OpenAI Tool-Calling 및 Invoking 패턴 (가장 일반적인 LangChain SQL Agent 로그)
-    # LangChain v0.1.0 이후의 표준 로그 형태
-    pattern_invoke_tool = re.compile(
-        r'Invoking:\s*`sql_db_query`\s*with\s*`\{[\'"]query[\'"]:[\s\r\n]*[\'"](SELECT[^"\']*)[\'"]\}',
-        re.DOTALL | re.IGNORECASE
-    )
-    # 2. ReAct Action Input 패턴 (이스케이프된 따옴표 처리)
-    pattern_react_input = re.compile(
-        r'Action Input:\s*[\'"]?([s]*SELECT[^"\']*)[\'"]?',
-        re.DOTALL | re.IGNORECASE
-    )
-    # 3. 코드 블록 형태 (오류 발생 시 LLM이 임의로 생성하는 경우)
-    pattern_code_block = re.compile(
-        r'```[sS]QL\s*([^`]+)\s*```',
-        re.DOTALL | re.IGNORECASE
-    )
-
-    # ANSI 색상 코드 제거
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    cleaned_text = ansi_escape.sub('', captured_text)
-
-    # 패턴 순서대로 시도
-    for pattern in [pattern_invoke_tool, pattern_react_input, pattern_code_block]:
-        matches = pattern.findall(cleaned_text)
-        if matches:
-            # 첫 번째 일치하는 쿼리를 반환 (일반적으로 첫 번째 쿼리가 실행됨)
-            sql_query = matches[0].strip()
-            # 줄바꿈 및 다중 공백 정리
-            sql_query = re.sub(r'\s+', ' ', sql_query).strip()
-            if sql_query.upper().startswith('SELECT'):
-                return sql_query
+def run_agent(english_question, seeded=False):
+    """
+    SQL Agent 실행 - 도구 호출을 콜백으로 기록하고 반복 수/소요 시간 출력
+    seeded=True면 스키마를 프롬프트에 미리 넣은 Agent 사용
+    반환: (Agent 결과, SQLCaptureHandler, 소요 시간(초))
+    """
+    from sql_agent_common.agent_tools import seeded_schema
+    from sql_agent_common.sql_capture import SQLCaptureHandler
 
-    return None
+    started = time.perf_counter()
+    inputs = {"input": english_question}
+    if seeded:
+        inputs["schema"] = seeded_schema(get_db(), english_question)
+        executor = get_seeded_agent_executor()
+    else:
+        executor = get_agent_executor()
 
+    capture = SQLCaptureHandler()
+    result = executor.invoke(inputs, config={"callbacks": [capture]})
+    elapsed = time.perf_counter() - started
 
-def process_multiple_questions(questions_list):
-    """다중 질문을 처리하고 각각의 SQL 쿼리와 결과를 반환"""
-    results = []
+    tools = ", ".join(f"{name} {count}" for name, count in capture.tool_counts.items())
+    print(f"⏱️ Agent 실행 {elapsed:.2f}s (반복 {capture.iterations}회, 도구 호출: {tools or '없음'})")
+    return result, capture, elapsed
 
-    for i, original_question in enumerate(questions_list, 1):
-        print(f"\n🔍 질문 {i}/{len(questions_list)}: {original_question}")
 
-        # 한국어 질문을 영어로 번역
-        english_question = translate_korean_to_english(original_question)
-        print("🤔 처리 중...")
+def answer_question(question, english_question=None):
+    """
+    질문 하나 처리 (SQL_AGENT_MODE=graph: StateGraph 파이프라인, agent: 기존 SQL Agent,
+    agent_seeded: 스키마를 미리 넣은 SQL Agent)
+    반환: answer / sql_query / query_result / rejected_reason / limited_reason /
+    sql_events를 담은 dict
+    """
+    from sql_agent_common.sql_graph import (
+        SQL_AGENT_MODE, answer_from_agent, answer_from_state, run_sql_graph)
 
-        try:
-            # Agent 실행 (출력 캡처) - 영어 질문 사용
-            old_stdout = sys.stdout
-            captured_output = StringIO()
-            sys.stdout = captured_output
-
-            try:
-                result = agent_executor.invoke({"input": english_question})
-            finally:
-                sys.stdout = old_stdout
-
-            captured_text = captured_output.getvalue()
-
-            # SQL 쿼리 추출
-            sql_query = extract_sql_from_agent_output(captured_text)
-
-            if sql_query:
-                results.append({
-                    'question': original_question,  # 원본 한국어 질문 저장
-                    'english_question': english_question,  # 번역된 영어 질문도 저장
-                    'answer': result['output'],
-                    'sql_query': sql_query,
-                    'captured_text': captured_text
-                })
-                print(f"✅ 질문 {i} 처리 완료")
-                print(f"📝 실행된 SQL: {sql_query}")
-            else:
-                print(f"⚠️ 질문 {i}: SQL 쿼리를 찾을 수 없습니다.")
-                results.append({
-                    'question': original_question,  # 원본 한국어 질문 저장
-                    'english_question': english_question,
-                    'answer': result['output'],
-                    'sql_query': None,
-                    'captured_text': captured_text
-                })
+    if SQL_AGENT_MODE in ('agent', 'agent_seeded'):
+        english_question = english_question or translate_korean_to_english(question)
+        result, capture, elapsed = run_agent(
+            english_question, seeded=SQL_AGENT_MODE == 'agent_seeded')
+        return answer_from_agent(result, capture, english_question, elapsed)
 
-        except Exception as e:
-            print(f"❌ 질문 {i} 처리 중 오류: {e}")
-            results.append({
-                'question': original_question,  # 원본 한국어 질문 저장
-                'english_question': english_question if 'english_question' in locals() else original_question,
-                'answer': f"오류 발생: {e}",
-                'sql_query': None,
-                'captured_text': ""
-            })
+    state = run_sql_graph(get_sql_graph(), question, english_question)
+    return answer_from_state(state)
 
-    return results
 
+def process_question_item(i, total, original_question, english_question):
+    """다중 질문 중 하나를 처리해 결과 dict 반환 (오류도 결과로 기록)"""
+    print(f"\n🔍 질문 {i}/{total}: {original_question}")
+    print("🤔 처리 중...")
 
-def generate_data_analysis(df, question, chart_type):
-    """데이터 분석 코멘트 생성"""
     try:
-        # 데이터 요약 정보 생성
-        data_summary = f"데이터 행 수: {len(df)}, 컬럼 수: {len(df.columns)}"
-
-        # 숫자 컬럼 통계
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        if numeric_cols:
-            for col in numeric_cols:
-                stats = df[col].describe()
-                data_summary += f"\n{col} 통계: 평균 {stats['mean']:.2f}, 최대 {stats['max']:.2f}, 최소 {stats['min']:.2f}"
-
-        # 상위 데이터 정보
-        if len(df) > 0:
-            top_data = df.head(3).to_string(index=False)
-            data_summary += f"\n상위 3개 데이터:\n{top_data}"
-
-        # LLM을 사용한 분석 생성
-        analysis_prompt = f"""
-다음 데이터 분석 결과에 대해 간단하고 명확한 인사이트를 제공해주세요:
-
-질문: {question}
-차트 유형: {chart_type}
-데이터 요약: {data_summary}
-
-다음 형식으로 답변해주세요:
-1. 주요 발견사항 (2-3줄)
-2. 데이터 특징 (1-2줄)
-3. 비즈니스 시사점 (1-2줄)
-
-간결하고 실용적인 분석을 제공해주세요.
-"""
-
-        try:
-            analysis_result = llm.invoke(analysis_prompt)
-            return analysis_result.content.strip()
-        except Exception as e:
-            print(f"⚠️ LLM 분석 생성 실패: {e}")
-            return f"데이터 분석: {chart_type} 형태로 {len(df)}개의 데이터를 시각화했습니다."
+        # 그래프(또는 Agent) 실행 - 영어 질문 사용
+        answer = answer_question(original_question, english_question)
+        sql_query = answer['sql_query']
+
+        if sql_query:
+            print(f"✅ 질문 {i} 처리 완료")
+            print(f"📝 실행된 SQL: {sql_query}")
+            if answer['limited_reason']:
+                print(f"✂️ 질문 {i}: {answer['limited_reason']}")
+        elif answer['rejected_reason']:
+            print(f"🛑 질문 {i}: 비용 검사로 쿼리가 거부되었습니다 - {answer['rejected_reason']}")
+        else:
+            print(f"⚠️ 질문 {i}: SQL 쿼리를 찾을 수 없습니다.")
+        return {
+            'question': original_question,  # 원본 한국어 질문 저장
+            'english_question': english_question,  # 번역된 영어 질문도 저장
+            'answer': answer['answer'],
+            'sql_query': sql_query,
+            'query_result': answer['query_result'],  # 차트에서 재사용
+            'rejected_reason': answer['rejected_reason'],
+            'limited_reason': answer['limited_reason'],
+            'sql_events': answer['sql_events'],
+            'timings': answer['timings']
+        }
 
     except Exception as e:
-        print(f"⚠️ 데이터 분석 생성 오류: {e}")
-        return "데이터 분석을 생성할 수 없습니다."
+        print(f"❌ 질문 {i} 처리 중 오류: {e}")
+        return {
+            'question': original_question,  # 원본 한국어 질문 저장
+            'english_question': english_question,
+            'answer': f"오류 발생: {e}",
+            'sql_query': None,
+            'query_result': None,
+            'rejected_reason': None,
+            'limited_reason': None,
+            'sql_events': [],
+            'timings': {}
+        }
+
+
+def process_multiple_questions(questions_list, batch_id=None):
+    """
+    다중 질문을 처리하고 각각의 SQL 쿼리와 결과를 반환 (입력 순서 유지)
+    질문마다 그래프 분기를 만들어 최대 QUESTION_MAX_CONCURRENCY개씩 동시에 처리
+    질문별 결과는 완료 즉시 체크포인트에 저장되어, 중단된 배치를 다시 실행하면
+    완료된 질문은 건너뜀 (batch_id 기본값: 질문 목록 해시)
+    배치 처리가 끝나면 체크포인트를 삭제해 다음 실행은 최신 데이터로 처리
+    """
+    from sql_agent_common.sql_graph import QUESTION_MAX_CONCURRENCY, run_fanout
+
+    total = len(questions_list)
+    batch_id = batch_id or make_batch_id(questions_list)
+    results = [None] * total
+    for position, record in batch_checkpoint.load(batch_id, questions_list).items():
+        results[position] = record
+    pending = [position for position in range(total) if results[position] is None]
+    if len(pending) < total:
+        print(f"♻️ 배치 {batch_id}: 완료된 질문 {total - len(pending)}개 건너뜀, "
+              f"{len(pending)}개 처리")
+    else:
+        print(f"🗂️ 배치 ID: {batch_id}")
+    if not pending:
+        batch_checkpoint.clear(batch_id)
+        return results
+
+    # 한국어 질문을 영어로 번역 (번역 메모리에 없는 질문만 한 번에 요청)
+    english_questions = translate_questions([questions_list[p] for p in pending])
+
+    def process(item):
+        position, english_question = item
+        record = process_question_item(position + 1, total, questions_list[position],
+                                       english_question)
+        batch_checkpoint.save(batch_id, position, questions_list[position], record)
+        return record
+
+    print(f"🚀 질문 {len(pending)}개 동시 처리 "
+          f"(최대 {min(len(pending), QUESTION_MAX_CONCURRENCY)}개)")
+    started = time.perf_counter()
+    records = run_fanout(process, list(zip(pending, english_questions)))
+    print(f"⏱️ 질문 {len(pending)}개 처리 시간: {time.perf_counter() - started:.2f}s")
+
+    for position, record in zip(pending, records):
+        results[position] = record
+    # 끝까지 처리한 배치는 재개할 필요가 없으므로 결과와 관계없이 삭제
+    # (실패한 질문이 있어도 다음 실행은 최신 데이터로 전체를 다시 처리)
+    batch_checkpoint.clear(batch_id)
+    return results
 
 
 def validate_and_clean_sql(sql_query):
-    """SQL 쿼리 유효성 검사 및 정리"""
+    """SQL 쿼리 유효성 검사 및 정리 (FROM이 있는 SELECT만 허용, 한 줄로 반환)"""
     if not sql_query:
         return None
 
-    # ANSI 색상 코드 제거
-    ansi_escape = re.compile(r'\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])')
-    clean_sql = ansi_escape.sub('', sql_query)
-
-    # 마크다운 코드 블록 표시 제거 (더 강력한 패턴)
-    clean_sql = re.sub(r'```sql.*?```', '', clean_sql, flags=re.DOTALL)
-    clean_sql = re.sub(r'```.*?```', '', clean_sql, flags=re.DOTALL)
-    clean_sql = re.sub(r'```sql.*$', '', clean_sql, flags=re.MULTILINE)
-    clean_sql = re.sub(r'```.*$', '', clean_sql, flags=re.MULTILINE)
-    clean_sql = re.sub(r'^```sql', '', clean_sql, flags=re.MULTILINE)
-    clean_sql = re.sub(r'^```', '', clean_sql, flags=re.MULTILINE)
-    clean_sql = clean_sql.replace('```sql', '').replace('```', '')
-
-    # 줄바꿈과 여러 공백 정리
-    clean_sql = re.sub(r'\s+', ' ', clean_sql).strip()
-
-    # SELECT로 시작하는지 확인
-    if not clean_sql.upper().startswith('SELECT'):
+    # 코드 블록/주석/설명 제거와 문장 종류 판별을 한 번의 토큰화로 처리
+    parsed = parse_sql(sql_query)
+    if parsed.statement_type != 'SELECT' or 'FROM' not in parsed.normalized.split():
         return None
 
-    # 기본적인 SQL 구문 확인
-    required_keywords = ['SELECT', 'FROM']
-    clean_sql_upper = clean_sql.upper()
-
-    for keyword in required_keywords:
-        if keyword not in clean_sql_upper:
-            return None
+    # 세미콜론은 제거된 상태 (MySQL에서는 세미콜론이 없어도 됨)
+    return ' '.join(parsed.sql.splitlines())
 
-    # 세미콜론 제거 (MySQL에서는 세미콜론이 없어도 됨)
-    clean_sql = clean_sql.rstrip(';')
-
-    return clean_sql
 
+def create_chart_figure(sql_query, question, chart_index, query_result=None):
+    """
+    개별 차트 Figure 객체 생성 (query_result가 있으면 재조회하지 않음)
+    반환: (Figure, 차트 유형, DataFrame) - 분석 코멘트는 호출하는 쪽에서 차트를 모아 한 번에 생성
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
 
-def create_chart_figure(sql_query, question, chart_index):
-    """개별 차트 Figure 객체 생성"""
     try:
         print(f"📊 차트 {chart_index} 데이터 처리 중: {question}")
 
@@ -517,83 +456,16 @@ def create_chart_figure(sql_query, question, chart_index):
         clean_sql = validate_and_clean_sql(sql_query)
         if not clean_sql:
             print(f"⚠️ 유효하지 않은 SQL 쿼리: {sql_query}")
-            return None, "오류", "유효하지 않은 SQL 쿼리입니다."
+            return None, "오류", None
 
         print(f"🔍 정리된 SQL: {clean_sql}")
 
-        # SQL 쿼리 직접 실행
-        result = db.run(clean_sql)
-
-        print("✨result:", result)
-
-        # DataFrame 변환 (기존 로직 재사용)
-        df = None
-
-        if isinstance(result, list) and result:
-            if isinstance(result[0], tuple):
-                num_cols = len(result[0])
-                if num_cols == 2:
-                    columns = ['name', 'value']
-                elif num_cols == 3:
-                    columns = ['col1', 'col2', 'col3']
-                else:
-                    columns = [f'col_{i+1}' for i in range(num_cols)]
-
-                df = pd.DataFrame(result, columns=columns)
-
-        elif isinstance(result, str):
-            # 문자열 결과 파싱 (기존 로직)
-            try:
-                def decimal_replacer(match):
-                    return match.group(1)
-
-                cleaned_result = re.sub(
-                    r"Decimal\('([^']+)'\)", decimal_replacer, result)
-
-                import ast
-                parsed_result = ast.literal_eval(cleaned_result)
-
-                if isinstance(parsed_result, list) and parsed_result:
-                    if isinstance(parsed_result[0], tuple):
-                        num_cols = len(parsed_result[0])
-                        if num_cols == 2:
-                            columns = ['name', 'value']
-                        elif num_cols == 3:
-                            columns = ['col1', 'col2', 'col3']
-                        else:
-                            columns = [f'col_{i+1}' for i in range(num_cols)]
-
-                        df = pd.DataFrame(parsed_result, columns=columns)
-
-            except Exception as e:
-                # 정규식 대안 파싱
-                try:
-                    pattern = r"\('([^']+)',\s*'([^']+)',\s*(?:Decimal\('([^']+)'\)|(\d+(?:\.\d+)?))\)"
-                    matches = re.findall(pattern, result)
-
-                    if matches:
-                        data = []
-                        for match in matches:
-                            name1, name2, decimal_val, regular_val = match
-                            value = float(decimal_val) if decimal_val else float(
-                                regular_val)
-                            data.append((name1, name2, value))
-
-                        if data:
-                            df = pd.DataFrame(
-                                data, columns=['col1', 'col2', 'col3'])
-                except Exception:
-                    pass
-
-        if df is None or df.empty:
-            return None
+        query_result = load_chart_data(get_db(), clean_sql, query_result)
 
-        # 숫자 컬럼 변환
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except (ValueError, TypeError):
-                pass
+        df = query_result.to_dataframe()
+        if df.empty:
+            print(f"⚠️ 차트 {chart_index}: 결과가 없습니다")
+            return None, "결과 없음", df
 
         # 데이터 타입 분석
         numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
@@ -662,15 +534,12 @@ def create_chart_figure(sql_query, question, chart_index):
             if chart_type == "막대 차트":
                 fig.update_xaxes(tickangle=45)
 
-        # 데이터 분석 생성
-        analysis = generate_data_analysis(df, question, chart_type)
-
         print(f"✅ 차트 {chart_index} 생성 완료 ({chart_type})")
-        return fig, chart_type, analysis
+        return fig, chart_type, df
 
     except Exception as e:
         print(f"❌ 차트 {chart_index} 생성 오류: {e}")
-        return None, "오류", "분석을 생성할 수 없습니다."
+        return None, "오류", None
 
 
 def markdown_to_html(text):
@@ -787,7 +656,7 @@ def generate_comprehensive_analysis(chart_info):
 """
 
         try:
-            analysis_result = llm.invoke(comprehensive_prompt)
+            analysis_result = get_analysis_llm().invoke(comprehensive_prompt)
             return analysis_result.content.strip()
         except Exception as e:
             print(f"⚠️ 종합 분석 생성 실패: {e}")
@@ -798,6 +667,15 @@ def generate_comprehensive_analysis(chart_info):
         return "종합 분석을 생성할 수 없습니다."
 
 
+def chart_insights(df, chart_type):
+    """차트 데이터 인사이트 (계산 실패 시 기본 문구 - 대시보드 생성은 계속 진행)"""
+    try:
+        return generate_insights(df)
+    except Exception as e:
+        print(f"⚠️ 데이터 분석 생성 오류: {e}")
+        return f"- 데이터 분석: {chart_type} 형태로 {len(df)}개의 데이터를 시각화했습니다."
+
+
 def create_multiple_infographics(results):
     """다중 결과를 하나의 대시보드 HTML 파일로 생성"""
     print(f"\n🎨 === 통합 대시보드 생성 시작 ===")
@@ -809,15 +687,16 @@ def create_multiple_infographics(results):
         print("⚠️ 유효한 결과가 없습니다.")
         return []
 
-    # 각 차트 생성
+    # 각 차트 생성 + 차트 데이터 인사이트 (LLM 없이 계산)
     figures = []
     chart_info = []
 
     for i, result in enumerate(valid_results, 1):
-        fig, chart_type, analysis = create_chart_figure(
+        fig, chart_type, df = create_chart_figure(
             result['sql_query'],
             result['question'],
-            i
+            i,
+            query_result=result.get('query_result')
         )
 
         if fig:
@@ -825,8 +704,8 @@ def create_multiple_infographics(results):
             chart_info.append({
                 'question': result['question'],
                 'chart_type': chart_type,
-                'analysis': analysis,
-                'index': i
+                'index': i,
+                'analysis': chart_insights(df, chart_type)
             })
 
     if not figures:
@@ -1024,20 +903,8 @@ def create_multiple_infographics(results):
         return []
 
 
-def translate_korean_to_english(korean_question):
-    """한국어 질문을 영어로 번역"""
-    try:
-        print(f"🌐 한국어 질문 번역 중: {korean_question}")
-
-        # 한국어 감지 (간단한 방법)
-        has_korean = any('\uac00' <= char <=
-                         '\ud7af' for char in korean_question)
-
-        if not has_korean:
-            print("📝 이미 영어 질문입니다.")
-            return korean_question
-
-        translation_prompt = f"""
+def build_translation_prompt(korean_question):
+    return f"""
 다음 한국어 데이터베이스 질문을 정확한 영어로 번역해주세요. 
 데이터베이스 용어와 SQL 관련 표현을 정확히 번역하는 것이 중요합니다.
 
@@ -1046,9 +913,25 @@ def translate_korean_to_english(korean_question):
 영어 번역만 답변해주세요. 추가 설명은 불필요합니다.
 """
 
-        english_question = translator_llm.invoke(
-            translation_prompt).content.strip()
+
+def translate_korean_to_english(korean_question):
+    """한국어 질문을 영어로 번역 (번역 메모리 우선 조회)"""
+    try:
+        print(f"🌐 한국어 질문 번역 중: {korean_question}")
+
+        if not has_korean(korean_question):
+            print("📝 이미 영어 질문입니다.")
+            return korean_question
+
+        cached = translation_memory.get('infographics', korean_question)
+        if cached:
+            print(f"♻️ 번역 메모리 사용: {cached}")
+            return cached
+
+        english_question = get_translator_llm().invoke(
+            build_translation_prompt(korean_question)).content.strip()
         print(f"🌐 번역 결과: {english_question}")
+        translation_memory.put('infographics', korean_question, english_question)
 
         return english_question
 
@@ -1058,6 +941,46 @@ def translate_korean_to_english(korean_question):
         return korean_question
 
 
+def translate_questions(questions):
+    """
+    여러 질문을 한 번에 번역 (입력 순서 유지)
+    영어 질문과 번역 메모리에 있는 질문은 건너뛰고, 나머지는 중복을 제거해 llm.batch로 요청
+    번역에 실패한 질문은 원문 사용
+    """
+    translations = {}
+    pending = []
+    for question in dict.fromkeys(questions):
+        if not has_korean(question):
+            translations[question] = question
+            continue
+        cached = translation_memory.get('infographics', question)
+        if cached:
+            print(f"♻️ 번역 메모리 사용: {cached}")
+            translations[question] = cached
+        else:
+            pending.append(question)
+
+    if pending:
+        print(f"🌐 한국어 질문 {len(pending)}개 일괄 번역 중 "
+              f"(동시 {min(len(pending), LLM_BATCH_CONCURRENCY)}개)")
+        try:
+            outputs = batch_invoke(get_translator_llm(),
+                                   [build_translation_prompt(q) for q in pending])
+        except Exception as e:
+            outputs = [e] * len(pending)
+
+        for question, output in zip(pending, outputs):
+            if isinstance(output, Exception):
+                print(f"⚠️ 번역 실패, 원본 질문 사용: {question} ({output})")
+                translations[question] = question
+                continue
+            print(f"🌐 번역 결과: {question} -> {output}")
+            translations[question] = output
+            translation_memory.put('infographics', question, output)
+
+    return [translations[question] for question in questions]
+
+
 def parse_multiple_questions(input_text):
     """입력 텍스트에서 다중 질문을 파싱"""
     # 구분자로 질문들을 분리
@@ -1079,145 +1002,147 @@ def parse_multiple_questions(input_text):
     return [q for q in questions if q]  # 빈 문자열 제거
 
 
-print("✅ 다중 쿼리 SQL Agent with 인포그래픽이 준비되었습니다!")
-
-# 메인 대화 루프
-print("=" * 60)
-print("🤖 SQL Agent와 대화하기 (다중 쿼리 인포그래픽)")
-print("=" * 60)
-print("💡 단일 질문 예시:")
-print("   - 각 카테고리별 영화 수를 알려주세요")
-print("   - 고객별 총 결제 금액 상위 10명을 보여주세요")
-print("")
-print("💡 다중 질문 예시 (구분자: 줄바꿈, 세미콜론, 파이프, 쉼표):")
-print("   - 각 카테고리별 영화 수를 알려주세요, 고객별 총 결제 금액 상위 10명을 보여주세요, 가장 많이 대여된 영화 5개는?")
-print("")
-print("   또는: 질문1; 질문2; 질문3")
-print("   또는: 1. 질문1 2. 질문2 3. 질문3")
-print("")
-print("🎨 사용법:")
-print("   1. 단일 또는 다중 질문을 입력하세요")
-print("   2. Agent가 각 질문에 대해 답변을 제공합니다")
-print("   3. 'y'를 입력하면 모든 결과에 대해 인포그래픽을 생성합니다")
-print("   4. 'multi:'로 시작하면 강제로 다중 모드로 처리합니다")
-print("   5. 'quit'를 입력하면 종료합니다")
-print("-" * 60)
-
-while True:
-    try:
-        user_input = input("\n❓ 질문을 입력하세요 (다중 질문 가능): ").strip()
-
-        if user_input.lower() in ['quit', 'exit', '종료', 'q']:
-            print("👋 대화를 종료합니다.")
-            break
+def main():
+    """대화형 실행"""
+    print("✅ 다중 쿼리 SQL Agent with 인포그래픽이 준비되었습니다!")
+
+    # 메인 대화 루프
+    print("=" * 60)
+    print("🤖 SQL Agent와 대화하기 (다중 쿼리 인포그래픽)")
+    print("=" * 60)
+    print("💡 단일 질문 예시:")
+    print("   - 각 카테고리별 영화 수를 알려주세요")
+    print("   - 고객별 총 결제 금액 상위 10명을 보여주세요")
+    print("")
+    print("💡 다중 질문 예시 (구분자: 줄바꿈, 세미콜론, 파이프, 쉼표):")
+    print("   - 각 카테고리별 영화 수를 알려주세요, 고객별 총 결제 금액 상위 10명을 보여주세요, 가장 많이 대여된 영화 5개는?")
+    print("")
+    print("   또는: 질문1; 질문2; 질문3")
+    print("   또는: 1. 질문1 2. 질문2 3. 질문3")
+    print("")
+    print("🎨 사용법:")
+    print("   1. 단일 또는 다중 질문을 입력하세요")
+    print("   2. Agent가 각 질문에 대해 답변을 제공합니다")
+    print("   3. 'y'를 입력하면 모든 결과에 대해 인포그래픽을 생성합니다")
+    print("   4. 'multi:'로 시작하면 강제로 다중 모드로 처리합니다")
+    print("   5. 'quit'를 입력하면 종료합니다")
+    print("-" * 60)
+
+    while True:
+        try:
+            user_input = input("\n❓ 질문을 입력하세요 (다중 질문 가능): ").strip()
 
-        if not user_input:
-            print("⚠️ 질문을 입력해주세요.")
-            continue
+            if user_input.lower() in ['quit', 'exit', '종료', 'q']:
+                print("👋 대화를 종료합니다.")
+                break
 
-        # 다중 질문 파싱
-        force_multi = user_input.startswith('multi:')
-        if force_multi:
-            user_input = user_input[6:].strip()  # 'multi:' 제거
+            if not user_input:
+                print("⚠️ 질문을 입력해주세요.")
+                continue
 
-        questions = parse_multiple_questions(user_input)
+            # 다중 질문 파싱
+            force_multi = user_input.startswith('multi:')
+            if force_multi:
+                user_input = user_input[6:].strip()  # 'multi:' 제거
 
-        print(f"\n🔍 감지된 질문 수: {len(questions)}")
-        for i, q in enumerate(questions, 1):
-            print(f"   {i}. {q}")
+            questions = parse_multiple_questions(user_input)
 
-        # 단일 질문 처리
-        if len(questions) == 1 and not force_multi:
-            original_question = questions[0]
-            print(f"\n🔍 단일 질문 처리: {original_question}")
+            print(f"\n🔍 감지된 질문 수: {len(questions)}")
+            for i, q in enumerate(questions, 1):
+                print(f"   {i}. {q}")
 
-            # 한국어 질문을 영어로 번역
-            english_question = translate_korean_to_english(original_question)
-            print("🤔 처리 중...")
+            # 단일 질문 처리
+            if len(questions) == 1 and not force_multi:
+                original_question = questions[0]
+                print(f"\n🔍 단일 질문 처리: {original_question}")
 
-            # Agent 실행 (출력 캡처) - 영어 질문 사용
-            old_stdout = sys.stdout
-            captured_output = StringIO()
-            sys.stdout = captured_output
+                # 한국어 질문을 영어로 번역
+                english_question = translate_korean_to_english(original_question)
+                print("🤔 처리 중...")
 
-            try:
-                result = agent_executor.invoke({"input": english_question})
-            finally:
-                sys.stdout = old_stdout
+                # 그래프(또는 Agent) 실행 - 영어 질문 사용
+                answer = answer_question(original_question, english_question)
 
-            captured_text = captured_output.getvalue()
+                print(f"\n✅ 답변:")
+                print(answer['answer'])
 
-            print(f"\n✅ 답변:")
-            print(result['output'])
+                # 마지막으로 성공한 SQL 쿼리
+                sql_query = answer['sql_query']
 
-            # SQL 쿼리 추출
-            sql_query = extract_sql_from_agent_output(captured_text)
+                if sql_query:
+                    print(f"\n📝 실행된 SQL: {sql_query}")
+                    if answer['limited_reason']:
+                        print(f"✂️ {answer['limited_reason']}")
 
-            if sql_query:
-                print(f"\n📝 실행된 SQL: {sql_query}")
+                    create_chart = input(
+                        "\n🎨 인포그래픽을 생성하시겠습니까? (y/n): ").strip().lower()
 
-                create_chart = input(
-                    "\n🎨 인포그래픽을 생성하시겠습니까? (y/n): ").strip().lower()
+                    if create_chart in ['y', 'yes', '네', 'ㅇ']:
+                        print("\n🎨 인포그래픽 생성 중...")
 
-                if create_chart in ['y', 'yes', '네', 'ㅇ']:
-                    print("\n🎨 인포그래픽 생성 중...")
+                        infographic_file = create_infographic_from_sql_query(
+                            sql_query, original_question,  # 원본 한국어 질문 사용
+                            query_result=answer['query_result'])
 
-                    infographic_file = create_infographic_from_sql_query(
-                        sql_query, original_question)  # 원본 한국어 질문 사용
+                        if infographic_file:
+                            print("✨ 생성 완료! 파일을 더블클릭해서 브라우저에서 확인하세요.")
+                        else:
+                            print("⚠️ 인포그래픽 생성에 실패했습니다.")
+                elif answer['rejected_reason']:
+                    print(f"\n🛑 비용 검사로 쿼리가 거부되어 인포그래픽을 생성할 수 없습니다: {answer['rejected_reason']}")
+                else:
+                    print("\n⚠️ SQL 쿼리를 찾을 수 없어 인포그래픽을 생성할 수 없습니다.")
 
-                    if infographic_file:
-                        print("✨ 생성 완료! 파일을 더블클릭해서 브라우저에서 확인하세요.")
-                    else:
-                        print("⚠️ 인포그래픽 생성에 실패했습니다.")
+            # 다중 질문 처리
             else:
-                print("\n⚠️ SQL 쿼리를 찾을 수 없어 인포그래픽을 생성할 수 없습니다.")
+                print(f"\n🔍 다중 질문 처리 모드 ({len(questions)}개 질문)")
+
+                # 모든 질문 처리
+                results = process_multiple_questions(questions)
+
+                # 결과 요약 출력
+                print(f"\n📊 === 처리 결과 요약 ===")
+                valid_results = [r for r in results if r['sql_query']]
+                print(f"✅ 성공: {len(valid_results)}개")
+                print(f"⚠️ 실패: {len(results) - len(valid_results)}개")
+
+                # 각 결과 출력
+                for i, result in enumerate(results, 1):
+                    print(f"\n--- 질문 {i} ---")
+                    print(f"❓ {result['question']}")
+                    print(f"✅ {result['answer']}")
+                    if result['sql_query']:
+                        print(f"📝 SQL: {result['sql_query']}")
+
+                if valid_results:
+                    create_charts = input(
+                        f"\n🎨 {len(valid_results)}개의 인포그래픽을 생성하시겠습니까? (y/n): ").strip().lower()
+
+                    if create_charts in ['y', 'yes', '네', 'ㅇ']:
+                        print(f"\n🎨 다중 인포그래픽 생성 중...")
+
+                        created_files = create_multiple_infographics(results)
+
+                        if created_files:
+                            dashboard_info = created_files[0]
+                            print(f"\n✨ 통합 대시보드가 생성되었습니다!")
+                            print(f"📁 파일: {dashboard_info['file']}")
+                            print(f"📊 포함된 차트: {dashboard_info['chart_count']}개")
+                            print("\n💡 파일을 더블클릭해서 브라우저에서 확인하세요.")
+                        else:
+                            print("⚠️ 대시보드 생성에 실패했습니다.")
+                else:
+                    print("\n⚠️ 유효한 SQL 쿼리가 없어 인포그래픽을 생성할 수 없습니다.")
 
-        # 다중 질문 처리
-        else:
-            print(f"\n🔍 다중 질문 처리 모드 ({len(questions)}개 질문)")
-
-            # 모든 질문 처리
-            results = process_multiple_questions(questions)
-
-            # 결과 요약 출력
-            print(f"\n📊 === 처리 결과 요약 ===")
-            valid_results = [r for r in results if r['sql_query']]
-            print(f"✅ 성공: {len(valid_results)}개")
-            print(f"⚠️ 실패: {len(results) - len(valid_results)}개")
-
-            # 각 결과 출력
-            for i, result in enumerate(results, 1):
-                print(f"\n--- 질문 {i} ---")
-                print(f"❓ {result['question']}")
-                print(f"✅ {result['answer']}")
-                if result['sql_query']:
-                    print(f"📝 SQL: {result['sql_query']}")
-
-            if valid_results:
-                create_charts = input(
-                    f"\n🎨 {len(valid_results)}개의 인포그래픽을 생성하시겠습니까? (y/n): ").strip().lower()
-
-                if create_charts in ['y', 'yes', '네', 'ㅇ']:
-                    print(f"\n🎨 다중 인포그래픽 생성 중...")
-
-                    created_files = create_multiple_infographics(results)
-
-                    if created_files:
-                        dashboard_info = created_files[0]
-                        print(f"\n✨ 통합 대시보드가 생성되었습니다!")
-                        print(f"📁 파일: {dashboard_info['file']}")
-                        print(f"📊 포함된 차트: {dashboard_info['chart_count']}개")
-                        print("\n💡 파일을 더블클릭해서 브라우저에서 확인하세요.")
-                    else:
-                        print("⚠️ 대시보드 생성에 실패했습니다.")
-            else:
-                print("\n⚠️ 유효한 SQL 쿼리가 없어 인포그래픽을 생성할 수 없습니다.")
+            print("\n" + "="*60)
 
-        print("\n" + "="*60)
+        except KeyboardInterrupt:
+            print("\n\n👋 사용자가 중단했습니다.")
+            break
+        except Exception as e:
+            print(f"\n❌ 오류 발생: {e}")
+            print("다시 시도해주세요.")
 
-    except KeyboardInterrupt:
-        print("\n\n👋 사용자가 중단했습니다.")
-        break
-    except Exception as e:
-        print(f"\n❌ 오류 발생: {e}")
-        print("다시 시도해주세요.")
+
+if __name__ == "__main__":
+    main()
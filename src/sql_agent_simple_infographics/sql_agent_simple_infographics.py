@@ -2,41 +2,100 @@
 간단하고 확실한 SQL Agent with 인포그래픽
 """
 import sys
-from io import StringIO
-import re
+import time
 from datetime import datetime
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
-from langchain_community.agent_toolkits import create_sql_agent
-from langchain_community.utilities import SQLDatabase
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
 load_dotenv(override=True)
 
+# 공통 모듈(src/sql_agent_common) 경로 추가
+sys.path.insert(0, os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))))
+from sql_agent_common.query_result import load_chart_data  # noqa: E402
+from sql_agent_common.db_pool import get_database  # noqa: E402
+from sql_agent_common.lazy import LazyResource  # noqa: E402
 
-# LLM 설정
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
 
-# MySQL 연결 설정
-db_uri = f"mysql+pymysql://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
+# ==========================================
+# 지연 초기화 - LLM/DB/Agent는 처음 사용할 때 생성
+# ==========================================
+def _create_llm():
+    from langchain_google_genai import ChatGoogleGenerativeAI
 
-try:
-    db = SQLDatabase.from_uri(db_uri)
+    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", temperature=0)
+
+
+def _create_db():
+    # MySQL 연결 설정 (프로세스 전역 커넥션 풀 공유)
+    try:
+        db = get_database()
+    except Exception as e:
+        print(f"❌ 데이터베이스 연결 실패: {e}")
+        raise
     print(f"✅ 데이터베이스 연결 성공")
     print(f"📊 사용 가능한 테이블: {db.get_usable_table_names()}")
-except Exception as e:
-    print(f"❌ 데이터베이스 연결 실패: {e}")
-    exit(1)
-
-# SQL Agent 생성
-agent_executor = create_sql_agent(
-    llm=llm,
-    db=db,
-    agent_type="openai-tools",
-    verbose=True
-)
+    return db
+
+
+def _create_agent_executor():
+    from langchain_community.agent_toolkits import create_sql_agent
+    from sql_agent_common.agent_tools import CapturingSQLDatabaseToolkit
+
+    # SQL Agent 생성 (sql_db_query 결과를 차트에서 재사용할 수 있도록 캡처 도구 사용)
+    llm = get_llm()
+    return create_sql_agent(
+        llm=llm,
+        toolkit=CapturingSQLDatabaseToolkit(db=get_db(), llm=llm),
+        agent_type="openai-tools",
+        verbose=False  # SQL은 콜백으로 기록하므로 로그 출력 불필요
+    )
+
+
+def _create_seeded_agent_executor():
+    from sql_agent_common.agent_tools import create_seeded_sql_agent
+
+    # 질문 관련 스키마를 프롬프트에 미리 넣어 테이블 목록/스키마 조회 반복을 건너뜀
+    return create_seeded_sql_agent(
+        get_llm(),
+        get_db(),
+        agent_type="openai-tools",
+        verbose=False
+    )
+
+
+def _create_sql_graph():
+    from sql_agent_common.sql_graph import build_sql_graph
+
+    # 스키마 -> SQL 생성 -> 검증 -> 실행 (Gemini가 한국어 질문을 직접 처리하므로 번역 없음)
+    return build_sql_graph(get_db, get_llm)
+
+
+_llm = LazyResource(_create_llm)
+_db = LazyResource(_create_db)
+_agent_executor = LazyResource(_create_agent_executor)
+_seeded_agent_executor = LazyResource(_create_seeded_agent_executor)
+_sql_graph = LazyResource(_create_sql_graph)
+
+
+def get_llm():
+    return _llm.get()
+
+
+def get_db():
+    return _db.get()
+
+
+def get_agent_executor():
+    return _agent_executor.get()
+
+
+def get_seeded_agent_executor():
+    return _seeded_agent_executor.get()
+
+
+def get_sql_graph():
+    return _sql_graph.get()
+
 
 # 인포그래픽 디렉토리 생성
 infographic_dir = "infographics"
@@ -44,109 +103,29 @@ if not os.path.exists(infographic_dir):
     os.makedirs(infographic_dir)
 
 
-def create_infographic_from_sql_query(sql_query, question):
+def create_infographic_from_sql_query(sql_query, question, query_result=None):
     """
-    SQL 쿼리를 직접 실행하고 인포그래픽 생성
+    SQL 쿼리 결과로 인포그래픽 생성
+    query_result: Agent가 실행한 결과 (있으면 재조회하지 않음)
     """
+    import plotly.express as px
+    import plotly.graph_objects as go
+
     try:
         print(f"\n🔍 === 인포그래픽 생성 시작 ===")
         print(f"📝 SQL 쿼리: {sql_query}")
 
-        # SQL 쿼리 직접 실행
-        result = db.run(sql_query)
-        print(f"🔍 쿼리 결과 타입: {type(result)}")
-        print(f"🔍 쿼리 결과: {result}")
+        query_result = load_chart_data(get_db(), sql_query, query_result)
+        print(f"🔍 쿼리 결과: {len(query_result)}행, 컬럼 {query_result.columns}")
 
         # DataFrame 변환
-        df = None
-
-        if isinstance(result, list) and result:
-            if isinstance(result[0], tuple):
-                # 컬럼 수에 따라 적절한 컬럼명 생성
-                num_cols = len(result[0])
-                if num_cols == 2:
-                    columns = ['name', 'value']
-                elif num_cols == 3:
-                    columns = ['col1', 'col2', 'col3']
-                else:
-                    columns = [f'col_{i+1}' for i in range(num_cols)]
-
-                df = pd.DataFrame(result, columns=columns)
-                print(f"✅ DataFrame 생성 성공: {df.shape}")
-                print(f"📊 데이터 미리보기:\n{df.head()}")
-
-        elif isinstance(result, str):
-            # 문자열 결과 파싱 (Decimal 객체 처리 포함)
-            print("📝 문자열 결과 파싱 중...")
-            try:
-                # Decimal 객체를 처리하기 위한 안전한 파싱
-                import re
-                from decimal import Decimal
-
-                # Decimal('123.45') 패턴을 숫자로 변환
-                def decimal_replacer(match):
-                    return match.group(1)
-
-                # Decimal 객체를 숫자 문자열로 변환
-                cleaned_result = re.sub(
-                    r"Decimal\('([^']+)'\)", decimal_replacer, result)
-                print(f"🔧 Decimal 처리 후: {cleaned_result[:200]}...")
-
-                import ast
-                parsed_result = ast.literal_eval(cleaned_result)
-
-                if isinstance(parsed_result, list) and parsed_result:
-                    if isinstance(parsed_result[0], tuple):
-                        num_cols = len(parsed_result[0])
-                        if num_cols == 2:
-                            columns = ['name', 'value']
-                        elif num_cols == 3:
-                            columns = ['col1', 'col2', 'col3']
-                        else:
-                            columns = [f'col_{i+1}' for i in range(num_cols)]
-
-                        df = pd.DataFrame(parsed_result, columns=columns)
-                        print(f"✅ 문자열 파싱으로 DataFrame 생성 성공: {df.shape}")
-                        print(f"📊 데이터 미리보기:\n{df.head()}")
-
-            except Exception as e:
-                print(f"⚠️ 문자열 파싱 실패: {e}")
-                # 대안: 정규식으로 직접 파싱 시도
-                print("🔄 대안 파싱 방법 시도 중...")
-                try:
-                    import re
-                    # 튜플 패턴 찾기: ('값1', '값2', 숫자)
-                    pattern = r"\('([^']+)',\s*'([^']+)',\s*(?:Decimal\('([^']+)'\)|(\d+(?:\.\d+)?))\)"
-                    matches = re.findall(pattern, result)
-
-                    if matches:
-                        data = []
-                        for match in matches:
-                            # match는 (name1, name2, decimal_value, regular_number) 형태
-                            name1, name2, decimal_val, regular_val = match
-                            value = float(decimal_val) if decimal_val else float(
-                                regular_val)
-                            data.append((name1, name2, value))
-
-                        if data:
-                            df = pd.DataFrame(
-                                data, columns=['col1', 'col2', 'col3'])
-                            print(f"✅ 정규식 파싱으로 DataFrame 생성 성공: {df.shape}")
-                            print(f"📊 데이터 미리보기:\n{df.head()}")
-
-                except Exception as e2:
-                    print(f"⚠️ 대안 파싱도 실패: {e2}")
-
-        if df is None or df.empty:
+        df = query_result.to_dataframe()
+        if df.empty:
             print("⚠️ DataFrame 생성 실패")
             return None
 
-        # 숫자 컬럼 변환
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col], errors='ignore')
-            except:
-                pass
+        print(f"✅ DataFrame 생성 성공: {df.shape}")
+        print(f"📊 데이터 미리보기:\n{df.head()}")
 
         # 타임스탬프 생성
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -255,100 +234,127 @@ def create_infographic_from_sql_query(sql_query, question):
         return None
 
 
-def extract_sql_from_agent_output(captured_text):
-    """Agent 출력에서 SQL 쿼리 추출"""
-    patterns = [
-        r"Invoking: `sql_db_query` with `\\{'query': '([^']+)'\\}`",
-        r'query.*?["\']([^"\']*SELECT[^"\']*)["\']',
-        r'SELECT[^;]+(?:;|$)'
-    ]
-
-    for pattern in patterns:
-        matches = re.findall(pattern, captured_text, re.DOTALL | re.IGNORECASE)
-        if matches:
-            # SELECT로 시작하는 쿼리만 반환
-            for match in matches:
-                if match.strip().upper().startswith('SELECT'):
-                    return match.strip()
-
-    return None
-
-
-print("✅ 간단한 SQL Agent with 인포그래픽이 준비되었습니다!")
-
-# 메인 대화 루프
-print("=" * 60)
-print("🤖 SQL Agent와 대화하기 (간단한 인포그래픽)")
-print("=" * 60)
-print("💡 예시 질문:")
-print("   - 각 카테고리별 영화 수를 알려주세요")
-print("   - 고객별 총 결제 금액 상위 10명을 보여주세요")
-print("   - 가장 많이 대여된 영화 5개는?")
-print("")
-print("🎨 사용법:")
-print("   1. 질문을 입력하세요")
-print("   2. Agent가 답변을 제공합니다")
-print("   3. 'y'를 입력하면 인포그래픽을 생성합니다")
-print("   4. 'quit'를 입력하면 종료합니다")
-print("-" * 60)
-
-while True:
-    try:
-        user_question = input("\n❓ 질문을 입력하세요: ").strip()
+def run_agent(question, seeded=False):
+    """
+    SQL Agent 실행 - 도구 호출을 콜백으로 기록하고 반복 수/소요 시간 출력
+    seeded=True면 스키마를 프롬프트에 미리 넣은 Agent 사용
+    반환: (Agent 결과, SQLCaptureHandler, 소요 시간(초))
+    """
+    from sql_agent_common.agent_tools import seeded_schema
+    from sql_agent_common.sql_capture import SQLCaptureHandler
 
-        if user_question.lower() in ['quit', 'exit', '종료', 'q']:
-            print("👋 대화를 종료합니다.")
-            break
+    started = time.perf_counter()
+    inputs = {"input": question}
+    if seeded:
+        inputs["schema"] = seeded_schema(get_db(), question)
+        executor = get_seeded_agent_executor()
+    else:
+        executor = get_agent_executor()
 
-        if not user_question:
-            print("⚠️ 질문을 입력해주세요.")
-            continue
+    capture = SQLCaptureHandler()
+    result = executor.invoke(inputs, config={"callbacks": [capture]})
+    elapsed = time.perf_counter() - started
 
-        print(f"\n🔍 질문: {user_question}")
-        print("🤔 처리 중...")
+    tools = ", ".join(f"{name} {count}" for name, count in capture.tool_counts.items())
+    print(f"⏱️ Agent 실행 {elapsed:.2f}s (반복 {capture.iterations}회, 도구 호출: {tools or '없음'})")
+    return result, capture, elapsed
 
-        # Agent 실행 (출력 캡처)
-        old_stdout = sys.stdout
-        captured_output = StringIO()
-        sys.stdout = captured_output
 
+def answer_question(question):
+    """
+    질문 하나 처리 (SQL_AGENT_MODE=graph: StateGraph 파이프라인, agent: 기존 SQL Agent,
+    agent_seeded: 스키마를 미리 넣은 SQL Agent)
+    반환: answer / sql_query / query_result / rejected_reason / limited_reason /
+    sql_events를 담은 dict
+    """
+    from sql_agent_common.sql_graph import (
+        SQL_AGENT_MODE, answer_from_agent, answer_from_state, run_sql_graph)
+
+    if SQL_AGENT_MODE in ('agent', 'agent_seeded'):
+        result, capture, elapsed = run_agent(
+            question, seeded=SQL_AGENT_MODE == 'agent_seeded')
+        return answer_from_agent(result, capture, question, elapsed)
+
+    return answer_from_state(run_sql_graph(get_sql_graph(), question))
+
+
+def main():
+    """대화형 실행"""
+    print("✅ 간단한 SQL Agent with 인포그래픽이 준비되었습니다!")
+
+    # 메인 대화 루프
+    print("=" * 60)
+    print("🤖 SQL Agent와 대화하기 (간단한 인포그래픽)")
+    print("=" * 60)
+    print("💡 예시 질문:")
+    print("   - 각 카테고리별 영화 수를 알려주세요")
+    print("   - 고객별 총 결제 금액 상위 10명을 보여주세요")
+    print("   - 가장 많이 대여된 영화 5개는?")
+    print("")
+    print("🎨 사용법:")
+    print("   1. 질문을 입력하세요")
+    print("   2. Agent가 답변을 제공합니다")
+    print("   3. 'y'를 입력하면 인포그래픽을 생성합니다")
+    print("   4. 'quit'를 입력하면 종료합니다")
+    print("-" * 60)
+
+    while True:
         try:
-            result = agent_executor.invoke({"input": user_question})
-        finally:
-            sys.stdout = old_stdout
+            user_question = input("\n❓ 질문을 입력하세요: ").strip()
 
-        captured_text = captured_output.getvalue()
+            if user_question.lower() in ['quit', 'exit', '종료', 'q']:
+                print("👋 대화를 종료합니다.")
+                break
 
-        print(f"\n✅ 답변:")
-        print(result['output'])
+            if not user_question:
+                print("⚠️ 질문을 입력해주세요.")
+                continue
 
-        # SQL 쿼리 추출
-        sql_query = extract_sql_from_agent_output(captured_text)
+            print(f"\n🔍 질문: {user_question}")
+            print("🤔 처리 중...")
 
-        if sql_query:
-            print(f"\n📝 실행된 SQL: {sql_query}")
+            # 그래프(또는 Agent) 실행
+            answer = answer_question(user_question)
 
-            create_chart = input(
-                "\n🎨 인포그래픽을 생성하시겠습니까? (y/n): ").strip().lower()
+            print(f"\n✅ 답변:")
+            print(answer['answer'])
 
-            if create_chart in ['y', 'yes', '네', 'ㅇ']:
-                print("\n🎨 인포그래픽 생성 중...")
+            # 마지막으로 성공한 SQL 쿼리
+            sql_query = answer['sql_query']
 
-                infographic_file = create_infographic_from_sql_query(
-                    sql_query, user_question)
+            if sql_query:
+                print(f"\n📝 실행된 SQL: {sql_query}")
+                if answer['limited_reason']:
+                    print(f"✂️ {answer['limited_reason']}")
 
-                if infographic_file:
-                    print("✨ 생성 완료! 파일을 더블클릭해서 브라우저에서 확인하세요.")
-                else:
-                    print("⚠️ 인포그래픽 생성에 실패했습니다.")
-        else:
-            print("\n⚠️ SQL 쿼리를 찾을 수 없어 인포그래픽을 생성할 수 없습니다.")
+                create_chart = input(
+                    "\n🎨 인포그래픽을 생성하시겠습니까? (y/n): ").strip().lower()
 
-        print("\n" + "="*60)
+                if create_chart in ['y', 'yes', '네', 'ㅇ']:
+                    print("\n🎨 인포그래픽 생성 중...")
 
-    except KeyboardInterrupt:
-        print("\n\n👋 사용자가 중단했습니다.")
-        break
-    except Exception as e:
-        print(f"\n❌ 오류 발생: {e}")
-        print("다시 시도해주세요.")
+                    infographic_file = create_infographic_from_sql_query(
+                        sql_query, user_question,
+                        query_result=answer['query_result'])
+
+                    if infographic_file:
+                        print("✨ 생성 완료! 파일을 더블클릭해서 브라우저에서 확인하세요.")
+                    else:
+                        print("⚠️ 인포그래픽 생성에 실패했습니다.")
+            elif answer['rejected_reason']:
+                print(f"\n🛑 비용 검사로 쿼리가 거부되어 인포그래픽을 생성할 수 없습니다: {answer['rejected_reason']}")
+            else:
+                print("\n⚠️ SQL 쿼리를 찾을 수 없어 인포그래픽을 생성할 수 없습니다.")
+
+            print("\n" + "="*60)
+
+        except KeyboardInterrupt:
+            print("\n\n👋 사용자가 중단했습니다.")
+            break
+        except Exception as e:
+            print(f"\n❌ 오류 발생: {e}")
+            print("다시 시도해주세요.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+유사 질문 캐시 테스트 스크립트
+비교 방향, 컬럼명, 값만 바뀐 질문은 유사도가 높아도 이전 SQL을 재사용하지 않아야 함
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from sql_agent_common.near_duplicate import NearDuplicateIndex  # noqa: E402
+
+CACHED_QUESTION = ("Show the title, release year and rating of films whose rental duration "
+                   "is longer than the average rental duration of all films in the Action category")
+CACHED_SQL = ("SELECT f.title, f.release_year, f.rating FROM film f "
+              "WHERE f.rental_duration > (SELECT AVG(rental_duration) FROM film)")
+
+
+def create_index():
+    """질문 하나가 등록된 인덱스"""
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add(CACHED_QUESTION, 'SELECT', 'fp', 'model', CACHED_SQL)
+    return index
+
+
+def test_paraphrase_hit():
+    """표현만 다른 질문은 재사용"""
+    index = create_index()
+    hit = index.lookup(CACHED_QUESTION.replace("Show", "List"), 'SELECT', 'fp', 'model')
+    assert hit is not None and hit[0] == CACHED_SQL
+
+
+def test_direction_flipped_miss():
+    """비교 방향이 반대인 질문은 재사용하지 않음"""
+    index = create_index()
+    for word in ('less', 'greater', 'shorter'):
+        question = CACHED_QUESTION.replace('longer', word)
+        assert index.lookup(question, 'SELECT', 'fp', 'model') is None, question
+    # 유사도는 임계값 이상이지만 비교 표현이 달라서 거절된 경우
+    assert index.stats['rejected_literals'] == 3
+
+
+# 여러 컬럼을 나열하는 긴 질문 - 컬럼/값 하나만 바꿔도 MinHash 유사도는 임계값 이상
+WIDE_QUESTION = ("Show the title, description, release year, language, rental duration, "
+                 "rental rate, special features and rating of every film in the category "
+                 "comedy ordered by title")
+WIDE_SQL = ("SELECT f.title, f.description, f.release_year, l.name, f.rental_duration, "
+            "f.rental_rate, f.special_features, f.rating FROM film f ...")
+
+
+def test_swapped_column_or_value_miss():
+    """컬럼명이나 소문자 값 하나만 바뀐 질문은 재사용하지 않음"""
+    index = NearDuplicateIndex(threshold=0.8)
+    index.add(WIDE_QUESTION, 'SELECT', 'fp', 'model', WIDE_SQL)
+    assert index.lookup(WIDE_QUESTION.replace("Show", "List"),
+                        'SELECT', 'fp', 'model') is not None
+    for old, new in (('rating', 'length'), ('rating', 'replacement cost'),
+                     ('comedy', 'horror'), ('rental rate', 'rental cost')):
+        question = WIDE_QUESTION.replace(old, new)
+        assert index.lookup(question, 'SELECT', 'fp', 'model') is None, question
+    assert index.stats['rejected_literals'] >= 3
+
+
+def main():
+    """메인 테스트 함수"""
+    print("🧪 유사 질문 캐시 테스트 시작")
+    test_paraphrase_hit()
+    test_direction_flipped_miss()
+    test_swapped_column_or_value_miss()
+    print("🎉 테스트 성공!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+SQL 토큰 분석 테스트 스크립트
+parse_sql 결과(정리된 SQL, 문장 종류, LIMIT, 문장 수)와 add_limit/add_optimizer_hint 위치 확인
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from sql_agent_common.sql_tokens import (  # noqa: E402
+    add_limit, add_optimizer_hint, classify_statement, parse_sql)
+
+HINT = "MAX_EXECUTION_TIME(1000)"
+
+
+def test_code_fence_and_prose():
+    """코드 블록 표시와 앞뒤 설명은 제거하고 첫 문장만 남김"""
+    raw = ("Here is the query:\n```sql\nSELECT f.title\nFROM film f;\n```\n"
+           "This returns every title.")
+    parsed = parse_sql(raw)
+    assert parsed.sql == "SELECT f.title\nFROM film f"
+    assert parsed.statement_type == 'SELECT'
+    assert parsed.statement_count == 1
+
+
+def test_comments():
+    """'-- '와 /* */ 주석은 제거, 공백 없는 --는 연산자, 문자열 안의 --는 유지"""
+    parsed = parse_sql("SELECT 1 -- first column\nFROM film /* block */ WHERE x = 5--3")
+    assert parsed.sql == "SELECT 1\nFROM film WHERE x = 5--3"
+    assert parse_sql("SELECT 1 FROM film --").sql == "SELECT 1 FROM film"
+    assert parse_sql("SELECT 'a -- b' FROM film").sql == "SELECT 'a -- b' FROM film"
+    # 옵티마이저 힌트 주석은 실행에 영향이 있으므로 유지
+    assert parse_sql("SELECT /*+ NO_INDEX(f) */ * FROM film f").sql == \
+        "SELECT /*+ NO_INDEX(f) */ * FROM film f"
+
+
+def test_locking_and_into_are_not_read_only():
+    """FOR UPDATE / INTO OUTFILE은 SELECT로 실행하지 않음"""
+    for sql in ("SELECT * FROM film WHERE film_id = 1 FOR UPDATE",
+                "SELECT * FROM film LOCK IN SHARE MODE",
+                "SELECT * FROM film INTO OUTFILE '/tmp/film.csv'"):
+        parsed = parse_sql(sql)
+        assert parsed.statement_type == 'OTHER', sql
+        assert not parsed.is_read_only, sql
+        assert add_limit(sql, 10) == sql, sql
+        assert add_optimizer_hint(sql, HINT) == sql, sql
+
+
+def test_statement_types():
+    assert classify_statement("WITH c AS (SELECT 1) SELECT * FROM c") == 'SELECT'
+    assert classify_statement("DELETE FROM film WHERE film_id = 1") == 'DELETE'
+    assert classify_statement("UPDATE film SET rating = 'G'") == 'UPDATE'
+    assert classify_statement("INSERT INTO actor (first_name) VALUES ('KIM')") == 'INSERT'
+    assert classify_statement("DROP TABLE film") == 'DDL'
+
+
+def test_union_limit():
+    """마지막 SELECT 뒤의 LIMIT만 최상위 LIMIT (괄호 안의 LIMIT은 아님)"""
+    top = parse_sql("SELECT a FROM t UNION SELECT b FROM u LIMIT 5")
+    assert top.has_limit
+    assert add_limit(top.sql, 10) == "SELECT a FROM t UNION SELECT b FROM u LIMIT 5"
+
+    nested = "SELECT a FROM t UNION (SELECT b FROM u LIMIT 5)"
+    assert not parse_sql(nested).has_limit
+    assert add_limit(nested, 10) == nested + " LIMIT 10"
+    assert not parse_sql("SELECT * FROM (SELECT * FROM film LIMIT 3) x").has_limit
+
+
+def test_multiple_statements():
+    """여러 문장이면 첫 문장만 정리하고 문장 수를 셈"""
+    parsed = parse_sql("SELECT * FROM film; DROP TABLE film;")
+    assert parsed.sql == "SELECT * FROM film"
+    assert parsed.statement_count == 2
+    # 문자열 안의 세미콜론은 문장 구분이 아님
+    assert parse_sql("SELECT ';' FROM film").statement_count == 1
+
+
+def test_add_limit_position():
+    assert add_limit("SELECT * FROM film;", 10) == "SELECT * FROM film LIMIT 10"
+    assert add_limit("SELECT * FROM film LIMIT 3", 10) == "SELECT * FROM film LIMIT 3"
+    assert add_limit("SELECT * FROM film ORDER BY title", 10) == \
+        "SELECT * FROM film ORDER BY title LIMIT 10"
+    assert add_limit("DELETE FROM film", 10) == "DELETE FROM film"
+
+
+def test_add_optimizer_hint_position():
+    """힌트는 최상위 SELECT 키워드 바로 뒤 (CTE 안의 SELECT가 아님)"""
+    assert add_optimizer_hint("SELECT DISTINCT title FROM film", HINT) == \
+        f"SELECT /*+ {HINT} */ DISTINCT title FROM film"
+    assert add_optimizer_hint("WITH c AS (SELECT 1) SELECT * FROM c", HINT) == \
+        f"WITH c AS (SELECT 1) SELECT /*+ {HINT} */ * FROM c"
+    # 이미 힌트가 있으면 그대로
+    hinted = "SELECT /*+ NO_INDEX(f) */ * FROM film f"
+    assert add_optimizer_hint(hinted, HINT) == hinted
+    assert add_optimizer_hint("UPDATE film SET rating = 'G'", HINT) == \
+        "UPDATE film SET rating = 'G'"
+
+
+def main():
+    """메인 테스트 함수"""
+    print("🧪 SQL 토큰 분석 테스트 시작")
+    test_code_fence_and_prose()
+    test_comments()
+    test_locking_and_into_are_not_read_only()
+    test_statement_types()
+    test_union_limit()
+    test_multiple_statements()
+    test_add_limit_position()
+    test_add_optimizer_hint_position()
+    print("🎉 테스트 성공!")
+
+
+if __name__ == "__main__":
+    main()